@@ -3,3 +3,10 @@ def cost_fun_generator(G):
         return d.get("length", None)
 
     return cost_fun
+
+
+def vectorized_cost_fun_generator(G):
+    def cost_fun(columns):
+        return columns["length"]
+
+    return cost_fun
@@ -5,6 +5,8 @@ BUILD_PATH = "./example"
 BOOKSTORE_POINT = (-122.313108, 47.661011)
 # Near Cafe Solstice
 CAFE_POINT = (-122.313170, 47.657524)
+# Along a sidewalk between two intersections
+MIDBLOCK_POINT = (-122.313035, 47.660156)
 
 EXAMPLE_NODE = "-122.3154903, 47.6562992"
 EXAMPLE_POLYGON = {  # TODO: test this out
@@ -28,3 +30,14 @@ EXAMPLE_POLYGON = {  # TODO: test this out
 
 def cost_fun(u, v, d):
     return d.get("length", None)
+
+
+def without_fid(cost_function, fid):
+    # The cost function, but with the edge of a fid impassable: e.g. the
+    # reverse of an edge, to make the edge one-way
+    def one_way_cost_function(u, v, d):
+        if d.get("fid") == fid:
+            return None
+        return cost_function(u, v, d)
+
+    return one_way_cost_function
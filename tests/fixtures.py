@@ -27,8 +27,6 @@ def test_waypoint_nodes(built_G):
     origin = makePointFeature(*BOOKSTORE_POINT)
     destination = makePointFeature(*CAFE_POINT)
     # This route takes 4 seconds or so. Why so slow? Profile.
-    nodes = waypoint_nodes(
-        built_G, (origin, destination), cost_fun, invert=("incline",)
-    )
+    nodes = waypoint_nodes(built_G, (origin, destination), cost_fun)
     # TODO: test output
     return nodes
@@ -2,6 +2,7 @@ from unweaver.candidates import waypoint_candidates
 from unweaver.graphs import AugmentedDiGraphGPKGView
 
 from .constants import BOOKSTORE_POINT
+from .test_weight import TEST_EDGES
 
 
 def test_augmented(built_G):
@@ -16,3 +17,18 @@ def test_augmented(built_G):
 
     # TODO: Test output
     AugmentedDiGraphGPKGView.prepare_augmented(built_G, candidate)
+
+
+def test_augmented_edges_bunch(built_G):
+    candidates = waypoint_candidates(
+        built_G, BOOKSTORE_POINT[0], BOOKSTORE_POINT[1], 1
+    )
+    candidate = next(iter(candidates))
+    G = AugmentedDiGraphGPKGView.prepare_augmented(built_G, candidate)
+
+    ebunch = [(u, v) for u, v, d in candidate.edges_out] + TEST_EDGES
+    edges = G.edges_bunch(ebunch)
+
+    assert [(u, v) for u, v, d in edges] == ebunch
+    for u, v, d in edges:
+        assert d == dict(G[u][v])
@@ -1,7 +1,31 @@
+import glob
+import json
+import multiprocessing
+import os
+import random
+import shutil
+
+import fiona
+import geomet.wkb
 import pytest
 
+from unweaver.build.build_graph import build_graph
+from unweaver.build.fingerprints import BuildMetadata, feature_fingerprint
 from unweaver.build.get_layers_paths import get_layers_paths
+from unweaver.build.layer_rows import (
+    encode_features,
+    init_worker,
+    parallel_layer_rows,
+    point_wkb,
+    read_layer_rows,
+)
+from unweaver.build.node_staging import NodeStaging
+from unweaver.build.update_graph import update_graph
 from unweaver.exceptions import MissingLayersError
+from unweaver.geopackage.feature_table import hilbert_order
+from unweaver.network_adapters import GeoPackageNetwork
+from unweaver.io import estimate_feature_count
+from unweaver.weight import precalculate_weights
 
 from .constants import BUILD_PATH
 
@@ -16,3 +40,210 @@ def test_get_layers_paths():
 def test_build_graph(built_G):
     # TODO: check output
     pass
+
+
+def test_estimate_feature_count():
+    path = get_layers_paths(BUILD_PATH)[0]
+    with fiona.open(path) as handle:
+        n = len(handle)
+    assert estimate_feature_count(path) == n
+    # Estimated from the first 10 kB
+    assert 0.5 * n < estimate_feature_count(path, sample_size=10000) < 2 * n
+
+
+def test_encode_features():
+    feature = {
+        "type": "Feature",
+        "properties": {"fid": 1, "incline": 0.1, "width": None},
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [(-122.3, 47.6), (-122.31, 47.61)],
+        },
+    }
+    header = b"GP\x00\x01\xe6\x10\x00\x00"
+    (edge_columns, edge_rows), (_, node_rows), fingerprints = encode_features(
+        [feature], "layer", 7, ["incline"], header
+    )
+    assert edge_columns == ["_u", "_v", "incline", "geom", "_layer"]
+    forward, reverse = edge_rows
+    assert forward[:3] == ("-122.3, 47.6", "-122.31, 47.61", 0.1)
+    assert reverse[:3] == ("-122.31, 47.61", "-122.3, 47.6", -0.1)
+    assert forward[3] == header + geomet.wkb.dumps(feature["geometry"])
+    assert [n for n, _ in node_rows] == ["-122.3, 47.6", "-122.31, 47.61"]
+    assert fingerprints == [
+        (
+            "layer",
+            feature_fingerprint("layer", feature),
+            "-122.3, 47.6",
+            "-122.31, 47.61",
+        )
+    ]
+
+
+def test_feature_fingerprint():
+    feature = {
+        "properties": {"incline": 0.1, "width": 2},
+        "geometry": {"coordinates": [(-122.3, 47.6), (-122.31, 47.61)]},
+    }
+    fingerprint = feature_fingerprint("layer", feature)
+    reordered = {**feature, "properties": {"width": 2, "incline": 0.1}}
+    assert feature_fingerprint("layer", reordered) == fingerprint
+    assert feature_fingerprint("other", feature) != fingerprint
+    changed = {**feature, "properties": {"incline": 0.2, "width": 2}}
+    assert feature_fingerprint("layer", changed) != fingerprint
+    moved = {
+        **feature,
+        "geometry": {"coordinates": [(-122.3, 47.6), (-122.32, 47.61)]},
+    }
+    assert feature_fingerprint("layer", moved) != fingerprint
+
+
+def _flatten(layer_rows):
+    # Chunks may be split differently (and so have different columns):
+    # compare the non-null values of rows
+    def as_dicts(columns, rows):
+        return [
+            {c: value for c, value in zip(columns, row) if value is not None}
+            for row in rows
+        ]
+
+    edges = []
+    nodes = []
+    fingerprints = []
+    for edge_rows, node_rows, fingerprint_rows in layer_rows:
+        edges.extend(as_dicts(*edge_rows))
+        nodes.extend(as_dicts(*node_rows))
+        fingerprints.extend(fingerprint_rows)
+    return edges, nodes, fingerprints
+
+
+def test_parallel_layer_rows():
+    paths = get_layers_paths(BUILD_PATH)
+    header = b"GP\x00\x01\xe6\x10\x00\x00"
+    rows = [
+        chunk
+        for path in paths
+        for chunk in read_layer_rows(path, 7, ["incline"], header, 10)
+    ]
+    with multiprocessing.Pool(
+        2, initializer=init_worker, initargs=(7, ["incline"], 10)
+    ) as pool:
+        parallel_rows = list(parallel_layer_rows(pool, 2, paths, header))
+    assert len(parallel_rows) > 2
+    assert _flatten(parallel_rows) == _flatten(rows)
+
+
+def test_build_graph_bulk_load(built_G, tmp_path):
+    shutil.copytree(os.path.join(BUILD_PATH, "layers"), tmp_path / "layers")
+    G = build_graph(
+        str(tmp_path),
+        precision=7,
+        changes_sign=("incline",),
+        bulk_load=True,
+        vacuum=True,
+    )
+    assert sorted((u, v) for u, v, d in G.iter_edges()) == sorted(
+        (u, v) for u, v, d in built_G.iter_edges()
+    )
+    assert len(G) == len(built_G)
+    lon, lat = -122.3130814, 47.6583887
+    assert list(G.network.edges.dwithin_edges(lon, lat, 10))
+
+
+def test_hilbert_order():
+    # A 4x4 grid of points, in random order
+    bounds = [(i, i % 4, i % 4, i // 4, i // 4) for i in range(16)]
+    random.Random(0).shuffle(bounds)
+    ids = [b[0] for b in hilbert_order(bounds)]
+    assert ids[0] == 0
+    # Consecutive points are neighbors on the grid
+    for a, b in zip(ids, ids[1:]):
+        assert abs(a % 4 - b % 4) + abs(a // 4 - b // 4) == 1
+
+
+def test_node_staging(tmp_path):
+    network = GeoPackageNetwork(str(tmp_path / "graph.gpkg"))
+    header = network.nodes._gp_header
+    staging = NodeStaging(network.nodes, max_size=2)
+    staging.add([("a", header + point_wkb((0, 0)))])
+    staging.add([("b", header + point_wkb((1, 1)))])
+    # Spilled: more than 2 distinct nodes
+    staging.add(
+        [("a", header + point_wkb((0, 1))), ("c", header + point_wkb((3, 3)))]
+    )
+    staging.add([("c", header + point_wkb((2, 2)))])
+    staging.write()
+
+    with network.gpkg.connect() as conn:
+        rows = conn.execute("SELECT _n FROM nodes ORDER BY _n").fetchall()
+    assert [row["_n"] for row in rows] == ["a", "b", "c"]
+    # The last geometry of a node wins
+    assert network.nodes.get_node("a")["geom"]["coordinates"] == [0, 1]
+    assert network.nodes.get_node("c")["geom"]["coordinates"] == [2, 2]
+
+
+def _project(directory):
+    # A copy of the example project, with a graph that has weights
+    os.makedirs(directory / "layers")
+    for path in glob.glob(os.path.join(BUILD_PATH, "*.*")):
+        shutil.copy(path, directory)
+    shutil.copy(get_layers_paths(BUILD_PATH)[0], directory / "layers")
+    with open(get_layers_paths(BUILD_PATH)[0]) as f:
+        return json.load(f)
+
+
+def _graph_rows(G):
+    with G.network.gpkg.connect() as conn:
+        edges = conn.execute(
+            "SELECT _u, _v, _layer, incline, _weight_distance, geom FROM edges"
+        ).fetchall()
+        nodes = conn.execute("SELECT _n FROM nodes").fetchall()
+        n_rtree = conn.execute(
+            "SELECT COUNT(*) c FROM rtree_edges_geom"
+        ).fetchone()["c"]
+    edges = sorted(tuple(row.values()) for row in edges)
+    return edges, sorted(row["_n"] for row in nodes), n_rtree
+
+
+def test_update_graph(tmp_path):
+    incremental = tmp_path / "incremental"
+    rebuilt = tmp_path / "rebuilt"
+    layer = _project(incremental)
+    build_graph(str(incremental), changes_sign=["incline"])
+    precalculate_weights(str(incremental))
+
+    # Remove one feature, change another and add a new one
+    features = layer["features"]
+    del features[0]
+    features[1]["properties"]["incline"] = 0.5
+    features.append(
+        {
+            "type": "Feature",
+            "properties": {"footway": "sidewalk", "length": 1000.0},
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [
+                    features[2]["geometry"]["coordinates"][0],
+                    [-122.3, 47.65],
+                ],
+            },
+        }
+    )
+    for directory in (incremental, rebuilt):
+        if directory == rebuilt:
+            _project(directory)
+        with open(directory / "layers" / "uw.geojson", "w") as f:
+            json.dump(layer, f)
+
+    G = update_graph(str(incremental), changes_sign=["incline"])
+    G_rebuilt = build_graph(str(rebuilt), changes_sign=["incline"])
+    precalculate_weights(str(rebuilt))
+    assert _graph_rows(G) == _graph_rows(G_rebuilt)
+    assert BuildMetadata(G.network).fingerprints("uw") == BuildMetadata(
+        G_rebuilt.network
+    ).fingerprints("uw")
+
+    # Nothing changed: nothing is written
+    fids = G.network.edges.primary_key_range()
+    G = update_graph(str(incremental), changes_sign=["incline"])
+    assert G.network.edges.primary_key_range() == fids
@@ -1,3 +1,6 @@
+from collections import Counter
+
+import pytest
 from shapely.geometry import LineString, Point
 
 from unweaver.candidates import (
@@ -5,13 +8,147 @@ from unweaver.candidates import (
     is_end_node,
     is_start_node,
     new_edge,
+    overlay_edges,
     reverse_edge,
+    snap_points,
     waypoint_candidates,
 )
+from unweaver.geo import distance_to_geometry, meters_per_degree
 from unweaver.graph import ProjectedNode
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.network_adapters import EdgeIndex
 from unweaver.utils import haversine
 
-from .constants import BOOKSTORE_POINT, EXAMPLE_NODE
+from .constants import BOOKSTORE_POINT, CAFE_POINT, EXAMPLE_NODE
+
+
+def test_nearest_edges(built_G):
+    lon, lat = BOOKSTORE_POINT
+    scale = meters_per_degree(lat)
+    # Every edge, by distance
+    expected = sorted(
+        (distance_to_geometry(lon, lat, d["geom"], scale), d["fid"])
+        for u, v, d in built_G.iter_edges()
+    )
+    for k, max_distance in ((1, 30), (4, 30), (10, 100), (4, 5)):
+        edges = built_G.network.edges.nearest_edges(lon, lat, k, max_distance)
+        fids = [d["fid"] for u, v, d in edges]
+        assert (
+            fids
+            == [fid for distance, fid in expected if distance <= max_distance][
+                :k
+            ]
+        )
+
+
+def test_edge_index(built_G):
+    edge_index = EdgeIndex.from_network(built_G.network, cell_size=20)
+    assert edge_index.number_of_segments >= built_G.size()
+    assert edge_index.nbytes > 0
+    edges = built_G.network.edges
+    for lon, lat in (BOOKSTORE_POINT, CAFE_POINT, (-122.3, 47.7)):
+        for k, max_distance in ((1, 30), (4, 30), (10, 100)):
+            expected = edges.nearest(lon, lat, k, max_distance)
+            found = edge_index.nearest(lon, lat, k, max_distance)
+            assert [fid for fid, _ in found] == [
+                row["fid"] for row, _ in expected
+            ]
+            for (_, distance), (_, expected_distance) in zip(found, expected):
+                assert abs(distance - expected_distance) < 1e-6
+
+    G = DiGraphGPKGView(
+        path=built_G.network.gpkg.path, read_only=True, edge_index=edge_index
+    )
+    assert G.network.edges.nearest_edges(
+        *BOOKSTORE_POINT, 4
+    ) == built_G.network.edges.nearest_edges(*BOOKSTORE_POINT, 4)
+
+
+def _near_points():
+    # Points around the example's landmarks, some close to one another
+    points = []
+    for lon, lat in (BOOKSTORE_POINT, CAFE_POINT):
+        for i in range(-2, 3):
+            for j in range(-2, 3):
+                points.append((lon + i * 0.0002, lat + j * 0.0001))
+    return points
+
+
+def test_nearest_edges_many(built_G):
+    points = _near_points()
+    edges = built_G.network.edges
+    expected = [edges.nearest_edges(lon, lat, 4, 30) for lon, lat in points]
+    assert edges.nearest_edges_many(points, 4, 30) == expected
+    assert edges.nearest_edges_many(points, 4, 30, tile_size=1) == expected
+
+    edge_index = EdgeIndex.from_network(built_G.network)
+    G = DiGraphGPKGView(
+        path=built_G.network.gpkg.path, read_only=True, edge_index=edge_index
+    )
+    found = G.network.edges.nearest_edges_many(points, 4, 30)
+    # The index may order edges with (nearly) tied distances differently
+    assert [{d["fid"] for u, v, d in e} for e in found] == [
+        {d["fid"] for u, v, d in e} for e in expected
+    ]
+
+
+def test_snap_points(built_G):
+    def edge_filter(u, v, d):
+        if d["footway"] == "sidewalk":
+            return d["length"]
+        return None
+
+    points = _near_points()
+    for context in ("origin", "destination", "both"):
+        nodes = snap_points(
+            built_G, points, edge_filter=edge_filter, context=context
+        )
+        for i, ((lon, lat), node) in enumerate(zip(points, nodes)):
+            candidates = waypoint_candidates(
+                built_G, lon, lat, 4, node_id=f"-{i + 1}"
+            )
+            expected = choose_candidate(
+                built_G, candidates, context, edge_filter
+            )
+            assert node == expected
+        assert any(node is not None for node in nodes)
+
+
+def test_snap_points_filter_calls(built_G):
+    calls = []
+
+    def edge_filter(u, v, d):
+        calls.append((u, v))
+        return None
+
+    points = _near_points()
+    nodes = snap_points(built_G, points, edge_filter=edge_filter)
+    assert nodes == [None for _ in points]
+    # Every candidate edge is filtered at most once, and so is the reverse
+    # (with inverted attributes) of every candidate edge
+    assert calls
+    assert max(Counter(calls).values()) <= 2
+
+
+def test_intersects(built_G):
+    lon, lat = BOOKSTORE_POINT
+    bbox = (lon - 0.001, lat - 0.001, lon + 0.001, lat + 0.001)
+    edges = built_G.network.edges
+    expected = {fid for fid, *bounds in edges._rtree_bounds(*bbox)}
+    assert expected
+    rows = list(edges.intersects_edges(*bbox))
+    assert {d["fid"] for u, v, d in rows} == expected
+    assert all(d["geom"]["type"] == "LineString" for u, v, d in rows)
+
+    # Projected, with geometries left encoded
+    rows = list(edges.intersects_edges(*bbox, ["geom"], deserialize=False))
+    assert {d["fid"] for u, v, d in rows} == expected
+    assert all(set(d) == {"fid", "geom"} for u, v, d in rows)
+    assert all(isinstance(d["geom"], bytes) for u, v, d in rows)
+
+    nodes = list(built_G.network.nodes.intersects_nodes(*bbox, []))
+    assert nodes
+    assert all(set(d) == {"fid"} for n, d in nodes)
 
 
 def test_waypoint_candidates(built_G):
@@ -22,8 +159,6 @@ def test_waypoint_candidates(built_G):
         BOOKSTORE_POINT[1],
         4,
         dwithin=10,
-        invert=("incline",),
-        flip=None,
     )
     candidates = list(candidates)
     assert len(candidates) > 0
@@ -34,8 +169,10 @@ def test_waypoint_candidates(built_G):
 
     # Expect there to be two edges that starts at node "-1"
     assert len(candidate.edges_out) == 2
-    # Expect both to have fid 49
-    assert all([e[2]["fid"] == 49 for e in candidate.edges_out])
+    # Expect them to be parts of the edge (fid 49) and of its reverse
+    (_, v, d), (_, u, d_rev) = candidate.edges_out
+    assert d["fid"] == 49
+    assert d_rev["fid"] == built_G[v][u]["fid"]
     # Both should be sidewalks
     assert all([e[2]["footway"] == "sidewalk" for e in candidate.edges_out])
     # Get their lengths
@@ -110,3 +247,26 @@ def test_choose_candidate(built_G):
     )
     choose_candidate(built_G, [node_candidate], "origin")
     choose_candidate(built_G, [node_candidate], "destination")
+
+
+def test_overlay_edges(built_G):
+    lon, lat = BOOKSTORE_POINT
+    nodes = []
+    for i, point in enumerate(((lon, lat), (lon, lat - 0.0001))):
+        candidates = waypoint_candidates(built_G, *point, 4, node_id=f"-{i}")
+        nodes.append(choose_candidate(built_G, candidates, "both"))
+    (u, v) = (nodes[0].edges_in[0][0], nodes[0].edges_out[0][1])
+    assert {u, v} == {nodes[1].edges_in[0][0], nodes[1].edges_out[0][1]}
+
+    # Alone, each node is connected only to the ends of the edge
+    edges = overlay_edges(built_G, nodes[:1])
+    assert edges == [*nodes[0].edges_in, *nodes[0].edges_out]
+
+    # Together, the edge is split at both nodes
+    edges = overlay_edges(built_G, [EXAMPLE_NODE, *nodes])
+    pairs = {(e[0], e[1]) for e in edges}
+    assert len(edges) == len(pairs) == 6
+    assert ("-0", "-1") in pairs and ("-1", "-0") in pairs
+    # Both ways along the whole edge
+    total = sum(d["length"] for a, b, d in edges)
+    assert total == pytest.approx(2 * built_G[u][v]["length"], abs=0.01)
@@ -0,0 +1,50 @@
+import pytest
+
+from unweaver.contraction import ContractionHierarchy, contract
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.dijkstra import dijkstra
+from unweaver.shortest_paths.shortest_path import shortest_path_multi
+
+from .constants import EXAMPLE_NODE
+
+
+def weight_fun(u, v, d):
+    return d.get("_weight_distance", None)
+
+
+def test_contract(built_G_weighted):
+    hierarchy = contract(built_G_weighted, "_weight_distance")
+    hierarchy.write(built_G_weighted.network, "distance")
+    assert ContractionHierarchy.exists(built_G_weighted.network, "distance")
+
+    loaded = ContractionHierarchy.from_network(
+        built_G_weighted.network, "distance"
+    )
+    assert loaded.number_of_edges == hierarchy.number_of_edges
+
+    G = DiGraphGPKGView(network=built_G_weighted.network)
+    for target in loaded.node_ids[:50]:
+        cost, path, _ = dijkstra(G, EXAMPLE_NODE, target, weight_fun)
+        ch_cost, ch_path = loaded.search({EXAMPLE_NODE: 0}, {target: 0})
+        assert ch_cost == pytest.approx(cost)
+        assert ch_path[0] == EXAMPLE_NODE
+        assert ch_path[-1] == target
+
+    ContractionHierarchy.drop(built_G_weighted.network, "distance")
+    assert not ContractionHierarchy.exists(
+        built_G_weighted.network, "distance"
+    )
+
+
+def test_shortest_path_hierarchy(built_G_weighted, test_waypoint_nodes):
+    hierarchy = contract(built_G_weighted, "_weight_distance")
+    G = DiGraphGPKGView(network=built_G_weighted.network)
+
+    cost, path, edges = shortest_path_multi(G, test_waypoint_nodes, weight_fun)
+    ch_cost, ch_path, ch_edges = shortest_path_multi(
+        G, test_waypoint_nodes, weight_fun, hierarchy=hierarchy
+    )
+
+    assert ch_cost == pytest.approx(cost)
+    assert ch_path == path
+    assert len(ch_edges) == len(edges)
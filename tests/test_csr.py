@@ -0,0 +1,49 @@
+from networkx.algorithms.shortest_paths import single_source_dijkstra
+
+from unweaver.graphs import DiGraphCSRView, DiGraphGPKGView
+
+from .constants import cost_fun, EXAMPLE_NODE
+from .test_weight import TEST_EDGES
+
+
+def test_csr_edges(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    G_csr = DiGraphCSRView(network=built_G.network)
+
+    assert G_csr.size() == G.size()
+    for u, v in TEST_EDGES:
+        assert dict(G_csr[u][v]) == dict(G[u][v])
+        assert set(G_csr.successors(u)) == set(G.successors(u))
+        assert set(G_csr.predecessors(v)) == set(G.predecessors(v))
+
+
+def test_csr_nodes(built_G):
+    G_csr = DiGraphCSRView(network=built_G.network)
+
+    assert EXAMPLE_NODE in G_csr
+    assert "not a node" not in G_csr
+    node = G_csr.nodes[EXAMPLE_NODE]
+    assert node["geom"] == built_G.nodes[EXAMPLE_NODE]["geom"]
+
+
+def test_csr_dijkstra(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    G_csr = DiGraphCSRView(network=built_G.network)
+
+    distances, _ = single_source_dijkstra(
+        G, EXAMPLE_NODE, cutoff=400, weight=cost_fun
+    )
+    distances_csr, _ = single_source_dijkstra(
+        G_csr, EXAMPLE_NODE, cutoff=400, weight=cost_fun
+    )
+
+    assert distances_csr == distances
+
+
+def test_csr_edges_bunch(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    G_csr = DiGraphCSRView(network=built_G.network)
+
+    expected = [(u, v, dict(G[u][v])) for u, v in TEST_EDGES]
+    assert G.edges_bunch(TEST_EDGES) == expected
+    assert G_csr.edges_bunch(TEST_EDGES) == expected
@@ -1,6 +1,14 @@
 from shapely.geometry import LineString
 
-from unweaver.geo import cut
+from unweaver.geo import (
+    cut,
+    decode_polyline,
+    distance_to_bounds,
+    distance_to_geometry,
+    encode_polyline,
+    meters_per_degree,
+)
+from unweaver.utils import haversine
 
 
 def test_cut():
@@ -25,3 +33,45 @@ def test_cut():
     ls2 = LineString(l2)
     assert ls1.length == 0.5
     assert ls2.length == 0.5
+
+
+def test_distance_to_geometry():
+    lon, lat = -122.3, 47.6
+    scale = meters_per_degree(lat)
+    # 10 m north of the middle of an east-west line
+    dlat = 10 / scale[1]
+    dlon = 50 / scale[0]
+    line = {
+        "type": "LineString",
+        "coordinates": [[lon - dlon, lat - dlat], [lon + dlon, lat - dlat]],
+    }
+    assert abs(distance_to_geometry(lon, lat, line, scale) - 10) < 1e-6
+    # Nearest to the end of the line
+    east = lon + 2 * dlon
+    expected = haversine([(east, lat - dlat), (lon + dlon, lat - dlat)])
+    distance = distance_to_geometry(east, lat - dlat, line, scale)
+    assert abs(distance - expected) < 0.01
+    point = {"type": "Point", "coordinates": [lon, lat - dlat]}
+    assert abs(distance_to_geometry(lon, lat, point, scale) - 10) < 1e-6
+
+
+def test_distance_to_bounds():
+    lon, lat = -122.3, 47.6
+    scale = meters_per_degree(lat)
+    bounds = (lon - 1, lon + 1, lat - 1, lat + 1)
+    assert distance_to_bounds(lon, lat, bounds, scale) == 0
+    bounds = (lon + 10 / scale[0], lon + 1, lat - 1, lat + 1)
+    assert abs(distance_to_bounds(lon, lat, bounds, scale) - 10) < 1e-6
+
+
+def test_polyline():
+    # The example of the encoded polyline algorithm's documentation
+    coordinates = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+    encoded = encode_polyline(coordinates, precision=5)
+    assert encoded == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline(encoded, precision=5) == coordinates
+
+    coordinates = [(-122.313108, 47.661011, 3.0), (-122.3131, 47.66)]
+    decoded = decode_polyline(encode_polyline(coordinates))
+    assert decoded == [(-122.313108, 47.661011), (-122.3131, 47.66)]
+    assert encode_polyline([]) == ""
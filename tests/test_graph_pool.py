@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+
+import pytest
+
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.server.graph_pool import GraphPool
+
+from .test_weight import TEST_EDGES
+
+
+def test_graph_pool_reuse(built_G):
+    pool = GraphPool(built_G.network.path, size=2)
+
+    with pool.graph() as G:
+        # Nested acquisition by the same thread returns the same handle
+        with pool.graph() as G_nested:
+            assert G_nested is G
+        u, v = TEST_EDGES[0]
+        assert dict(G[u][v]) == dict(built_G[u][v])
+
+    with pool.graph() as G_again:
+        assert G_again is G
+
+    handles = []
+
+    def borrow() -> None:
+        with pool.graph() as G:
+            handles.append(G)
+
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(handles) == 4
+    assert len(set(id(G) for G in handles)) <= 2
+
+
+def test_graph_pool_read_only(built_G):
+    pool = GraphPool(built_G.network.path, size=1)
+
+    with pool.graph() as G:
+        with pytest.raises(sqlite3.OperationalError):
+            with G.network.gpkg.connect() as conn:
+                conn.execute("DELETE FROM edges")
+
+
+def test_read_only_view(built_G):
+    G = DiGraphGPKGView(path=built_G.network.path, read_only=True)
+
+    assert G.size() == built_G.size()
+    assert G.network.edges._get_column_names() == (
+        built_G.network.edges._get_column_names()
+    )
+    for u, v in TEST_EDGES:
+        assert dict(G[u][v]) == dict(built_G[u][v])
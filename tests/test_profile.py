@@ -0,0 +1,53 @@
+import pytest
+
+from unweaver.profile import ProfileSchema
+
+
+def _load(tmp_path, source):
+    (tmp_path / "cost-test.py").write_text(source)
+    schema = ProfileSchema(context={"working_path": str(tmp_path)})
+    return schema.load({"id": "test", "cost_function": "cost-test.py"})
+
+
+def test_vectorized_cost_function(tmp_path):
+    profile = _load(
+        tmp_path,
+        "def cost_fun_generator(G):\n"
+        "    return lambda u, v, d: d.get('length')\n",
+    )
+    assert "vectorized_cost_function" not in profile
+
+    profile = _load(
+        tmp_path,
+        "def cost_fun_generator(G):\n"
+        "    return lambda u, v, d: d.get('length')\n"
+        "def vectorized_cost_fun_generator(G):\n"
+        "    return lambda columns: columns['length']\n",
+    )
+    cost_function = profile["vectorized_cost_function"](None)
+    assert cost_function({"length": [1.0]}) == [1.0]
+
+
+def test_cost_function_module_loaded_once(tmp_path):
+    log = tmp_path / "loads.txt"
+    _load(
+        tmp_path,
+        f"with open({str(log)!r}, 'a') as f:\n"
+        "    f.write('loaded\\n')\n"
+        "def cost_fun_generator(G):\n"
+        "    return lambda u, v, d: d.get('length')\n",
+    )
+    assert log.read_text().splitlines() == ["loaded"]
+
+
+def test_cost_function_module_errors(tmp_path):
+    # Errors while loading the module are not mistaken for a missing
+    # vectorized cost function
+    with pytest.raises(AttributeError):
+        _load(
+            tmp_path,
+            "import os\n"
+            "os.missing_attribute\n"
+            "def cost_fun_generator(G):\n"
+            "    return lambda u, v, d: d.get('length')\n",
+        )
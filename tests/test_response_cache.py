@@ -0,0 +1,33 @@
+import os
+
+from unweaver.server.response_cache import ResponseCache
+
+
+def test_response_cache(tmp_path):
+    path = tmp_path / "graph.gpkg"
+    path.write_text("v1")
+
+    cache = ResponseCache(str(path), max_entries=2, ttl=None)
+    cache.put("a", ("Ok", 1))
+    cache.put("b", ("Ok", 2))
+    assert cache.get("a") == ("Ok", 1)
+    # "b" is the least recently used result
+    cache.put("c", ("Ok", 3))
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    # A rebuilt graph invalidates every result
+    path.write_text("version 2")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_response_cache_ttl(tmp_path):
+    path = tmp_path / "graph.gpkg"
+    path.write_text("v1")
+
+    cache = ResponseCache(str(path), ttl=-1)
+    cache.put("a", ("Ok", 1))
+    assert cache.get("a") is None
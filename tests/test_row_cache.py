@@ -0,0 +1,46 @@
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.network_adapters import RowCache
+
+from .constants import EXAMPLE_NODE
+from .test_weight import TEST_EDGES
+
+
+def test_row_cache_lru():
+    row = {"length": 1.0, "geom": {"coordinates": [[0.0, 0.0], [1.0, 1.0]]}}
+    cache = RowCache(max_bytes=1)
+    cache.put("a", row)
+    # Larger than the whole cache
+    assert "a" not in cache
+
+    cache = RowCache()
+    cache.put("a", row)
+    size = cache.nbytes
+    cache.max_bytes = 2 * size
+    cache.put("b", row)
+    assert cache.get("a") == row
+    # "b" is now the least recently used row
+    cache.put("c", row)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.fetch("c", lambda: {}) == row
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 1,
+        "entries": 2,
+        "bytes": 2 * size,
+    }
+
+
+def test_cached_view(built_G):
+    cache = RowCache()
+    G = DiGraphGPKGView(path=built_G.network.path, read_only=True, cache=cache)
+
+    for _ in range(2):
+        assert dict(G.nodes[EXAMPLE_NODE]) == dict(built_G.nodes[EXAMPLE_NODE])
+        for u, v in TEST_EDGES:
+            assert dict(G[u][v]) == dict(built_G[u][v])
+            assert set(G.successors(u)) == set(built_G.successors(u))
+        assert G.edges_bunch(TEST_EDGES) == built_G.edges_bunch(TEST_EDGES)
+
+    assert cache.hits > 0
+    assert cache.misses == len(cache)
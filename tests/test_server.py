@@ -1,6 +1,9 @@
 # TODO: actually run the server via the CLI
+import json
+
 import pytest
 
+from unweaver.geo import decode_polyline
 from unweaver.server import setup_app
 
 from .constants import BUILD_PATH, BOOKSTORE_POINT, CAFE_POINT
@@ -58,7 +61,10 @@ class TestServer:
             e["properties"]["length"] for e in data["edges"]["features"]
         )
 
-        assert total_distance - 49.62 < 0.1
+        # The whole 19.62-meter half edge and 10.38 meters beyond it, plus 30
+        # meters along the other half edge: the half edges' precalculated
+        # weights are in proportion to their lengths.
+        assert total_distance - 60.0 < 0.1
 
         # # TODO: check other properties?
 
@@ -82,7 +88,7 @@ class TestServer:
         # FIXME: ensure consistency between distance calculations so that this
         # has a smaller margin of error. 1e-3 is somewhat large since we
         # eventually aggregate tens to hundreds of edges.
-        assert total_distance == 83.1
+        assert total_distance == 102.0
 
         # # TODO: check other properties?
 
@@ -112,3 +118,209 @@ class TestServer:
         # # TODO: check other properties?
 
         # TODO: check rounding on geometry outputs
+
+    def test_response_cache(self, client):
+        query = {
+            "lon1": BOOKSTORE_POINT[0],
+            "lat1": BOOKSTORE_POINT[1],
+            "lon2": CAFE_POINT[0],
+            "lat2": CAFE_POINT[1],
+        }
+        first = client.get("/shortest_path/distance.json", query_string=query)
+
+        # Snaps to the same place, so reuses the first route
+        query["lon2"] += 1e-6
+        second = client.get("/shortest_path/distance.json", query_string=query)
+
+        assert second.json["total_cost"] == first.json["total_cost"]
+        assert second.json["edges"] == first.json["edges"]
+        # ...but not the first request's destination
+        destination = second.json["destination"]["geometry"]["coordinates"]
+        assert destination[0] == query["lon2"]
+
+    def test_cost_matrix(self, client):
+        points = [list(BOOKSTORE_POINT), list(CAFE_POINT)]
+        # Cross-origin JSON bodies are preflighted
+        resp = client.options("/cost_matrix/distance.json")
+        assert resp.status_code == 200
+        assert "POST" in resp.headers["Access-Control-Allow-Methods"]
+
+        resp = client.post(
+            "/cost_matrix/distance.json",
+            json={"origins": points, "destinations": points[::-1]},
+        )
+        assert resp.status_code == 200
+        data = resp.json
+        assert data["status"] == "Ok"
+        assert len(data["costs"]) == 2
+        assert all(len(row) == 2 for row in data["costs"])
+
+        resp = client.get(
+            "/shortest_path/distance.json",
+            query_string={
+                "lon1": BOOKSTORE_POINT[0],
+                "lat1": BOOKSTORE_POINT[1],
+                "lon2": CAFE_POINT[0],
+                "lat2": CAFE_POINT[1],
+            },
+        )
+        assert data["costs"][0][0] == pytest.approx(resp.json["total_cost"])
+
+    def test_route(self, client):
+        points = [
+            list(BOOKSTORE_POINT),
+            list(CAFE_POINT),
+            list(BOOKSTORE_POINT),
+        ]
+        resp = client.post("/route/distance.json", json={"waypoints": points})
+        assert resp.status_code == 200
+        data = resp.json
+        assert data["status"] == "Ok"
+        assert len(data["legs"]) == 2
+        assert data["total_cost"] == pytest.approx(
+            sum(leg["total_cost"] for leg in data["legs"])
+        )
+        coordinates = data["geometry"]["coordinates"]
+        assert coordinates[0] == coordinates[-1]
+
+        resp = client.get(
+            "/shortest_path/distance.json",
+            query_string={
+                "lon1": BOOKSTORE_POINT[0],
+                "lat1": BOOKSTORE_POINT[1],
+                "lon2": CAFE_POINT[0],
+                "lat2": CAFE_POINT[1],
+            },
+        )
+        assert data["legs"][0]["total_cost"] == pytest.approx(
+            resp.json["total_cost"]
+        )
+
+        resp = client.post(
+            "/route/distance.json", json={"waypoints": [points[0]]}
+        )
+        assert resp.status_code == 422
+
+    def test_trip(self, client):
+        lon, lat = BOOKSTORE_POINT
+        points = [
+            [lon, lat],
+            list(CAFE_POINT),
+            [lon, lat - 0.001],
+            [lon, lat - 0.002],
+        ]
+        resp = client.post("/trip/distance.json", json={"stops": points})
+        assert resp.status_code == 200
+        data = resp.json
+        assert data["status"] == "Ok"
+        assert data["order"][0] == 0
+        assert sorted(data["order"]) == [0, 1, 2, 3]
+        # A round trip
+        assert len(data["legs"]) == 4
+        coordinates = data["geometry"]["coordinates"]
+        assert coordinates[0] == coordinates[-1]
+
+        resp = client.post(
+            "/trip/distance.json", json={"stops": points, "roundtrip": False}
+        )
+        assert len(resp.json["legs"]) == 3
+        assert resp.json["total_cost"] < data["total_cost"]
+
+    def test_reachable_tree_multi(self, client):
+        points = [list(BOOKSTORE_POINT), list(CAFE_POINT)]
+        resp = client.post(
+            "/reachable_tree_multi/distance.json",
+            json={"origins": points, "max_cost": 30},
+        )
+        assert resp.status_code == 200
+        data = resp.json
+        assert data["status"] == "Ok"
+        assert len(data["origins"]) == 2
+        labels = {
+            feature["properties"]["origin"]
+            for feature in data["node_costs"]["features"]
+        }
+        assert labels == {0, 1}
+
+        # The same as the reachable tree of each origin, combined
+        total = 0
+        for lon, lat in points:
+            single = client.get(
+                "/reachable_tree/distance.json",
+                query_string={"lon": lon, "lat": lat, "max_cost": 30},
+            )
+            total += sum(
+                e["properties"]["length"]
+                for e in single.json["edges"]["features"]
+            )
+        total_multi = sum(
+            e["properties"]["length"] for e in data["edges"]["features"]
+        )
+        assert total_multi == pytest.approx(total, abs=0.1)
+
+        resp = client.post(
+            "/reachable_tree_multi/distance.json",
+            json={"origins": points, "max_cost": 30, "initial_costs": [0]},
+        )
+        assert resp.status_code == 422
+
+    def test_isochrone(self, client):
+        query = {
+            "lon": BOOKSTORE_POINT[0],
+            "lat": BOOKSTORE_POINT[1],
+            "max_cost": 200,
+            "bands": 2,
+        }
+        resp = client.get("/isochrone/distance.json", query_string=query)
+        assert resp.status_code == 200
+        data = resp.json
+        assert data["status"] == "Ok"
+        features = data["isochrones"]["features"]
+        assert [f["properties"]["cost"] for f in features] == [200, 100]
+        assert all(
+            f["geometry"]["type"] in ("Polygon", "MultiPolygon")
+            for f in features
+        )
+
+        # Much smaller than the reachable tree
+        tree = client.get("/reachable_tree/distance.json", query_string=query)
+        assert len(resp.data) < len(tree.data) / 2
+
+    def test_streamed_tree(self, client):
+        query = {
+            "lon": BOOKSTORE_POINT[0],
+            "lat": BOOKSTORE_POINT[1],
+            "max_cost": 200,
+        }
+        resp = client.get("/reachable_tree/distance.json", query_string=query)
+        assert resp.status_code == 200
+        assert resp.is_streamed
+        assert resp.mimetype == "application/json"
+        data = resp.json
+        assert data["status"] == "Ok"
+        assert data["edges"]["features"]
+        assert data["node_costs"]["features"]
+
+        resp = client.get(
+            "/reachable_tree/distance.json",
+            query_string=query,
+            headers={"Accept": "application/vnd.unweaver.polyline+json"},
+        )
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/vnd.unweaver.polyline+json"
+        encoded = json.loads(resp.data)
+        assert len(resp.data) < len(json.dumps(data))
+        features = encoded["edges"]["features"]
+        assert len(features) == len(data["edges"]["features"])
+        for feature, expected in zip(features, data["edges"]["features"]):
+            assert feature["properties"] == expected["properties"]
+            geometry = feature["geometry"]
+            assert geometry["type"] == "LineString"
+            assert "coordinates" not in geometry
+            decoded = decode_polyline(geometry["polyline"])
+            for (x, y), (ex, ey, *_) in zip(
+                decoded, expected["geometry"]["coordinates"]
+            ):
+                assert x == pytest.approx(ex, abs=1e-6)
+                assert y == pytest.approx(ey, abs=1e-6)
+        assert encoded["node_costs"] == data["node_costs"]
@@ -0,0 +1,89 @@
+from networkx.algorithms.shortest_paths import single_source_dijkstra
+import pytest
+
+from unweaver.contraction import contract
+from unweaver.geojson import makePointFeature
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.cost_matrix import cost_matrix, matrix_nodes
+from unweaver.shortest_paths.shortest_path import shortest_path_multi
+
+from ..constants import (
+    BOOKSTORE_POINT,
+    CAFE_POINT,
+    EXAMPLE_NODE,
+    MIDBLOCK_POINT,
+    cost_fun,
+)
+from .test_shortest_path import _one_way, _path_cost
+
+
+def weight_fun(u, v, d):
+    return d.get("_weight_distance", None)
+
+
+def test_cost_matrix(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    distances, _ = single_source_dijkstra(
+        G, EXAMPLE_NODE, cutoff=400, weight=cost_fun
+    )
+    destinations = list(distances)[:20]
+
+    costs = cost_matrix(G, [EXAMPLE_NODE], destinations, cost_fun)
+    assert costs[0] == pytest.approx([distances[n] for n in destinations])
+
+    costs = cost_matrix(
+        G, [EXAMPLE_NODE], destinations, cost_fun, max_cost=100
+    )
+    for n, cost in zip(destinations, costs[0]):
+        if distances[n] > 100:
+            assert cost is None
+        else:
+            assert cost == pytest.approx(distances[n])
+
+
+def test_cost_matrix_waypoints(built_G_weighted):
+    G = DiGraphGPKGView(network=built_G_weighted.network)
+    points = [
+        makePointFeature(*BOOKSTORE_POINT),
+        makePointFeature(*CAFE_POINT),
+    ]
+    origins, destinations = matrix_nodes(G, points, points, weight_fun)
+    assert [n.n for n in origins + destinations] == ["-1", "-2", "-3", "-4"]
+
+    hierarchy = contract(built_G_weighted, "_weight_distance")
+    costs = cost_matrix(G, origins, destinations, weight_fun)
+    ch_costs = cost_matrix(
+        G, origins, destinations, weight_fun, hierarchy=hierarchy
+    )
+
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            cost, _, _ = shortest_path_multi(
+                G, [origin, destination], weight_fun
+            )
+            assert costs[i][j] == pytest.approx(cost)
+            assert ch_costs[i][j] == pytest.approx(cost)
+
+
+def test_cost_matrix_one_way(built_G):
+    # Every entry is the cost of the shortest path between its two points
+    # alone: the temporary edges of other points (e.g. along a one-way edge)
+    # don't open up the way back along the edge
+    G = DiGraphGPKGView(network=built_G.network)
+    _, u, v, one_way = _one_way(G)
+    points = [
+        makePointFeature(*point)
+        for point in [MIDBLOCK_POINT, BOOKSTORE_POINT, CAFE_POINT]
+    ]
+    origins, destinations = matrix_nodes(G, points, points, one_way)
+    origins = [u, v, *origins]
+    destinations = [u, v, *destinations]
+    costs = cost_matrix(G, origins, destinations, one_way)
+
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            cost, _ = _path_cost(G, [origin, destination], one_way)
+            if cost is None:
+                assert costs[i][j] is None
+            else:
+                assert costs[i][j] == pytest.approx(cost)
@@ -0,0 +1,103 @@
+from networkx.algorithms.shortest_paths import single_source_dijkstra
+import pytest
+
+from unweaver.exceptions import NoPathError
+from unweaver.graphs import DiGraphCSRView, DiGraphGPKGView
+from unweaver.shortest_paths.adjacency import SearchAdjacency
+from unweaver.shortest_paths.dijkstra import (
+    astar,
+    bidirectional_dijkstra,
+    dijkstra,
+    multi_source_dijkstra,
+)
+
+from ..constants import cost_fun, EXAMPLE_NODE
+from ..test_weight import TEST_EDGES
+
+
+def test_dijkstra(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    distances, paths = single_source_dijkstra(
+        G, EXAMPLE_NODE, cutoff=400, weight=cost_fun
+    )
+
+    for G_search in (G, DiGraphCSRView(network=built_G.network)):
+        adjacency = SearchAdjacency(G_search)
+        for target, distance in distances.items():
+            for search in (dijkstra, bidirectional_dijkstra):
+                cost, path, edges = search(
+                    adjacency, EXAMPLE_NODE, target, cost_fun
+                )
+                assert cost == pytest.approx(distance)
+                assert path[0] == EXAMPLE_NODE
+                assert path[-1] == target
+                assert [(d["_u"], d["_v"]) for d in edges] == list(
+                    zip(path, path[1:])
+                )
+
+
+def test_dijkstra_overlay(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    u, v = TEST_EDGES[0]
+    d = dict(G[u][v])
+    d["length"] = d["length"] / 2
+    overlay_edges = [(u, "-1", d), ("-1", v, d)]
+    adjacency = SearchAdjacency(G, overlay_edges=overlay_edges)
+
+    cost, path, edges = bidirectional_dijkstra(adjacency, u, "-1", cost_fun)
+    assert cost == pytest.approx(d["length"])
+    assert path == [u, "-1"]
+
+    cost, path, edges = dijkstra(adjacency, "-1", v, cost_fun)
+    assert cost == pytest.approx(d["length"])
+    assert path == ["-1", v]
+
+
+def test_dijkstra_no_path(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    with pytest.raises(NoPathError):
+        bidirectional_dijkstra(G, EXAMPLE_NODE, "not a node", cost_fun)
+
+
+def test_astar(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    distances, _ = single_source_dijkstra(
+        G, EXAMPLE_NODE, cutoff=400, weight=cost_fun
+    )
+
+    adjacency = SearchAdjacency(G)
+    for target, distance in distances.items():
+        cost, path, edges = astar(
+            adjacency, EXAMPLE_NODE, target, cost_fun, cost_per_meter=1
+        )
+        assert cost == pytest.approx(distance)
+        assert path[-1] == target
+
+
+def test_multi_source_dijkstra(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    distances, _ = single_source_dijkstra(
+        G, EXAMPLE_NODE, cutoff=200, weight=cost_fun
+    )
+    other = max(distances, key=distances.get)
+    other_distances, _ = single_source_dijkstra(
+        G, other, cutoff=200, weight=cost_fun
+    )
+
+    # The second source starts with a cost of 10
+    sources = {EXAMPLE_NODE: 0, other: 10}
+    costs, paths, origins = multi_source_dijkstra(G, sources, cost_fun, 200)
+    for n in set(distances) | set(other_distances):
+        from_first = distances.get(n, float("inf"))
+        from_other = other_distances.get(n, float("inf")) + 10
+        if min(from_first, from_other) > 200:
+            assert n not in costs
+            continue
+        assert costs[n] == pytest.approx(min(from_first, from_other))
+        assert paths[n][0] == origins[n]
+        assert paths[n][-1] == n
+        if from_first < from_other:
+            assert origins[n] == EXAMPLE_NODE
+        elif from_other < from_first:
+            assert origins[n] == other
+    assert all(cost <= 200 for cost in costs.values())
@@ -0,0 +1,55 @@
+from dataclasses import asdict
+
+from shapely.geometry import Point, shape
+
+from unweaver.candidates import waypoint_candidates, choose_candidate
+from unweaver.graphs import AugmentedDiGraphGPKGView
+from unweaver.shortest_paths.isochrone import isochrones, reachable_costs
+from unweaver.shortest_paths.reachable_tree import reachable_tree
+
+from ..constants import cost_fun, BOOKSTORE_POINT
+
+
+def _tree(G, max_cost):
+    candidates = waypoint_candidates(G, *BOOKSTORE_POINT, 10)
+    candidate = choose_candidate(G, candidates, "origin", cost_fun)
+    G_aug = AugmentedDiGraphGPKGView.prepare_augmented(G, candidate)
+    nodes, edges = reachable_tree(G_aug, candidate, cost_fun, max_cost)
+    return G_aug, nodes, edges
+
+
+def test_reachable_costs():
+    assert reachable_costs(400, 4) == [100, 200, 300, 400]
+    assert reachable_costs(30, 1) == [30]
+
+
+def test_isochrones(built_G):
+    G_aug, nodes, edges = _tree(built_G, 200)
+    costs = [50, 100, 200]
+    polygons = isochrones(G_aug, nodes, edges, cost_fun, costs, tolerance=0)
+    shapes = [shape(polygon) for polygon in polygons]
+    assert all(s.geom_type in ("Polygon", "MultiPolygon") for s in shapes)
+
+    # Nested, and growing
+    for smaller, larger in zip(shapes, shapes[1:]):
+        assert smaller.area < larger.area
+        assert larger.buffer(1e-9).contains(smaller)
+
+    # Every node is within the polygon of its cost
+    for node in nodes.values():
+        geom = node.geom
+        if not isinstance(geom, dict):
+            # Temporary nodes' geometries are geojson dataclasses
+            geom = asdict(geom)
+        point = Point(geom["coordinates"])
+        for cost, s in zip(costs, shapes):
+            if node.cost <= cost:
+                assert s.buffer(1e-9).contains(point)
+
+    # Simplified polygons have fewer vertices
+    simplified = isochrones(G_aug, nodes, edges, cost_fun, costs, tolerance=5)
+    assert len(str(simplified[-1])) < len(str(polygons[-1]))
+    assert shape(simplified[-1]).area > 0.9 * shapes[-1].area
+
+    # Nothing reachable
+    assert isochrones(G_aug, nodes, [], cost_fun, costs) == [None] * 3
@@ -1,8 +1,16 @@
-from unweaver.shortest_paths.reachable_tree import reachable_tree
-from unweaver.candidates import waypoint_candidates, choose_candidate
+from unweaver.shortest_paths.reachable_tree import (
+    reachable_tree,
+    reachable_tree_multi,
+)
+from unweaver.candidates import (
+    overlay_edges,
+    snap_points,
+    waypoint_candidates,
+    choose_candidate,
+)
 from unweaver.graphs import AugmentedDiGraphGPKGView
 
-from ..constants import cost_fun, BOOKSTORE_POINT
+from ..constants import cost_fun, BOOKSTORE_POINT, CAFE_POINT
 
 
 def test_reachable_tree(built_G):
@@ -19,3 +27,37 @@ def test_reachable_tree(built_G):
 
     # TODO: test output
     reachable_tree(G_aug, candidate, cost_fun, 400)
+
+
+def test_reachable_tree_multi(built_G):
+    candidates = snap_points(
+        built_G, [BOOKSTORE_POINT, CAFE_POINT], edge_filter=cost_fun
+    )
+    G_aug = AugmentedDiGraphGPKGView.from_edges(
+        built_G, overlay_edges(built_G, candidates)
+    )
+    nodes, edges, origins = reachable_tree_multi(
+        G_aug, candidates, cost_fun, 100
+    )
+    assert set(origins) == set(nodes)
+    assert set(origins.values()) == {"-1", "-2"}
+
+    # As good as the nearer of two single-origin trees, labeled by it
+    for i, candidate in enumerate(candidates):
+        G_single = AugmentedDiGraphGPKGView.prepare_augmented(
+            built_G, candidate
+        )
+        single_nodes, single_edges = reachable_tree(
+            G_single, candidate, cost_fun, 100
+        )
+        for key, node in single_nodes.items():
+            if key in nodes and key not in ("-1", "-2"):
+                assert nodes[key].cost <= node.cost + 1e-6
+        nearest = [key for key in nodes if origins[key] == candidate.n]
+        assert nearest
+
+    # Initial costs: the second origin is already beyond max_cost
+    nodes, edges, origins = reachable_tree_multi(
+        G_aug, candidates, cost_fun, 100, initial_costs=[0, 101]
+    )
+    assert set(origins.values()) == {"-1"}
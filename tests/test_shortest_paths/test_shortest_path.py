@@ -1,10 +1,29 @@
+import pytest
+
+from unweaver.contraction import contract
+from unweaver.exceptions import NoPathError
+from unweaver.geojson import makePointFeature
 from unweaver.graphs import DiGraphGPKGView
 from unweaver.shortest_paths.shortest_path import (
+    join_legs,
     shortest_path,
+    shortest_path_legs,
     shortest_path_multi,
+    waypoint_nodes,
+)
+from unweaver.utils import haversine
+
+from ..constants import (
+    BOOKSTORE_POINT,
+    CAFE_POINT,
+    MIDBLOCK_POINT,
+    cost_fun,
+    without_fid,
 )
 
-from ..constants import cost_fun
+
+def weight_fun(u, v, d):
+    return d.get("_weight_distance", None)
 
 
 def test_shortest_path_multi(built_G, test_waypoint_nodes):
@@ -20,3 +39,102 @@ def test_shortest_path(built_G, test_waypoint_nodes):
     cost, path, route = shortest_path(
         G, test_waypoint_nodes[0], test_waypoint_nodes[1], cost_fun
     )
+
+
+def _waypoints(G, points, cost_function):
+    features = [makePointFeature(*point) for point in points]
+    return waypoint_nodes(G, features, cost_function)
+
+
+def test_shortest_path_legs(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    points = [BOOKSTORE_POINT, CAFE_POINT, BOOKSTORE_POINT]
+    nodes = _waypoints(G, points, cost_fun)
+    assert [n.n for n in nodes] == ["-1", "-2", "-3"]
+
+    legs = shortest_path_legs(G, nodes, cost_fun)
+    assert len(legs) == 2
+    for (cost, path, edges), (n1, n2) in zip(legs, zip(nodes, nodes[1:])):
+        assert (path[0], path[-1]) == (n1.n, n2.n)
+        assert len(edges) == len(path) - 1
+        assert cost == pytest.approx(
+            sum(cost_fun(None, None, d) for d in edges)
+        )
+        assert cost == pytest.approx(shortest_path(G, n1, n2, cost_fun)[0])
+
+    cost, path, edges = join_legs(legs)
+    assert cost == pytest.approx(legs[0][0] + legs[1][0])
+    assert path == legs[0][1] + legs[1][1][1:]
+    assert len(edges) == len(path) - 1
+    assert (cost, path, edges) == shortest_path_multi(G, nodes, cost_fun)
+
+
+def test_shortest_path_legs_same_edge(built_G):
+    # Consecutive waypoints along the same edge (fid 49): the legs between
+    # them stay on that edge instead of going around through its ends
+    lon, lat = BOOKSTORE_POINT
+    points = [(lon, lat), (lon, lat - 0.0001), (lon, lat)]
+    nodes = _waypoints(built_G, points, cost_fun)
+    assert len({n.n for n in nodes}) == 3
+    legs = shortest_path_legs(built_G, nodes[:2], cost_fun)
+    legs += shortest_path_legs(built_G, nodes[1:], cost_fun)
+    u = nodes[0].edges_in[0][0]
+    v = nodes[0].edges_out[0][1]
+    fids = {built_G[u][v]["fid"], built_G[v][u]["fid"]}
+    assert 49 in fids
+    for (cost, path, edges), (n1, n2) in zip(legs, zip(nodes, nodes[1:])):
+        assert path == [n1.n, n2.n]
+        # Along the edge, or back along its reverse
+        assert edges[0]["fid"] in fids
+        distance = haversine([n1.geometry.coords[0], n2.geometry.coords[0]])
+        assert cost == pytest.approx(distance, abs=0.5)
+
+
+def _one_way(G):
+    # A waypoint along an edge (u, v) between two intersections, and a cost
+    # function with which the edge can only be traveled from u to v
+    (node,) = _waypoints(G, [MIDBLOCK_POINT], cost_fun)
+    u = node.edges_in[0][0]
+    v = node.edges_out[0][1]
+    one_way = without_fid(cost_fun, G[v][u]["fid"])
+    (node,) = _waypoints(G, [MIDBLOCK_POINT], one_way)
+    return node, u, v, one_way
+
+
+def _path_cost(G, nodes, cost_function):
+    try:
+        cost, path, _ = shortest_path_multi(G, nodes, cost_function)
+    except NoPathError:
+        return None, None
+    return cost, path
+
+
+def test_shortest_path_legs_one_way(built_G):
+    # Legs between other waypoints can't go backward along the one-way edge
+    # through the temporary edges of a waypoint along it
+    G = DiGraphGPKGView(network=built_G.network)
+    node, u, v, one_way = _one_way(G)
+    expected, _ = _path_cost(G, [v, u], one_way)
+    try:
+        legs = shortest_path_legs(G, [v, u, node], one_way)
+    except NoPathError:
+        assert expected is None
+        return
+    cost, path, edges = legs[0]
+    assert node.n not in path
+    assert cost == pytest.approx(expected)
+
+
+def test_shortest_path_legs_hierarchy(built_G_weighted):
+    G = DiGraphGPKGView(network=built_G_weighted.network)
+    lon, lat = BOOKSTORE_POINT
+    points = [(lon, lat), CAFE_POINT, (lon, lat - 0.0001), (lon, lat)]
+    nodes = _waypoints(G, points, weight_fun)
+
+    hierarchy = contract(built_G_weighted, "_weight_distance")
+    legs = shortest_path_legs(G, nodes, weight_fun)
+    ch_legs = shortest_path_legs(G, nodes, weight_fun, hierarchy=hierarchy)
+    for (cost, path, _), (ch_cost, ch_path, ch_edges) in zip(legs, ch_legs):
+        assert ch_cost == pytest.approx(cost)
+        assert (ch_path[0], ch_path[-1]) == (path[0], path[-1])
+        assert len(ch_edges) == len(ch_path) - 1
@@ -0,0 +1,106 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from unweaver.candidates import snap_points
+from unweaver.exceptions import NoPathError
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.cost_matrix import cost_matrix
+from unweaver.shortest_paths.trip import trip, visiting_order
+
+from ..constants import BOOKSTORE_POINT, CAFE_POINT, cost_fun
+from .test_shortest_path import _one_way, _path_cost
+
+
+def _order_cost(costs, order, roundtrip):
+    stops = order + order[:1] if roundtrip else order
+    return sum(costs[a][b] for a, b in zip(stops, stops[1:]))
+
+
+def _random_costs(rng, n):
+    # Asymmetric: going "north" costs more
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    return [
+        [
+            abs(x2 - x1) + abs(y2 - y1) * (2 if y2 > y1 else 1)
+            for x2, y2 in points
+        ]
+        for x1, y1 in points
+    ]
+
+
+def test_visiting_order():
+    rng = random.Random(0)
+    for n in range(1, 8):
+        for roundtrip in (True, False):
+            costs = _random_costs(rng, n)
+            order = visiting_order(costs, roundtrip=roundtrip)
+            assert order[0] == 0
+            assert sorted(order) == list(range(n))
+
+            best = min(
+                _order_cost(costs, [0, *rest], roundtrip)
+                for rest in permutations(range(1, n))
+            )
+            cost = _order_cost(costs, order, roundtrip)
+            assert cost <= 1.1 * best + 1e-9
+
+
+def test_visiting_order_improves():
+    rng = random.Random(1)
+    costs = _random_costs(rng, 60)
+    # With no time to improve it, the order is the nearest-neighbor tour
+    start = visiting_order(costs, time_budget=0)
+    order = visiting_order(costs)
+    assert _order_cost(costs, order, True) < _order_cost(costs, start, True)
+
+
+def test_visiting_order_unreachable():
+    # Stop 2 can be reached but not left
+    costs = [[0, 1, 1], [1, 0, 1], [None, None, 0]]
+    assert visiting_order(costs) is None
+    assert visiting_order(costs, roundtrip=False) == [0, 1, 2]
+
+
+def test_trip(built_G):
+    G = DiGraphGPKGView(network=built_G.network)
+    lon, lat = BOOKSTORE_POINT
+    points = [
+        BOOKSTORE_POINT,
+        CAFE_POINT,
+        (lon, lat - 0.001),
+        (lon, lat - 0.002),
+        (lon - 0.001, lat - 0.001),
+    ]
+    nodes = snap_points(G, points, edge_filter=cost_fun, context="both")
+    costs = cost_matrix(G, nodes, nodes, cost_fun)
+
+    for roundtrip in (True, False):
+        order, legs = trip(G, nodes, cost_fun, roundtrip=roundtrip)
+        assert order[0] == 0
+        assert sorted(order) == list(range(len(points)))
+        assert len(legs) == len(points) - (0 if roundtrip else 1)
+
+        stops = order + order[:1] if roundtrip else order
+        for (cost, path, _), (a, b) in zip(legs, zip(stops, stops[1:])):
+            assert (path[0], path[-1]) == (nodes[a].n, nodes[b].n)
+            assert cost == pytest.approx(costs[a][b])
+
+    with pytest.raises(NoPathError):
+        trip(G, nodes, lambda u, v, d: None)
+
+
+def test_trip_one_way(built_G):
+    # From v, the stop along the one-way edge (u, v) can only be reached by
+    # going around to u and then forward along the edge: not backward through
+    # the stop's own temporary edges, and not to u through them either
+    G = DiGraphGPKGView(network=built_G.network)
+    node, u, v, one_way = _one_way(G)
+    stops = [v, node, u]
+    order, legs = trip(G, stops, one_way, roundtrip=False)
+    assert order == [0, 2, 1]
+    route = [stops[i] for i in order]
+    for (cost, _, _), a, b in zip(legs, route, route[1:]):
+        expected, _ = _path_cost(G, [a, b], one_way)
+        assert cost == pytest.approx(expected)
@@ -0,0 +1,42 @@
+import json
+
+from unweaver.geo import decode_polyline
+from unweaver.geojson import makeLineStringFeature, makePointFeature
+from unweaver.server.streaming import iter_json
+
+
+def test_iter_json():
+    coordinates = [[-122.313108, 47.661011], [-122.3131, 47.66]]
+    result = {
+        "status": "Ok",
+        "origin": makePointFeature(-122.313108, 47.661011),
+        "features": [makeLineStringFeature(coordinates) for _ in range(100)],
+        "costs": (float(i) for i in range(3)),
+        "empty": [],
+    }
+    chunks = list(iter_json(result, chunk_size=1000))
+    # The features are encoded one at a time, so the chunks stay small
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2000 for chunk in chunks)
+    data = json.loads("".join(chunks))
+    assert data["status"] == "Ok"
+    assert data["origin"]["geometry"]["coordinates"] == [
+        -122.313108,
+        47.661011,
+    ]
+    assert len(data["features"]) == 100
+    assert data["features"][0]["geometry"]["coordinates"] == coordinates
+    assert data["costs"] == [0.0, 1.0, 2.0]
+    assert data["empty"] == []
+
+    data = json.loads("".join(iter_json(result, polyline=True)))
+    geometry = data["features"][0]["geometry"]
+    assert geometry["type"] == "LineString"
+    assert decode_polyline(geometry["polyline"]) == [
+        tuple(c) for c in coordinates
+    ]
+    # Points are left as they are
+    assert data["origin"]["geometry"]["coordinates"] == [
+        -122.313108,
+        47.661011,
+    ]
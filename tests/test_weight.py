@@ -1,3 +1,14 @@
+import numpy as np
+
+from unweaver import default_profile_functions
+from unweaver.weight import (
+    column_arrays,
+    precalculate_weight,
+    precalculate_weights,
+)
+
+from .constants import BUILD_PATH
+
 TEST_EDGES = [
     ("-122.3166084, 47.6569613", "-122.3156396, 47.6569496"),
     ("-122.3156015, 47.6583997", "-122.3165426, 47.6584109"),
@@ -11,3 +22,34 @@ def test_precalculate_weights(built_G_weighted):
     for (u, v), weight in zip(TEST_EDGES, DISTANCE_WEIGHTS):
         d = built_G_weighted[u][v]
         assert d["_weight_distance"] == weight
+
+
+def test_precalculate_weights_jobs(built_G_weighted):
+    precalculate_weights(BUILD_PATH, jobs=2)
+    for (u, v), weight in zip(TEST_EDGES, DISTANCE_WEIGHTS):
+        d = built_G_weighted[u][v]
+        assert d["_weight_distance"] == weight
+
+
+def test_precalculate_weight_scalar(built_G_weighted):
+    # The example distance profile is weighted with its vectorized function
+    precalculate_weight(
+        built_G_weighted,
+        "_weight_scalar",
+        default_profile_functions.cost_function_generator,
+        batch_size=100,
+    )
+    for u, v, d in built_G_weighted.iter_edges():
+        assert d["_weight_scalar"] == d["_weight_distance"]
+
+
+def test_column_arrays():
+    rows = [
+        {"_u": "a", "length": 1.5, "curbramps": 1},
+        {"_u": "b", "length": None, "curbramps": 0},
+    ]
+    arrays = column_arrays(rows, ["_u", "length", "curbramps"])
+    assert arrays["_u"].dtype == object
+    assert arrays["length"][0] == 1.5
+    assert np.isnan(arrays["length"][1])
+    assert arrays["curbramps"].tolist() == [1.0, 0.0]
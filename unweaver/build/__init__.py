@@ -1,4 +1,5 @@
 from .build_graph import build_graph
 from .get_layers_paths import get_layers_paths
+from .update_graph import update_graph
 
-__all__ = ("build_graph", "get_layers_paths")
+__all__ = ("build_graph", "get_layers_paths", "update_graph")
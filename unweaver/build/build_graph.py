@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 from typing import List, Optional
 
@@ -7,6 +8,7 @@ from unweaver.constants import DB_PATH
 from unweaver.graphs import DiGraphGPKG
 
 from .graph_builder import GraphBuilder
+from .layer_rows import init_worker, parallel_layer_rows
 from .get_layers_paths import get_layers_paths
 
 
@@ -15,6 +17,9 @@ def build_graph(
     precision: int = 7,
     changes_sign: Optional[List[str]] = None,
     counter: Optional[ProgressBar] = None,
+    jobs: int = 1,
+    bulk_load: bool = False,
+    vacuum: bool = False,
 ) -> DiGraphGPKG:
     """Build a graph in a project directory.
 
@@ -25,16 +30,44 @@ def build_graph(
     change sign when traversed in the "reverse" direction. An incline value
     is an example of this: uphill is positive, downhill negative.
     :param counter: An optional Click counter.
+    :param jobs: The number of processes that read and encode features. If
+    greater than 1, layers are split into parts that are encoded in parallel
+    while this process writes every row.
+    :param bulk_load: Whether to write rows without journaling or syncing,
+    then create every index (including the R-trees) once all rows are
+    written. Faster for large inputs.
+    :param vacuum: Whether to VACUUM a bulk-loaded graph when done.
 
     """
-    builder = GraphBuilder(precision=precision, changes_sign=changes_sign)
-
     paths = get_layers_paths(path)
     db_path = os.path.join(path, DB_PATH)
 
-    for path in paths:
-        builder.add_edges_from(path, counter=counter)
+    if jobs > 1:
+        # Worker processes are started before this process creates the
+        # database, so that they don't inherit its connection.
+        with multiprocessing.Pool(
+            jobs,
+            initializer=init_worker,
+            initargs=(precision, changes_sign or []),
+        ) as pool:
+            builder = GraphBuilder(
+                precision=precision,
+                changes_sign=changes_sign,
+                bulk_load=bulk_load,
+            )
+            builder.add_layer_rows(
+                parallel_layer_rows(pool, jobs, paths, builder.header),
+                counter=counter,
+            )
+    else:
+        builder = GraphBuilder(
+            precision=precision,
+            changes_sign=changes_sign,
+            bulk_load=bulk_load,
+        )
+        for path in paths:
+            builder.add_edges_from(path, counter=counter)
 
-    builder.finalize_db(db_path)
+    builder.finalize_db(db_path, vacuum=vacuum)
 
     return builder.G
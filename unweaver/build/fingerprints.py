@@ -0,0 +1,176 @@
+"""Fingerprints of the source features of a graph, stored alongside it so that
+the graph can be updated incrementally when its layers change."""
+import hashlib
+import json
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from unweaver.network_adapters import GeoPackageNetwork
+
+# (layer, fingerprint, u, v) of the forward edge of a feature
+FingerprintRow = Tuple[str, str, str, str]
+
+
+class BuildSettings(NamedTuple):
+    precision: int
+    changes_sign: List[str]
+
+
+def feature_fingerprint(layer: str, feature: dict) -> str:
+    """A hash of everything about a (fiona) feature that its edges are built
+    from: its layer, properties and geometry.
+
+    :param layer: The name of the feature's layer.
+    :param feature: The feature.
+
+    """
+    # Properties are sorted so that reordering a layer's columns doesn't
+    # change its features.
+    data = repr(
+        (
+            layer,
+            sorted(feature["properties"].items()),
+            feature["geometry"]["coordinates"],
+        )
+    )
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+class BuildMetadata:
+    """The fingerprints of every feature a graph was built from, along with
+    the settings it was built with.
+
+    :param network: The graph's GeoPackageNetwork.
+
+    """
+
+    features_table = "_build_features"
+    settings_table = "_build_settings"
+
+    def __init__(self, network: GeoPackageNetwork):
+        self.network = network
+
+    def exists(self) -> bool:
+        """Check whether the graph has build metadata (graphs built by older
+        versions of unweaver don't).
+
+        """
+        with self.network.gpkg.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT COUNT(*) c
+                  FROM sqlite_master
+                 WHERE type = 'table'
+                   AND name IN (?, ?)
+            """,
+                (self.features_table, self.settings_table),
+            )
+            return next(rows)["c"] == 2
+
+    def create(self, settings: BuildSettings) -> None:
+        """Create the (empty) metadata tables.
+
+        :param settings: The settings that the graph is built with.
+
+        """
+        with self.network.gpkg.connect() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.features_table} (
+                    layer TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    _u TEXT NOT NULL,
+                    _v TEXT NOT NULL,
+                    PRIMARY KEY (layer, fingerprint)
+                ) WITHOUT ROWID
+            """
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.settings_table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """
+            )
+            conn.executemany(
+                f"REPLACE INTO {self.settings_table} VALUES (?, ?)",
+                [
+                    (key, json.dumps(value))
+                    for key, value in settings._asdict().items()
+                ],
+            )
+
+    def settings(self) -> Optional[BuildSettings]:
+        """The settings that the graph was built with, if known."""
+        if not self.exists():
+            return None
+        with self.network.gpkg.connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.settings_table}"
+            )
+            values = {row["key"]: json.loads(row["value"]) for row in rows}
+        try:
+            return BuildSettings(**values)
+        except TypeError:
+            return None
+
+    def layers(self) -> List[str]:
+        """The names of the layers that the graph was built from."""
+        with self.network.gpkg.connect() as conn:
+            rows = conn.execute(
+                f"SELECT DISTINCT layer FROM {self.features_table}"
+            )
+            return [row["layer"] for row in rows]
+
+    def fingerprints(self, layer: str) -> Dict[str, Tuple[str, str]]:
+        """The fingerprints of a layer's features.
+
+        :param layer: The name of the layer.
+        :returns: A dict of fingerprints to the (u, v) of their forward edge.
+
+        """
+        with self.network.gpkg.connect() as conn:
+            cursor = conn.cursor()
+            # Plain tuples: the dict row factory is too slow for full scans
+            cursor.row_factory = None
+            rows = cursor.execute(
+                f"""
+                SELECT fingerprint, _u, _v
+                  FROM {self.features_table}
+                 WHERE layer = ?
+            """,
+                (layer,),
+            )
+            return {fingerprint: (u, v) for fingerprint, u, v in rows}
+
+    def add(self, rows: Iterable[FingerprintRow]) -> None:
+        """Store the fingerprints of features.
+
+        :param rows: (layer, fingerprint, u, v) rows.
+
+        """
+        with self.network.gpkg.connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"REPLACE INTO {self.features_table} VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+
+    def remove(self, keys: Iterable[Tuple[str, str]]) -> None:
+        """Delete the fingerprints of features.
+
+        :param keys: (layer, fingerprint) pairs.
+
+        """
+        with self.network.gpkg.connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"""
+                DELETE FROM {self.features_table}
+                      WHERE layer = ?
+                        AND fingerprint = ?
+            """,
+                keys,
+            )
+            conn.execute("COMMIT")
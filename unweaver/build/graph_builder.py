@@ -1,13 +1,17 @@
 import os
 import shutil
 import tempfile
-from typing import List, Optional, Type
+from typing import Iterable, List, Optional, Type
 
 from click._termui_impl import ProgressBar
 
 from unweaver.constants import BATCH_SIZE
 from unweaver.graphs import DiGraphGPKG
-from unweaver.io import edge_generator
+from unweaver.network_adapters import GeoPackageNetwork
+
+from .fingerprints import BuildMetadata, BuildSettings
+from .layer_rows import LayerRows, read_layer_rows
+from .node_staging import NodeStaging
 
 
 class GraphBuilder:
@@ -16,6 +20,7 @@ class GraphBuilder:
         graph_class: Type[DiGraphGPKG] = DiGraphGPKG,
         precision: int = 7,
         changes_sign: Optional[List[str]] = None,
+        bulk_load: bool = False,
     ):
         if changes_sign is None:
             changes_sign = []
@@ -23,6 +28,7 @@ class GraphBuilder:
         self.precision = precision
         self.changes_sign = changes_sign
         self.graph_class = graph_class
+        self.bulk_load = bulk_load
         self.tempfile = ""
 
         self.create_temporary_db()
@@ -34,22 +40,57 @@ class GraphBuilder:
         path = str(path)
         os.remove(path)
         path = f"{path}.gpkg"
-        G = self.graph_class.create_graph(path=path)
+        if self.bulk_load:
+            # Indices are created by finalize_db, once every row is written
+            network = GeoPackageNetwork(path, create_indices=False)
+            network.gpkg.set_bulk_load(True)
+            G = self.graph_class(network=network)
+        else:
+            G = self.graph_class.create_graph(path=path)
         self.tempfile = path
         self.G = G
+        # Nodes are written once each, when the graph is finalized
+        self.node_staging = NodeStaging(G.network.nodes)
+        # Feature fingerprints, for incremental updates (see update_graph)
+        self.metadata = BuildMetadata(G.network)
+        self.metadata.create(
+            BuildSettings(self.precision, list(self.changes_sign))
+        )
+
+    def finalize_db(self, path: str, vacuum: bool = False) -> None:
+        """Index the temporary database and move it to its final path.
 
-    def finalize_db(self, path: str) -> None:
+        :param path: The path of the graph.
+        :param vacuum: Whether to also VACUUM the database of a bulk-loaded
+                       graph.
+
+        """
         # FIXME: implement proper interface / paradigm for overwriting
         #        GeoPackages. Consider creating path.gpkg.build temporary file
+        network = self.G.network
+        self.node_staging.write()
+        if self.bulk_load:
+            network.create_indices(deduplicate=True)
 
         # TODO: place the rtree step somewhere else?
-        self.G.network.edges.add_rtree()
-        self.G.network.nodes.add_rtree()
+        network.edges.add_rtree(sort=self.bulk_load)
+        network.nodes.add_rtree(sort=self.bulk_load)
+
+        if self.bulk_load:
+            network.gpkg.set_bulk_load(False)
+            with network.gpkg.connect() as conn:
+                conn.execute("ANALYZE")
+                if vacuum:
+                    conn.execute("VACUUM")
 
+        # Connections to a moved database can no longer write to it: close
+        # it so that the next connection opens the file at its final path
+        network.gpkg.close()
         if os.path.exists(path):
             os.remove(path)
         shutil.move(self.tempfile, path)
-        self.G.network.gpkg.path = path
+        network.path = path
+        network.gpkg.path = path
         self.tempfile = ""
 
     def get_G(self) -> DiGraphGPKG:
@@ -61,12 +102,34 @@ class GraphBuilder:
         batch_size: int = BATCH_SIZE,
         counter: ProgressBar = None,
     ) -> None:
-        edge_gen = edge_generator(
-            path,
-            precision=self.precision,
-            changes_sign=self.changes_sign,
-            add_reverse=True,
-        )
-        self.G.add_edges_from(
-            edge_gen, _batch_size=batch_size, counter=counter
+        self.add_layer_rows(
+            read_layer_rows(
+                path,
+                precision=self.precision,
+                changes_sign=self.changes_sign,
+                header=self.header,
+                chunk_size=batch_size,
+            ),
+            counter=counter,
         )
+
+    def add_layer_rows(
+        self, layer_rows: Iterable[LayerRows], counter: ProgressBar = None
+    ) -> None:
+        """Write pre-encoded edge and node rows, e.g. from
+        `parallel_layer_rows`.
+
+        :param layer_rows: Chunks of (edge rows, node rows, fingerprint rows).
+        :param counter: A progress bar, updated as edges are written.
+
+        """
+        edges = self.G.network.edges
+        for edge_table_rows, (_, node_rows), fingerprints in layer_rows:
+            edges.write_rows(*edge_table_rows, counter=counter)
+            self.node_staging.add(node_rows)
+            self.metadata.add(fingerprints)
+
+    @property
+    def header(self) -> bytes:
+        """The GeoPackage binary header of the graph's geometries."""
+        return self.G.network.edges._gp_header
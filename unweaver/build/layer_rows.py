@@ -0,0 +1,242 @@
+"""Parse layers into rows that are ready to be written to the edges and nodes
+tables, optionally in worker processes."""
+from itertools import chain, islice
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import fiona  # type: ignore
+import geomet.wkb  # type: ignore
+
+from unweaver.constants import BATCH_SIZE
+from unweaver.exceptions import UnrecognizedFileFormat
+from unweaver.geopackage import FeatureTable
+from unweaver.io import edge_from_feature
+from unweaver.utils import haversine
+
+from .fingerprints import FingerprintRow, feature_fingerprint
+
+# Rows of a table, with SQLite-compatible values: (column names, rows)
+Rows = Tuple[List[str], List[Tuple[Any, ...]]]
+# (edge rows, node rows, fingerprint rows) of a chunk of features
+LayerRows = Tuple[Rows, Rows, List[FingerprintRow]]
+# (layer path, part, number of parts, GeoPackage geometry header, directory)
+PartTask = Tuple[str, int, int, bytes, str]
+
+# Per-process state of `build --jobs` workers
+_worker_state: Dict[str, Any] = {}
+
+
+def encode_features(
+    features: Iterable[dict],
+    layer: str,
+    precision: int,
+    changes_sign: Sequence[str],
+    header: bytes,
+) -> LayerRows:
+    """Turn (fiona) features into the rows of their forward and reverse
+    edges, of their end nodes, and of their fingerprints.
+
+    :param features: The features. Anything but LineStrings is skipped.
+    :param layer: The name of the layer, stored in the _layer column.
+    :param precision: Rounding precision of node IDs.
+    :param changes_sign: Numeric fields whose sign changes on reverse edges.
+    :param header: The GeoPackage binary header of the tables' geometries.
+    :returns: The edge rows, node rows and fingerprint rows. Each feature
+              has two edge rows (forward and reverse), two node rows and one
+              fingerprint row.
+
+    """
+    edges = []
+    nodes: List[Tuple[Any, ...]] = []
+    fingerprints: List[FingerprintRow] = []
+    for feature in features:
+        # TODO: log total number of edges skipped and inform user.
+        geometry = feature["geometry"]
+        if geometry is None or geometry["type"] != "LineString":
+            continue
+        u, v, props = edge_from_feature(feature, layer, precision)
+        # The primary key is reserved for internal use
+        props.pop(FeatureTable.primary_key, None)
+        coordinates = props["geom"].coordinates
+
+        props["geom"] = header + linestring_wkb(coordinates)
+        if "_length" in props:
+            props["_length"] = haversine(coordinates)
+        edges.append({"_u": u, "_v": v, **props})
+
+        props = {**props}
+        props["geom"] = header + linestring_wkb(coordinates[::-1])
+        for change_sign in changes_sign:
+            if change_sign in props:
+                props[change_sign] = -1 * props[change_sign]
+        edges.append({"_u": v, "_v": u, **props})
+
+        nodes.append((u, header + point_wkb(coordinates[0])))
+        nodes.append((v, header + point_wkb(coordinates[-1])))
+
+        fingerprints.append((layer, feature_fingerprint(layer, feature), u, v))
+
+    return _tabulate(edges), (["_n", "geom"], nodes), fingerprints
+
+
+def linestring_wkb(coordinates: Sequence[Sequence[float]]) -> bytes:
+    """Encode a LineString as WKB, byte-for-byte like geomet does (big
+    endian), but without building intermediate objects for 2D coordinates.
+
+    :param coordinates: The coordinates of the LineString.
+
+    """
+    if all(len(c) == 2 for c in coordinates):
+        n = len(coordinates)
+        return struct.pack(
+            f">BII{2 * n}d", 0, 2, n, *chain.from_iterable(coordinates)
+        )
+    return geomet.wkb.dumps({"type": "LineString", "coordinates": coordinates})
+
+
+def point_wkb(coordinates: Sequence[float]) -> bytes:
+    """Encode a Point as WKB, byte-for-byte like geomet does (big endian).
+
+    :param coordinates: The coordinates of the Point.
+
+    """
+    if len(coordinates) == 2:
+        return struct.pack(">BIdd", 0, 1, *coordinates)
+    return geomet.wkb.dumps({"type": "Point", "coordinates": coordinates})
+
+
+def read_layer_rows(
+    path: str,
+    precision: int,
+    changes_sign: Sequence[str],
+    header: bytes,
+    chunk_size: int = BATCH_SIZE,
+) -> Iterator[LayerRows]:
+    """Read and encode a layer in this process, one chunk of features at a
+    time.
+
+    :param path: Path to the layer.
+    :param precision: Rounding precision of node IDs.
+    :param changes_sign: Numeric fields whose sign changes on reverse edges.
+    :param header: The GeoPackage binary header of the tables' geometries.
+    :param chunk_size: The number of features per chunk.
+    :returns: Generator of (edge rows, node rows, fingerprint rows), one per
+              chunk.
+
+    """
+    layer = layer_name(path)
+    try:
+        with fiona.open(path) as handle:
+            features = iter(handle)
+            while True:
+                chunk = list(islice(features, chunk_size))
+                if not chunk:
+                    break
+                yield encode_features(
+                    chunk, layer, precision, changes_sign, header
+                )
+    except fiona.errors.DriverError:
+        raise UnrecognizedFileFormat(f"{path} has an unrecognized format.")
+
+
+def parallel_layer_rows(
+    pool: Any,
+    jobs: int,
+    paths: Iterable[str],
+    header: bytes,
+) -> Iterator[LayerRows]:
+    """Read and encode layers in the worker processes of a pool, which must
+    have been started with `init_worker` as its initializer.
+
+    Each layer is split into one contiguous part per worker, as GeoJSON
+    layers can't be read from an arbitrary feature without reading every
+    feature before it. Workers spill their rows to temporary files, which are
+    read back in order, so that chunks are returned in the same order as
+    `read_layer_rows` would and the graph is the same as one built by a
+    single process.
+
+    :param pool: The multiprocessing pool of worker processes.
+    :param jobs: The number of worker processes.
+    :param paths: Paths to the layers.
+    :param header: The GeoPackage binary header of the tables' geometries.
+    :returns: Generator of (edge rows, node rows, fingerprint rows), one per
+              chunk.
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tasks = [
+            (path, part, jobs, header, directory)
+            for path in paths
+            for part in range(jobs)
+        ]
+        for spill_path in pool.imap(_encode_part, tasks):
+            with open(spill_path, "rb") as f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+            os.remove(spill_path)
+
+
+def init_worker(
+    precision: int, changes_sign: Sequence[str], chunk_size: int = BATCH_SIZE
+) -> None:
+    """Initialize a `parallel_layer_rows` worker process.
+
+    :param precision: Rounding precision of node IDs.
+    :param changes_sign: Numeric fields whose sign changes on reverse edges.
+    :param chunk_size: The number of features per chunk.
+
+    """
+    _worker_state["precision"] = precision
+    _worker_state["changes_sign"] = changes_sign
+    _worker_state["chunk_size"] = chunk_size
+
+
+def _encode_part(task: PartTask) -> str:
+    path, part, parts, header, directory = task
+    fd, spill_path = tempfile.mkstemp(dir=directory)
+    layer = layer_name(path)
+    chunk_size = _worker_state["chunk_size"]
+    try:
+        with fiona.open(path) as handle, os.fdopen(fd, "wb") as f:
+            n = len(handle)
+            start = n * part // parts
+            stop = n * (part + 1) // parts
+            features = (feature for _, feature in handle.items(start, stop))
+            while True:
+                chunk = list(islice(features, chunk_size))
+                if not chunk:
+                    break
+                layer_rows = encode_features(
+                    chunk,
+                    layer,
+                    _worker_state["precision"],
+                    _worker_state["changes_sign"],
+                    header,
+                )
+                pickle.dump(layer_rows, f, pickle.HIGHEST_PROTOCOL)
+    except fiona.errors.DriverError:
+        raise UnrecognizedFileFormat(f"{path} has an unrecognized format.")
+    return spill_path
+
+
+def _tabulate(rows: List[Dict[str, Any]]) -> Rows:
+    # Columns are in the order in which they first appear
+    column_names = list(dict.fromkeys(chain.from_iterable(rows)))
+    return column_names, [
+        tuple(row.get(c, None) for c in column_names) for row in rows
+    ]
+
+
+def layer_name(path: str) -> str:
+    """The name of a layer: its file name, without the extension.
+
+    :param path: Path to the layer.
+
+    """
+    return os.path.splitext(os.path.basename(path))[0]
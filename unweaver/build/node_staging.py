@@ -0,0 +1,84 @@
+"""Deduplicate the nodes of a graph that is being built, so that each one is
+written to the nodes table exactly once."""
+from typing import Any, Dict, Iterable, Tuple
+
+from unweaver.constants import NODE_STAGING_SIZE
+from unweaver.network_adapters.geopackagenetwork.node_table import NodeTable
+
+
+class NodeStaging:
+    """Collects node rows in memory, keeping the last geometry written for each
+    node ID. When more than max_size distinct nodes are held, they are spilled
+    to a temporary table (outside of the GeoPackage) with the same semantics,
+    so that memory use is bounded.
+
+    :param table: The nodes table that staged nodes are written to.
+    :param max_size: The maximum number of nodes held in memory.
+
+    """
+
+    def __init__(self, table: NodeTable, max_size: int = NODE_STAGING_SIZE):
+        self.table = table
+        self.max_size = max_size
+        self.nodes: Dict[str, bytes] = {}
+        self.spilled = False
+
+    def add(self, rows: Iterable[Tuple[Any, ...]]) -> None:
+        """Stage node rows, replacing any staged row with the same node ID.
+
+        :param rows: (node ID, GeoPackage binary geometry) rows.
+
+        """
+        nodes = self.nodes
+        for n, geom in rows:
+            nodes[n] = geom
+        if len(self.nodes) > self.max_size:
+            self.spill()
+
+    def spill(self) -> None:
+        """Move the nodes held in memory to the temporary staging table."""
+        with self.table.gpkg.connect() as conn:
+            if not self.spilled:
+                conn.execute(
+                    """
+                    CREATE TEMP TABLE node_staging (
+                        _n TEXT PRIMARY KEY,
+                        geom BLOB
+                    ) WITHOUT ROWID
+                """
+                )
+                self.spilled = True
+            conn.execute("BEGIN")
+            conn.executemany(
+                "REPLACE INTO temp.node_staging VALUES (?, ?)",
+                self.nodes.items(),
+            )
+            conn.execute("COMMIT")
+        self.nodes = {}
+
+    def write(self) -> None:
+        """Write every staged node to the nodes table, then clear the staging
+        area.
+
+        """
+        table = self.table
+        if not self.spilled:
+            table.write_rows(
+                [table.node_key, table.geom_column], list(self.nodes.items())
+            )
+            self.nodes = {}
+            return
+
+        self.spill()
+        with table.gpkg.connect() as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                f"""
+                REPLACE INTO {table.name} ({table.node_key}, {table.geom_column})
+                     SELECT _n, geom
+                       FROM temp.node_staging
+            """
+            )
+            conn.execute("COMMIT")
+            conn.execute("DROP TABLE temp.node_staging")
+        self.spilled = False
@@ -0,0 +1,209 @@
+import os
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from click._termui_impl import ProgressBar
+import fiona  # type: ignore
+
+from unweaver.constants import BATCH_SIZE, DB_PATH
+from unweaver.contraction import ContractionHierarchy
+from unweaver.exceptions import UnrecognizedFileFormat
+from unweaver.graphs import DiGraphGPKG
+from unweaver.parsers import parse_profiles
+from unweaver.weight import precalculate_weights
+
+from .build_graph import build_graph
+from .fingerprints import (
+    BuildMetadata,
+    BuildSettings,
+    FingerprintRow,
+    feature_fingerprint,
+)
+from .get_layers_paths import get_layers_paths
+from .layer_rows import encode_features, layer_name
+from .node_staging import NodeStaging
+
+
+def update_graph(
+    path: str,
+    precision: int = 7,
+    changes_sign: Optional[List[str]] = None,
+    counter: Optional[ProgressBar] = None,
+    jobs: int = 1,
+) -> DiGraphGPKG:
+    """Update the graph of a project directory in place, after its layers
+    have changed.
+
+    Every feature of the graph has a fingerprint (a hash of its layer,
+    properties and geometry), stored with the graph when it was built. The
+    layers are diffed against them, and only the edges and nodes of removed,
+    added or changed features are written, along with the R-tree entries
+    and precalculated weights of those edges. Contraction hierarchies are
+    dropped, as they are out of date.
+
+    If there is no graph yet, or it was built by an older version of
+    unweaver or with other settings, it is built from scratch instead.
+
+    As with `build_graph`, only one edge is kept between each (ordered) pair
+    of nodes: when features overlap, an added feature replaces a kept one.
+
+    :param path: Path to the project directory.
+    :param precision: Rounding precision for whether to connect two
+    LineStrings end-to-end. Defaults to about 10 cm.
+    :param changes_sign: A list of numeric edge fields whose values should
+    change sign when traversed in the "reverse" direction.
+    :param counter: An optional Click counter, updated as edges are written.
+    :param jobs: The number of processes used by a full build, and to
+    precalculate weights.
+
+    """
+    changes_sign = list(changes_sign or [])
+    db_path = os.path.join(path, DB_PATH)
+    if os.path.exists(db_path):
+        G = DiGraphGPKG(path=db_path)
+        metadata = BuildMetadata(G.network)
+        if metadata.settings() == BuildSettings(precision, changes_sign):
+            _update(G, metadata, path, precision, changes_sign, counter, jobs)
+            return G
+        G.network.gpkg.close()
+
+    return build_graph(
+        path,
+        precision=precision,
+        changes_sign=changes_sign,
+        counter=counter,
+        jobs=jobs,
+    )
+
+
+def _update(
+    G: DiGraphGPKG,
+    metadata: BuildMetadata,
+    path: str,
+    precision: int,
+    changes_sign: List[str],
+    counter: Optional[ProgressBar],
+    jobs: int,
+) -> None:
+    network = G.network
+    edges = network.edges
+
+    # Diff every layer against the fingerprints of the graph
+    paths = {layer_name(p): p for p in get_layers_paths(path)}
+    added: Dict[str, List[dict]] = {}
+    kept: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    removed: List[FingerprintRow] = []
+    for layer in set(metadata.layers()) | set(paths):
+        old = metadata.fingerprints(layer)
+        added[layer] = []
+        kept[layer] = {}
+        seen: Set[str] = set()
+        if layer in paths:
+            for fingerprint, feature in _fingerprinted(paths[layer], layer):
+                if fingerprint in seen:
+                    # A duplicate feature
+                    continue
+                seen.add(fingerprint)
+                if fingerprint in old:
+                    kept[layer][fingerprint] = old.pop(fingerprint)
+                else:
+                    added[layer].append(feature)
+        removed.extend((layer, f, u, v) for f, (u, v) in old.items())
+
+    # Deleting the edges of a removed feature also deletes the edges of any
+    # kept feature between the same nodes, which are written again.
+    pairs = {(u, v) for _, _, u, v in removed}
+    pairs |= {(v, u) for u, v in pairs}
+    for layer, fingerprints in kept.items():
+        colliding = {f for f, uv in fingerprints.items() if uv in pairs}
+        if colliding:
+            added[layer].extend(
+                feature
+                for fingerprint, feature in _fingerprinted(paths[layer], layer)
+                if fingerprint in colliding
+            )
+
+    with network.gpkg.connect() as conn:
+        # Rows that are replaced (REPLACE INTO) fire delete triggers, which
+        # keep the R-trees up to date
+        conn.execute("PRAGMA recursive_triggers = ON")
+        conn.execute("BEGIN")
+        conn.executemany(
+            f"""
+            DELETE FROM {edges.name}
+                  WHERE {edges.u_key} = ?
+                    AND {edges.v_key} = ?
+        """,
+            pairs,
+        )
+        conn.execute("COMMIT")
+
+    # fids aren't reused below the highest remaining one: every new edge has
+    # a greater fid.
+    _, max_fid = edges.primary_key_range()
+    node_staging = NodeStaging(network.nodes)
+    fingerprint_rows: List[FingerprintRow] = []
+    header = edges._gp_header
+    for layer, features in added.items():
+        for start in range(0, len(features), BATCH_SIZE):
+            edge_rows, (_, node_rows), rows = encode_features(
+                features[start : start + BATCH_SIZE],
+                layer,
+                precision,
+                changes_sign,
+                header,
+            )
+            edges.write_rows(*edge_rows, counter=counter)
+            node_staging.add(node_rows)
+            fingerprint_rows.extend(rows)
+    node_staging.write()
+
+    # Nodes that were only the end of removed features
+    nodes = network.nodes
+    with network.gpkg.connect() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            f"""
+            DELETE FROM {nodes.name}
+                  WHERE {nodes.node_key} = ?1
+                    AND NOT EXISTS (SELECT 1
+                                      FROM {edges.name}
+                                     WHERE {edges.u_key} = ?1
+                                        OR {edges.v_key} = ?1)
+        """,
+            [(n,) for n in {n for pair in pairs for n in pair}],
+        )
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA recursive_triggers = OFF")
+
+    # Only the weights that were already precalculated are updated
+    profiles = parse_profiles(path)
+    column_names = edges._get_column_names()
+    precalculate_weights(
+        path,
+        jobs=jobs,
+        min_fid=0 if max_fid is None else max_fid + 1,
+        profile_ids=[
+            profile["id"]
+            for profile in profiles
+            if f"_weight_{profile['id']}" in column_names
+        ],
+    )
+    for profile in profiles:
+        ContractionHierarchy.drop(network, profile["id"])
+
+    # Fingerprints are updated last, so that an interrupted update can be
+    # run again
+    metadata.remove((layer, f) for layer, f, _, _ in removed)
+    metadata.add(fingerprint_rows)
+
+
+def _fingerprinted(path: str, layer: str) -> Iterator[Tuple[str, dict]]:
+    try:
+        with fiona.open(path) as handle:
+            for feature in handle:
+                geometry = feature["geometry"]
+                if geometry is None or geometry["type"] != "LineString":
+                    continue
+                yield feature_fingerprint(layer, feature), feature
+    except fiona.errors.DriverError:
+        raise UnrecognizedFileFormat(f"{path} has an unrecognized format.")
@@ -1,15 +1,30 @@
 import copy
-from typing import Iterable, Literal, Optional
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 from shapely.geometry import LineString, Point, mapping, shape  # type: ignore
 
-from unweaver.constants import DWITHIN
+from unweaver.constants import DWITHIN, SNAP_TILE_SIZE
 from unweaver.geo import cut
 from unweaver.graph_types import CostFunction, EdgeData, EdgeTuple
 from unweaver.graph import ProjectedNode
 from unweaver.graphs import DiGraphGPKGView
 
 
+# Prefix of the columns of precalculated weights
+WEIGHT_PREFIX = "_weight_"
+
+
 # TODO: consider an object-oriented / struct-ie approach? Lots of data reuse.
 def waypoint_candidates(
     G: DiGraphGPKGView,
@@ -17,8 +32,6 @@ def waypoint_candidates(
     lat: float,
     n: int,
     dwithin: float = DWITHIN,
-    invert: Optional[Iterable[str]] = None,
-    flip: Optional[Iterable[str]] = None,
     node_id: str = "-1",
 ) -> Iterable[ProjectedNode]:
     """Produce the initial data needed to begin an on-graph search given input
@@ -36,10 +49,6 @@ def waypoint_candidates(
               distance.
     :param dwithin: distance from point to search.
     :param distance: float
-    :param invert: A list of edge attributes to invert (multiply by -1) if
-                   along reversed edge. e.g. an incline value.
-    :param flip: A list of edge attributes to flip (i.e. boolean-like, either
-                 0/1 or True/False) for reversed edges. e.g. a one-way flag.
     :returns: Generator of candidates sorted by distance. Each candidate is a
               dict with a "type" key and data. If a candidate is a node, it has
               two entries: "type": "node" and "node": key, where the node key
@@ -55,18 +64,11 @@ def waypoint_candidates(
     # TODO: use real distances, not lon-lat
     point = Point(lon, lat)
 
-    # TODO: this is just a hack for proper nearest-neighbors functionality.
-    # Implement priority queue-based "true nearest neighbors" idea inspired by
-    # rtree implementations.
     # TODO: directly extract nodes as well?
-    edge_candidates = G.network.edges.dwithin_edges(
-        lon, lat, dwithin, sort=True
-    )
+    edge_candidates = G.network.edges.nearest_edges(lon, lat, n, dwithin)
 
-    for i, c in enumerate(edge_candidates):
-        if (i + 1) > n:
-            break
-        yield create_temporary_node(G, c, point, invert, flip, node_id=node_id)
+    for c in edge_candidates:
+        yield create_temporary_node(G, c, point, node_id=node_id)
 
 
 def reverse_edge(
@@ -113,7 +115,7 @@ def is_end_node(distance: float, linestring: LineString) -> bool:
 
 def new_edge(G: DiGraphGPKGView, geom: LineString, d: EdgeData) -> EdgeData:
     """Create a copy of an edge but with a new geometry. Updates length value
-    automatically.
+    and precalculated weights (in proportion to the length) automatically.
 
     :param G: Graph wrapper
     :param geom: new geometry (linestring)
@@ -123,10 +125,18 @@ def new_edge(G: DiGraphGPKGView, geom: LineString, d: EdgeData) -> EdgeData:
     # TODO: Any way to avoid using `copy`?
     d = copy.copy(d)
 
-    if "length" in d:
+    scaled = [
+        key
+        for key, value in d.items()
+        if value is not None
+        and (key == "length" or key.startswith(WEIGHT_PREFIX))
+    ]
+    if scaled:
         orig_geom = shape(d[G.network.edges.geom_column])
         # TODO: just calculate the actual length using geopackage functions
-        d["length"] = d["length"] * (geom.length / orig_geom.length)
+        ratio = geom.length / orig_geom.length
+        for key in scaled:
+            d[key] = d[key] * ratio
 
     d[G.network.edges.geom_column] = mapping(geom)
 
@@ -137,13 +147,29 @@ def create_temporary_node(
     G: DiGraphGPKGView,
     edge: EdgeTuple,
     point: Point,
-    invert: Optional[Iterable[str]] = None,
-    flip: Optional[Iterable[str]] = None,
     node_id: str = "-1",
 ) -> ProjectedNode:
+    """Split an edge at the point along it nearest to a point, into temporary
+    edges to and from a temporary node.
+
+    The edge (u, v) is split into the temporary edges (u, node) and (node,
+    v). If the graph also has its reverse, (v, u), it is split into (v, node)
+    and (node, u), with the reverse's own data (e.g. inverted inclines and
+    its own precalculated weights). Otherwise, the node can't be traveled
+    through in that direction.
+
+    :param G: Graph instance.
+    :param edge: The (u, v, d) edge along which the node is.
+    :param point: The point to project onto the edge.
+    :param node_id: The ID of the temporary node.
+    :returns: The temporary node, or an on-graph node if the point projects
+              onto either end of the edge. The first of its incoming and
+              outgoing edges are those along (u, v).
+
+    """
     u, v, d = edge
-    geometry = d[G.network.edges.geom_column]
-    geometry = shape(geometry)
+    geom_column = G.network.edges.geom_column
+    geometry = shape(d[geom_column])
     distance = geometry.project(point)
 
     if is_start_node(distance):
@@ -157,33 +183,163 @@ def create_temporary_node(
     # Candidate is an edge - need to split and create temporary node + edge
     # info
     try:
-        geom1, geom2 = cut(geometry, distance)
+        part1, part2 = cut(geometry, distance)
     except Exception:
         # TODO: make a specific exception for this case
         raise ValueError("Failed to cut edge associated with temporary node.")
 
-    geom1 = LineString(geom1)
-    geom2 = LineString(geom2)
+    geom1 = LineString(part1)
+    geom2 = LineString(part2)
 
     # Create copies of the edge data with new geometries
     d1 = new_edge(G, geom1, d)
     d2 = new_edge(G, geom2, d)
-    d1_rev = reverse_edge(d1, invert=invert, flip=flip)
-    d2_rev = reverse_edge(d2, invert=invert, flip=flip)
-
-    edge1 = (u, node_id, d1)
-    edge1_rev = (node_id, u, d1_rev)
-    edge2 = (node_id, v, d2)
-    edge2_rev = (v, node_id, d2_rev)
+    edges_in: Tuple[EdgeTuple, ...] = ((u, node_id, d1),)
+    edges_out: Tuple[EdgeTuple, ...] = ((node_id, v, d2),)
 
-    edges_in = (edge1, edge2_rev)
-    edges_out = (edge2, edge1_rev)
+    d_rev = _reverse_data(G, u, v, d)
+    if d_rev is not None:
+        d1_rev = new_edge(G, LineString(geom1.coords[::-1]), d_rev)
+        d2_rev = new_edge(G, LineString(geom2.coords[::-1]), d_rev)
+        edges_in += ((v, node_id, d2_rev),)
+        edges_out += ((node_id, u, d1_rev),)
 
     return ProjectedNode(
         node_id, point, edges_in=edges_in, edges_out=edges_out
     )
 
 
+def _reverse_data(
+    G: DiGraphGPKGView, u: str, v: str, d: EdgeData
+) -> Optional[EdgeData]:
+    # The data of the on-graph reverse of an edge, if it has one that follows
+    # the same way back
+    try:
+        ((_, _, d_rev),) = G.edges_bunch([(v, u)])
+    except KeyError:
+        return None
+    geom_column = G.network.edges.geom_column
+    coords = shape(d[geom_column]).coords[::-1]
+    if list(shape(d_rev[geom_column]).coords) != coords:
+        return None
+    return d_rev
+
+
+def overlay_edges(
+    G: DiGraphGPKGView, nodes: Iterable[Union[str, ProjectedNode]]
+) -> List[EdgeTuple]:
+    """Collect the temporary edges of many nodes (e.g. the waypoints of a
+    route) into a single overlay for graph searches.
+
+    Where several nodes are along the same edge, each one's temporary edges
+    would lead to both ends of the edge but not to the other nodes. Instead,
+    the edge is split at every one of them, in order, so that consecutive
+    nodes along it are connected directly.
+
+    :param G: Graph instance.
+    :param nodes: On-graph node IDs (which have no temporary edges) or
+                  ProjectedNodes.
+    :returns: List of the temporary edges.
+
+    """
+    # The (ID, edges in, edges out) of the nodes along each edge, keyed by
+    # the edge's (undirected) ends
+    along: Dict[frozenset, Dict[str, _Split]] = {}
+    for node in nodes:
+        if isinstance(node, str) or not node.edges_in or not node.edges_out:
+            continue
+        u = node.edges_in[0][0]
+        v = node.edges_out[0][1]
+        split = (node.n, node.edges_in, node.edges_out)
+        along.setdefault(frozenset((u, v)), {})[node.n] = split
+
+    edges: List[EdgeTuple] = []
+    for splits in along.values():
+        if len(splits) == 1:
+            ((_, edges_in, edges_out),) = splits.values()
+            edges.extend(edges_in)
+            edges.extend(edges_out)
+        else:
+            edges.extend(_split_edge(G, list(splits.values())))
+    return edges
+
+
+_Split = Tuple[str, Tuple[EdgeTuple, ...], Tuple[EdgeTuple, ...]]
+_Part = Tuple[
+    str,
+    Optional[EdgeData],
+    Optional[EdgeData],
+    Optional[EdgeData],
+    Optional[EdgeData],
+]
+
+
+def _split_edge(G: DiGraphGPKGView, splits: List[_Split]) -> List[EdgeTuple]:
+    # Temporary edges that split an edge (u, v) at many nodes along it. The
+    # edge's reverse may be missing, in which case the nodes have no
+    # temporary edges in that direction and none are added between them.
+    _, edges_in, edges_out = splits[0]
+    u = edges_in[0][0]
+    v = edges_out[0][1]
+    # The (ID, data of the edges from u, to v, from v, and to u) of each node,
+    # None where missing. Nodes may have been snapped to either direction.
+    parts: List[_Part] = []
+    for n, edges_in, edges_out in splits:
+        ends_in = {a: d for a, _, d in edges_in}
+        ends_out = {b: d for _, b, d in edges_out}
+        parts.append(
+            (
+                n,
+                ends_in.get(u),
+                ends_out.get(v),
+                ends_in.get(v),
+                ends_out.get(u),
+            )
+        )
+
+    # Sort by distance from u
+    geom_column = G.network.edges.geom_column
+    positions = []
+    for _, from_u, _, _, to_u in parts:
+        # Every node has at least one of them, along one direction or the
+        # other
+        part = cast(EdgeData, from_u if from_u is not None else to_u)
+        positions.append(shape(part[geom_column]).length)
+    order = sorted(range(len(parts)), key=lambda i: positions[i])
+
+    n, from_u, _, _, to_u = parts[order[0]]
+    edges = [(u, n, from_u), (n, u, to_u)]
+    for i, j in zip(order, order[1:]):
+        # The nearer node is connected to the farther one by the parts of the
+        # farther one's edges (from and to u) beyond the nearer one
+        n = parts[i][0]
+        m, from_u, _, _, to_u = parts[j]
+        between = positions[j] - positions[i]
+        if from_u is not None:
+            edges.append((n, m, _trim(G, from_u, positions[i], True)))
+        if to_u is not None:
+            edges.append((m, n, _trim(G, to_u, between, False)))
+    n, _, to_v, from_v, _ = parts[order[-1]]
+    edges.extend([(n, v, to_v), (v, n, from_v)])
+    return [(a, b, d) for a, b, d in edges if d is not None]
+
+
+def _trim(
+    G: DiGraphGPKGView, d: EdgeData, distance: float, start: bool
+) -> EdgeData:
+    # A copy of an edge with the part of its geometry after (start) or before
+    # a distance along it
+    geom_column = G.network.edges.geom_column
+    line = shape(d[geom_column])
+    if distance <= 0:
+        coords = list(line.coords[:1]) * 2 if not start else line.coords
+    elif distance >= line.length:
+        coords = list(line.coords[-1:]) * 2 if start else line.coords
+    else:
+        coords = cut(line, distance)[1 if start else 0]
+    return new_edge(G, LineString(coords), d)
+
+
 def choose_candidate(
     G: DiGraphGPKGView,
     candidates: Iterable[ProjectedNode],
@@ -253,3 +409,114 @@ def choose_candidate(
             return candidate
 
     return None
+
+
+def snap_points(
+    G: DiGraphGPKGView,
+    coords: Sequence[Tuple[float, float]],
+    k: int = 4,
+    dwithin: float = DWITHIN,
+    edge_filter: CostFunction = lambda _, __, ___: True,
+    context: Literal["origin", "destination", "both"] = "origin",
+    first_id: int = 1,
+    tile_size: float = SNAP_TILE_SIZE,
+) -> List[Optional[ProjectedNode]]:
+    """Snap many points to the graph at once, with the same result for each
+    point as `waypoint_candidates` followed by `choose_candidate`.
+
+    Points are processed in spatially sorted tiles that share their edge
+    queries (see `EdgeTable.nearest_edges_many`), and the edge filter is
+    evaluated at most once per candidate edge (and once per edge of the
+    candidate nodes), however many points it is near. Because of this, for
+    candidates along an edge, the filter is evaluated on the whole edge and
+    its reverse rather than on the two temporary edges into which the edge is
+    split: filters must accept or reject edges regardless of their length.
+
+    :param G: Graph instance.
+    :param coords: The (lon, lat) points to snap.
+    :param k: Maximum number of candidates to consider per point.
+    :param dwithin: Distance (meters) from each point within which to search.
+    :param edge_filter: A function that return True for valid edges, False
+                        (or None) for invalid.
+    :param context: Whether the points are snapped as origins, destinations,
+                    or both.
+    :param first_id: The number of the temporary node ID of the first point:
+                     points are given the IDs "-{first_id}", "-{first_id + 1}",
+                     etc.
+    :param tile_size: The approximate width (meters) of tiles of points.
+    :returns: The snapped node of every point, in the same order as coords,
+              each None if no valid candidate was found.
+
+    """
+    edges = G.network.edges.nearest_edges_many(coords, k, dwithin, tile_size)
+    check = _CandidateCheck(G, context, edge_filter)
+
+    nodes: List[Optional[ProjectedNode]] = []
+    for i, ((lon, lat), point_edges) in enumerate(zip(coords, edges)):
+        point = Point(lon, lat)
+        node_id = f"-{first_id + i}"
+        chosen = None
+        for edge in point_edges:
+            candidate = create_temporary_node(G, edge, point, node_id=node_id)
+            if check.is_valid(edge, candidate):
+                chosen = candidate
+                break
+        nodes.append(chosen)
+
+    return nodes
+
+
+class _CandidateCheck:
+    # The `choose_candidate` checks, with filter results cached per edge
+    def __init__(
+        self,
+        G: DiGraphGPKGView,
+        context: Literal["origin", "destination", "both"],
+        edge_filter: CostFunction,
+    ):
+        self.G = G
+        self.context = context
+        self.edge_filter = edge_filter
+        # Filter results of on-graph edges
+        self.costs: Dict[Tuple[str, str], Any] = {}
+        # Whether nodes have any valid outgoing (True) or incoming (False)
+        # edges
+        self.nodes: Dict[Tuple[str, bool], bool] = {}
+
+    def is_valid(self, edge: EdgeTuple, candidate: ProjectedNode) -> bool:
+        if not candidate.edges_in and not candidate.edges_out:
+            if self.context in ("origin", "both"):
+                if not self._node_is_valid(candidate.n, True):
+                    return False
+            if self.context in ("destination", "both"):
+                if not self._node_is_valid(candidate.n, False):
+                    return False
+            return True
+
+        # Both the incoming and outgoing temporary edges are made of one part
+        # of the edge and, if the graph has it, one part of its reverse
+        u, v, d = edge
+        if self._cost(u, v, d):
+            return True
+        if candidate.edges_out is None or len(candidate.edges_out) < 2:
+            return False
+        # Filters accept or reject edges regardless of their length, so the
+        # part of the reverse stands in for all of it
+        _, _, d_rev = candidate.edges_out[1]
+        return bool(self._cost(v, u, d_rev))
+
+    def _node_is_valid(self, n: str, outgoing: bool) -> bool:
+        if (n, outgoing) not in self.nodes:
+            if outgoing:
+                pairs = [(n, v) for v in self.G.successors(n)]
+            else:
+                pairs = [(u, n) for u in self.G.predecessors(n)]
+            self.nodes[(n, outgoing)] = any(
+                self._cost(u, v, self.G[u][v]) is not None for u, v in pairs
+            )
+        return self.nodes[(n, outgoing)]
+
+    def _cost(self, u: str, v: str, d: EdgeData) -> Any:
+        if (u, v) not in self.costs:
+            self.costs[(u, v)] = self.edge_filter(u, v, d)
+        return self.costs[(u, v)]
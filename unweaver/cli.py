@@ -3,15 +3,26 @@ import os
 from typing import List
 
 import click
-import fiona  # type: ignore
 
-from unweaver.constants import DB_PATH
+from unweaver.constants import (
+    DB_PATH,
+    GRAPH_POOL_SIZE,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    ROW_CACHE_BYTES,
+)
 from unweaver.build.build_graph import build_graph
 from unweaver.build.get_layers_paths import get_layers_paths
+from unweaver.build.update_graph import update_graph
+from unweaver.contraction import (
+    ContractionHierarchy,
+    contract as contract_graph,
+)
 from unweaver.graphs import DiGraphGPKG
+from unweaver.io import estimate_feature_count
 from unweaver.parsers import parse_profiles
 from unweaver.server import run_app
-from unweaver.weight import precalculate_weight
+from unweaver.weight import precalculate_weights
 
 
 @click.group()
@@ -32,27 +43,67 @@ def unweaver() -> None:
     help="A property whose sign should be flipped when reversing an edge. "
     "Example: a positive steepness/incline field value should be made negative for the reverse edge.",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of processes that read and encode features. Rows are "
+    "written by a single process.",
+)
+@click.option(
+    "--bulk-load",
+    is_flag=True,
+    help="Write rows without journaling, then create all indices at the end. "
+    "Faster for large inputs.",
+)
+@click.option(
+    "--vacuum",
+    is_flag=True,
+    help="VACUUM the graph after a bulk load.",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Update an existing graph in place, writing only the edges (and "
+    "precalculated weights) of features that were added, removed or changed "
+    "since it was built.",
+)
 def build(
-    project_directory: str, precision: int, changes_sign: List[str]
+    project_directory: str,
+    precision: int,
+    changes_sign: List[str],
+    jobs: int,
+    bulk_load: bool,
+    vacuum: bool,
+    incremental: bool,
 ) -> None:
     """Build a routable GeoPackage (graph.gpkg in the project directory) from
     the data in the `{project}/layers` directory.
     """
+    if incremental:
+        click.echo("Updating graph...")
+        update_graph(
+            project_directory,
+            precision=precision,
+            changes_sign=list(changes_sign),
+            jobs=jobs,
+        )
+        click.echo("Done.")
+        return
+
     click.echo("Estimating feature count...")
     # TODO: catch errors in starting server
     # TODO: spawn process?
 
     layers_paths = get_layers_paths(project_directory)
 
-    n = 0
-    for path in layers_paths:
-        with fiona.open(path) as c:
-            n += len(c)
-            click.echo(f"    counted features in {path}")
+    # Sampled from the start of each file rather than counted by reading it
+    n = sum(estimate_feature_count(path) for path in layers_paths)
     # Two edges per feature - forward and reverse
     n *= 2
 
-    click.echo(f"Creating {n} edges from {n // 2} features")
+    click.echo(f"Creating about {n} edges from about {n // 2} features")
 
     with click.progressbar(length=n, label="Importing features") as bar:
         build_graph(
@@ -60,6 +111,9 @@ def build(
             precision=precision,
             changes_sign=changes_sign,
             counter=bar,
+            jobs=jobs,
+            bulk_load=bulk_load,
+            vacuum=vacuum,
         )
 
     click.echo("Done.")
@@ -67,22 +121,56 @@ def build(
 
 @unweaver.command()
 @click.argument("project_directory", type=click.Path())
-def weight(project_directory: str) -> None:
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of processes that calculate weights. Results are written "
+    "by a single process.",
+)
+def weight(project_directory: str, jobs: int) -> None:
     """Precalculate all static weights for all profiles in a project."""
     # TODO: catch errors in starting server
-    # TODO: spawn process?
     click.echo("Collecting data for static weighting...")
     profiles = parse_profiles(project_directory)
-    G = DiGraphGPKG(path=os.path.join(project_directory, DB_PATH))
-    n_profiles = len([p for p in profiles if p.get("precalculate", False)])
-    n = G.size() * n_profiles
+    path = os.path.join(project_directory, DB_PATH)
+    G = DiGraphGPKG(path=path)
+    # Every profile is weighted in the same scan of the edges
+    n = G.size()
+    # Worker processes must not inherit an open connection: close it before
+    # they are started, and open the graph again once they are done.
+    G.network.gpkg.close()
     with click.progressbar(length=n, label="Computing static weights") as bar:
-        for profile in profiles:
-            if profile["precalculate"]:
-                weight_column = f"_weight_{profile['id']}"
-                precalculate_weight(
-                    G, weight_column, profile["cost_function"], counter=bar
+        precalculate_weights(project_directory, counter=bar, jobs=jobs)
+    G = DiGraphGPKG(path=path)
+    for profile in profiles:
+        if profile["precalculate"]:
+            # Any existing hierarchy was built from the old weights
+            ContractionHierarchy.drop(G.network, profile["id"])
+
+
+@unweaver.command()
+@click.argument("project_directory", type=click.Path())
+def contract(project_directory: str) -> None:
+    """Build contraction hierarchies for all profiles with precalculated
+    weights, for faster shortest-path routes. Run after `weight`.
+    """
+    click.echo("Collecting data for contraction...")
+    profiles = parse_profiles(project_directory)
+    G = DiGraphGPKG(path=os.path.join(project_directory, DB_PATH))
+    n = len(G.network.nodes)
+    for profile in profiles:
+        if profile["precalculate"]:
+            label = f"Contracting {profile['id']}"
+            with click.progressbar(length=n, label=label) as bar:
+                hierarchy = contract_graph(
+                    G, f"_weight_{profile['id']}", counter=bar
                 )
+            hierarchy.write(G.network, profile["id"])
+            click.echo(
+                f"    {hierarchy.number_of_edges} edges, including shortcuts"
+            )
 
 
 @unweaver.command()
@@ -101,8 +189,52 @@ def weight(project_directory: str) -> None:
     is_flag=True,
     help="Whether to run the server with in-browser error tracebacks.",
 )
+@click.option(
+    "--csr",
+    is_flag=True,
+    help="Load the graph's adjacency and edge attributes into memory at "
+    "startup for faster routing. Edge geometries stay in the GeoPackage.",
+)
+@click.option(
+    "--spatial-index",
+    is_flag=True,
+    help="Load the graph's edge geometries into an in-memory grid index at "
+    "startup, for faster snapping of waypoints to edges.",
+)
+@click.option(
+    "--pool-size",
+    default=GRAPH_POOL_SIZE,
+    help="Maximum number of read-only database connections shared by "
+    "concurrent requests.",
+)
+@click.option(
+    "--cache-bytes",
+    default=ROW_CACHE_BYTES,
+    help="Memory budget, in bytes, for caching graph nodes, edges, and "
+    "adjacency lists across requests. 0 disables the cache.",
+)
+@click.option(
+    "--response-cache-size",
+    default=RESPONSE_CACHE_SIZE,
+    help="Maximum number of results to reuse for repeated requests that "
+    "snap to the same places. 0 disables the cache.",
+)
+@click.option(
+    "--response-cache-ttl",
+    default=RESPONSE_CACHE_TTL,
+    help="Number of seconds for which cached results are reused.",
+)
 def serve(
-    project_directory: str, host: str, port: str, debug: bool = False
+    project_directory: str,
+    host: str,
+    port: str,
+    debug: bool = False,
+    csr: bool = False,
+    spatial_index: bool = False,
+    pool_size: int = GRAPH_POOL_SIZE,
+    cache_bytes: int = ROW_CACHE_BYTES,
+    response_cache_size: int = RESPONSE_CACHE_SIZE,
+    response_cache_ttl: float = RESPONSE_CACHE_TTL,
 ) -> None:
     """Run a web server with auto-generated web API endpoints that return
     JSON for shortest-path routes, shortest-path trees, and reachable trees
@@ -111,4 +243,15 @@ def serve(
     click.echo(f"Starting server in {project_directory}...")
     # TODO: catch errors in starting server
     # TODO: spawn process?
-    run_app(project_directory, host=host, port=port, debug=debug)
+    run_app(
+        project_directory,
+        host=host,
+        port=port,
+        debug=debug,
+        csr=csr,
+        pool_size=pool_size,
+        cache_bytes=cache_bytes,
+        response_cache_size=response_cache_size,
+        response_cache_ttl=response_cache_ttl,
+        spatial_index=spatial_index,
+    )
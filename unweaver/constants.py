@@ -3,9 +3,82 @@
 # Expected database location
 DB_PATH = "graph.gpkg"
 
-# The rectangular distance (r-tree distance in meters) within to search for
-# nearby edges.
+# The distance (meters) within which to search for nearby edges.
 DWITHIN = 30
 
+# The initial search radius (meters) of nearest-feature searches, which is
+# doubled until the nearest features are found (or DWITHIN is reached)
+NEAREST_RADIUS = 8
+
+# The approximate width (meters) of the grid cells of in-memory edge indices
+# (`serve --spatial-index`)
+EDGE_INDEX_CELL_SIZE = 50
+
+# The approximate width (meters) of the tiles into which batches of points
+# are grouped when snapping them to the graph (`snap_points`): the edges near
+# the points of a tile are read once
+SNAP_TILE_SIZE = 100
+
 # Default database insert/update batch size
 BATCH_SIZE = 1000
+
+# Page cache size (bytes) of bulk-loaded (`build --bulk-load`) GeoPackages
+BULK_LOAD_CACHE_SIZE = 512 * 2**20
+
+# Maximum number of distinct nodes held in memory while building a graph,
+# beyond which they are spilled to a temporary table
+NODE_STAGING_SIZE = 500000
+
+# Number of consecutive edge fids weighted by each task of `weight --jobs`
+WEIGHT_SHARD_SIZE = 20 * BATCH_SIZE
+
+# Maximum number of bound parameters in a single SQLite statement (the default
+# limit of older SQLite builds)
+SQLITE_MAX_VARIABLES = 999
+
+# Default maximum number of read-only graph handles (database connections)
+# shared by the web server's request threads
+GRAPH_POOL_SIZE = 4
+
+# Default memory budget (bytes) of the node, edge, and adjacency cache shared
+# by the web server's request threads
+ROW_CACHE_BYTES = 64 * 2**20
+
+# Default maximum number of analysis results cached by the web server, and
+# the number of seconds for which they are valid
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 300
+
+# Waypoints snapped to within this many meters of the same place along an
+# edge share cached analysis results
+SNAP_KEY_PRECISION = 1
+
+# Maximum number of origins (and of destinations) in one cost matrix request
+MAX_COST_MATRIX_POINTS = 500
+
+# Maximum number of waypoints in one route request
+MAX_ROUTE_WAYPOINTS = 100
+
+# Maximum number of stops in one trip (visiting order) request
+MAX_TRIP_STOPS = 100
+
+# Default number of seconds for which a trip's visiting order is improved
+TRIP_TIME_BUDGET = 1.0
+
+# Maximum number of origins in one multi-origin reachable tree request
+MAX_REACHABLE_TREE_ORIGINS = 500
+
+# Default distance (meters) around reachable edges included in isochrone
+# polygons, and the tolerance (meters) with which the polygons are simplified
+ISOCHRONE_BUFFER = 20
+ISOCHRONE_TOLERANCE = 5
+
+# Maximum number of cost bands in one isochrone request
+MAX_ISOCHRONE_BANDS = 10
+
+# Number of decimal places kept in polyline-encoded coordinates (about 0.1
+# meters)
+POLYLINE_PRECISION = 6
+
+# Approximate size (characters) of the chunks of streamed responses
+STREAM_CHUNK_SIZE = 64 * 2**10
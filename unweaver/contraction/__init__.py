@@ -0,0 +1,4 @@
+from .contract import contract
+from .hierarchy import ContractionHierarchy
+
+__all__ = ("ContractionHierarchy", "contract")
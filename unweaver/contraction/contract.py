@@ -0,0 +1,189 @@
+"""Build contraction hierarchies from precalculated edge weights."""
+from heapq import heapify, heappop, heappush
+from typing import Dict, List, Optional, Tuple
+
+from click._termui_impl import ProgressBar
+
+from unweaver.graphs import DiGraphGPKGView
+from .hierarchy import ContractionHierarchy, HierarchyEdge
+
+# Maximum number of nodes settled by a single witness search. Lower values
+# contract faster but may add unnecessary (though harmless) shortcuts.
+WITNESS_SETTLE_LIMIT = 64
+
+# Mapping from neighbor index to (weight, via index or -1)
+Neighbors = Dict[int, Tuple[float, int]]
+
+
+def contract(
+    G: DiGraphGPKGView,
+    weight_column: str,
+    counter: Optional[ProgressBar] = None,
+    settle_limit: int = WITNESS_SETTLE_LIMIT,
+) -> ContractionHierarchy:
+    """Build a contraction hierarchy using a precalculated weight column.
+    Edges with no weight (NULL) are treated as impassable.
+
+    :param G: The graph.
+    :param weight_column: The name of the precalculated weight column, e.g.
+                          _weight_<profile id>.
+    :param counter: A progress bar, updated once per contracted node.
+    :param settle_limit: The maximum number of nodes settled by a witness
+                         search.
+
+    """
+    edges = G.network.edges
+    if weight_column not in edges._get_column_names():
+        raise ValueError(
+            f"No {weight_column} column: precalculate weights first."
+        )
+
+    node_ids: List[str] = []
+    node_index: Dict[str, int] = {}
+    out: List[Neighbors] = []
+    inn: List[Neighbors] = []
+
+    def index(n: str) -> int:
+        if n not in node_index:
+            node_index[n] = len(node_ids)
+            node_ids.append(n)
+            out.append({})
+            inn.append({})
+        return node_index[n]
+
+    with G.network.gpkg.connect() as conn:
+        cursor = conn.cursor()
+        # Plain tuples: the dict row factory is too slow for full scans
+        cursor.row_factory = None
+        rows = cursor.execute(
+            f"""
+            SELECT {edges.u_key}, {edges.v_key}, {weight_column}
+              FROM {edges.name}
+             WHERE {weight_column} IS NOT NULL
+        """
+        )
+        for u, v, weight in rows:
+            if u == v:
+                continue
+            i, j = index(u), index(v)
+            if j not in out[i] or weight < out[i][j][0]:
+                out[i][j] = (weight, -1)
+                inn[j][i] = (weight, -1)
+
+    ranks, hierarchy_edges = _contract(out, inn, counter, settle_limit)
+
+    return ContractionHierarchy(node_ids, ranks, hierarchy_edges)
+
+
+def _contract(
+    out: List[Neighbors],
+    inn: List[Neighbors],
+    counter: Optional[ProgressBar],
+    settle_limit: int,
+) -> Tuple[List[int], List[HierarchyEdge]]:
+    n = len(out)
+    ranks = [0] * n
+    deleted = [0] * n
+    hierarchy_edges: List[HierarchyEdge] = []
+
+    def priority(v: int, shortcuts: List[Tuple[int, int, float]]) -> int:
+        # Edge difference plus the number of already-contracted neighbors,
+        # which spreads contraction evenly over the graph.
+        return len(shortcuts) - len(out[v]) - len(inn[v]) + deleted[v]
+
+    queue = [
+        (priority(v, _shortcuts(out, inn, v, settle_limit)), v)
+        for v in range(n)
+    ]
+    heapify(queue)
+
+    rank = 0
+    while queue:
+        _, v = heappop(queue)
+        shortcuts = _shortcuts(out, inn, v, settle_limit)
+        p = priority(v, shortcuts)
+        if queue and p > queue[0][0]:
+            # Lazy update: the priority is stale, try again later
+            heappush(queue, (p, v))
+            continue
+
+        ranks[v] = rank
+        rank += 1
+
+        # The remaining neighbors will all be ranked higher than v
+        for w, (weight, via) in out[v].items():
+            hierarchy_edges.append((v, w, weight, via))
+            del inn[w][v]
+            deleted[w] += 1
+        for u, (weight, via) in inn[v].items():
+            hierarchy_edges.append((u, v, weight, via))
+            del out[u][v]
+            deleted[u] += 1
+        out[v] = {}
+        inn[v] = {}
+
+        for u, w, weight in shortcuts:
+            if w not in out[u] or weight < out[u][w][0]:
+                out[u][w] = (weight, v)
+                inn[w][u] = (weight, v)
+
+        if counter is not None:
+            counter.update(1)
+
+    return ranks, hierarchy_edges
+
+
+def _shortcuts(
+    out: List[Neighbors], inn: List[Neighbors], v: int, settle_limit: int
+) -> List[Tuple[int, int, float]]:
+    # The shortcuts needed to preserve shortest paths if v were removed: one
+    # for every u -> v -> w path with no cheaper 'witness' path avoiding v.
+    if not out[v] or not inn[v]:
+        return []
+    max_out = max(weight for weight, _ in out[v].values())
+
+    shortcuts = []
+    for u, (weight_in, _) in inn[v].items():
+        targets = set(out[v]) - {u}
+        if not targets:
+            continue
+        dist = _witness_search(
+            out, u, v, weight_in + max_out, targets, settle_limit
+        )
+        for w in targets:
+            weight = weight_in + out[v][w][0]
+            if w not in dist or dist[w] > weight:
+                shortcuts.append((u, w, weight))
+    return shortcuts
+
+
+def _witness_search(
+    out: List[Neighbors],
+    source: int,
+    excluded: int,
+    max_cost: float,
+    targets: set,
+    settle_limit: int,
+) -> Dict[int, float]:
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    remaining = set(targets)
+    settled = 0
+    while heap:
+        d, u = heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > max_cost:
+            break
+        remaining.discard(u)
+        settled += 1
+        if not remaining or settled > settle_limit:
+            break
+        for w, (weight, _) in out[u].items():
+            if w == excluded:
+                continue
+            dw = d + weight
+            if w not in dist or dw < dist[w]:
+                dist[w] = dw
+                heappush(heap, (dw, w))
+    return dist
@@ -0,0 +1,439 @@
+"""An in-memory contraction hierarchy and its GeoPackage storage."""
+# Imported so that methods can be annotated to return class instance
+from __future__ import annotations
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from unweaver.exceptions import NoPathError
+from unweaver.network_adapters import GeoPackageNetwork
+
+# (u index, v index, weight, via index or -1 for an original edge)
+HierarchyEdge = Tuple[int, int, float, int]
+
+
+class ContractionHierarchy:
+    """A contraction hierarchy for a single static edge weight: every node
+    has a rank (its contraction order) and the graph has been augmented with
+    shortcut edges so that any shortest path can be found by two small
+    searches that only ever move 'upward' in rank, one from the origin and
+    one (backward) from the destination.
+
+    Edges are held in two compressed sparse row (CSR) arrays: the upward
+    edges leaving each node, and the downward edges entering each node (which
+    the backward search follows in reverse). A shortcut records the node it
+    bypasses (`via`) so that paths can be unpacked into original edges.
+
+    Hierarchies are created with `unweaver.contraction.contract` and stored in
+    two tables of the GeoPackage, `_ch_nodes_<profile id>` and
+    `_ch_edges_<profile id>`.
+
+    :param node_ids: The node IDs, indexed by node index.
+    :param ranks: The rank of every node, by node index.
+    :param edges: Every edge of the hierarchy (original edges and shortcuts).
+
+    """
+
+    def __init__(
+        self,
+        node_ids: Sequence[str],
+        ranks: Sequence[int],
+        edges: Iterable[HierarchyEdge],
+    ):
+        self.node_ids = list(node_ids)
+        self.node_index = {n: i for i, n in enumerate(self.node_ids)}
+        self.ranks = np.asarray(ranks, dtype=np.int64)
+
+        n = len(self.node_ids)
+        up: List[HierarchyEdge] = []
+        down: List[HierarchyEdge] = []
+        for edge in edges:
+            u, v = edge[0], edge[1]
+            if self.ranks[u] < self.ranks[v]:
+                up.append(edge)
+            else:
+                down.append(edge)
+
+        # Upward edges are grouped by their start node, downward edges by
+        # their end node.
+        (
+            self.up_offsets,
+            self.up_targets,
+            self.up_weights,
+            self.up_via,
+        ) = _csr(n, up, 0, 1)
+        (
+            self.down_offsets,
+            self.down_sources,
+            self.down_weights,
+            self.down_via,
+        ) = _csr(n, down, 1, 0)
+
+    def __contains__(self, n: object) -> bool:
+        return n in self.node_index
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.up_targets) + len(self.down_sources)
+
+    @staticmethod
+    def table_names(profile_id: str) -> Tuple[str, str]:
+        """The names of the tables that store the hierarchy for a profile.
+
+        :param profile_id: The profile ID.
+        :returns: The names of the node rank and edge tables.
+
+        """
+        return f"_ch_nodes_{profile_id}", f"_ch_edges_{profile_id}"
+
+    @classmethod
+    def exists(cls, network: GeoPackageNetwork, profile_id: str) -> bool:
+        """Check whether a GeoPackage has a stored hierarchy for a profile.
+
+        :param network: The GeoPackageNetwork.
+        :param profile_id: The profile ID.
+
+        """
+        nodes_table, edges_table = cls.table_names(profile_id)
+        with network.gpkg.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT COUNT(*) c
+                  FROM sqlite_master
+                 WHERE type = 'table'
+                   AND name IN (?, ?)
+            """,
+                (nodes_table, edges_table),
+            )
+            return next(rows)["c"] == 2
+
+    @classmethod
+    def drop(cls, network: GeoPackageNetwork, profile_id: str) -> None:
+        """Delete the stored hierarchy for a profile, if there is one.
+
+        :param network: The GeoPackageNetwork.
+        :param profile_id: The profile ID.
+
+        """
+        with network.gpkg.connect() as conn:
+            for table in cls.table_names(profile_id):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+    @classmethod
+    def from_network(
+        cls, network: GeoPackageNetwork, profile_id: str
+    ) -> ContractionHierarchy:
+        """Load a stored hierarchy into memory.
+
+        :param network: The GeoPackageNetwork.
+        :param profile_id: The profile ID.
+
+        """
+        nodes_table, edges_table = cls.table_names(profile_id)
+        with network.gpkg.connect() as conn:
+            cursor = conn.cursor()
+            # Plain tuples: the dict row factory is too slow for full scans
+            cursor.row_factory = None
+            node_rows = cursor.execute(
+                f"SELECT _n, rank FROM {nodes_table} ORDER BY rank"
+            ).fetchall()
+            node_ids = [row[0] for row in node_rows]
+            node_index = {n: i for i, n in enumerate(node_ids)}
+            ranks = [row[1] for row in node_rows]
+            edges = [
+                (
+                    node_index[u],
+                    node_index[v],
+                    weight,
+                    -1 if via is None else node_index[via],
+                )
+                for u, v, weight, via in cursor.execute(
+                    f"SELECT _u, _v, weight, via FROM {edges_table}"
+                )
+            ]
+        return cls(node_ids, ranks, edges)
+
+    def write(self, network: GeoPackageNetwork, profile_id: str) -> None:
+        """Store the hierarchy in a GeoPackage, replacing any existing
+        hierarchy for the same profile.
+
+        :param network: The GeoPackageNetwork.
+        :param profile_id: The profile ID.
+
+        """
+        self.drop(network, profile_id)
+        nodes_table, edges_table = self.table_names(profile_id)
+        node_ids = self.node_ids
+        with network.gpkg.connect() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE {nodes_table} (
+                    _n TEXT PRIMARY KEY,
+                    rank INTEGER NOT NULL
+                )
+            """
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE {edges_table} (
+                    _u TEXT NOT NULL,
+                    _v TEXT NOT NULL,
+                    weight REAL NOT NULL,
+                    via TEXT
+                )
+            """
+            )
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT INTO {nodes_table} VALUES (?, ?)",
+                zip(node_ids, self.ranks.tolist()),
+            )
+            conn.executemany(
+                f"INSERT INTO {edges_table} VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        node_ids[u],
+                        node_ids[v],
+                        weight,
+                        None if via < 0 else node_ids[via],
+                    )
+                    for u, v, weight, via in self.iter_edges()
+                ),
+            )
+            conn.execute("COMMIT")
+
+    def iter_edges(self) -> Iterable[HierarchyEdge]:
+        """Iterate over every edge of the hierarchy by node index."""
+        for i in range(len(self.node_ids)):
+            start, end = self.up_offsets[i], self.up_offsets[i + 1]
+            for v, weight, via in zip(
+                self.up_targets[start:end].tolist(),
+                self.up_weights[start:end].tolist(),
+                self.up_via[start:end].tolist(),
+            ):
+                yield i, v, weight, via
+            start, end = self.down_offsets[i], self.down_offsets[i + 1]
+            for u, weight, via in zip(
+                self.down_sources[start:end].tolist(),
+                self.down_weights[start:end].tolist(),
+                self.down_via[start:end].tolist(),
+            ):
+                yield u, i, weight, via
+
+    def search(
+        self, sources: Dict[str, float], targets: Dict[str, float]
+    ) -> Tuple[float, List[str]]:
+        """Find the shortest path from any of a set of source nodes to any of
+        a set of target nodes, each with an initial cost (e.g. the cost of
+        reaching a source from a point part-way along an edge).
+
+        :param sources: Mapping from source node ID to initial cost.
+        :param targets: Mapping from target node ID to final cost.
+        :returns: The total cost and the node IDs of the path, unpacked into
+                  original edges.
+
+        """
+        dists: Tuple[Dict[int, float], Dict[int, float]] = ({}, {})
+        parents: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        heaps: Tuple[List[Tuple[float, int]], List[Tuple[float, int]]] = (
+            [],
+            [],
+        )
+        for direction, initial in enumerate((sources, targets)):
+            for n, cost in initial.items():
+                i = self.node_index.get(n)
+                if i is None:
+                    continue
+                if i not in dists[direction] or cost < dists[direction][i]:
+                    dists[direction][i] = cost
+                    heappush(heaps[direction], (cost, i))
+
+        adjacency = (
+            (self.up_offsets, self.up_targets, self.up_weights),
+            (self.down_offsets, self.down_sources, self.down_weights),
+        )
+
+        best = float("inf")
+        meeting = -1
+        direction = 1
+        while heaps[0] or heaps[1]:
+            direction = 1 - direction
+            if not heaps[direction]:
+                direction = 1 - direction
+            heap = heaps[direction]
+            dist = dists[direction]
+            parent = parents[direction]
+
+            d, i = heappop(heap)
+            if d > dist[i]:
+                continue
+            if d >= best:
+                # Nothing left in this direction can improve the path
+                heap.clear()
+                continue
+
+            other = dists[1 - direction]
+            if i in other and d + other[i] < best:
+                best = d + other[i]
+                meeting = i
+
+            offsets, neighbors, weights = adjacency[direction]
+            start, end = offsets[i], offsets[i + 1]
+            for j, weight in zip(
+                neighbors[start:end].tolist(), weights[start:end].tolist()
+            ):
+                dj = d + weight
+                if j not in dist or dj < dist[j]:
+                    dist[j] = dj
+                    parent[j] = i
+                    heappush(heap, (dj, j))
+
+        if meeting < 0:
+            raise NoPathError("No viable path found.")
+
+        forward = [meeting]
+        while forward[-1] in parents[0]:
+            forward.append(parents[0][forward[-1]])
+        forward.reverse()
+        backward = [meeting]
+        while backward[-1] in parents[1]:
+            backward.append(parents[1][backward[-1]])
+
+        path = self.unpack(forward + backward[1:])
+        cost = dists[0][meeting] + dists[1][meeting]
+
+        return cost, [self.node_ids[i] for i in path]
+
+    def many_to_many(
+        self,
+        sources: Sequence[Dict[str, float]],
+        targets: Sequence[Dict[str, float]],
+    ) -> List[List[Optional[float]]]:
+        """Find the shortest path costs from every source to every target
+        with a bucket-based search: one backward upward search per target
+        records its costs in 'buckets' at the nodes that it reaches, then one
+        forward upward search per source combines its costs with the buckets
+        of the nodes that it reaches.
+
+        :param sources: One mapping per source from node ID to initial cost,
+                        as for `search`.
+        :param targets: One mapping per target from node ID to final cost.
+        :returns: A list of rows, one per source, of the costs to each target.
+                  Targets that cannot be reached are None.
+
+        """
+        buckets: Dict[int, List[Tuple[int, float]]] = {}
+        for j, initial in enumerate(targets):
+            for i, d in self._upward(initial, backward=True).items():
+                buckets.setdefault(i, []).append((j, d))
+
+        matrix: List[List[Optional[float]]] = []
+        for initial in sources:
+            row: List[Optional[float]] = [None] * len(targets)
+            for i, d in self._upward(initial, backward=False).items():
+                for j, dj in buckets.get(i, ()):
+                    total = d + dj
+                    best = row[j]
+                    if best is None or total < best:
+                        row[j] = total
+            matrix.append(row)
+
+        return matrix
+
+    def _upward(
+        self, initial: Dict[str, float], backward: bool
+    ) -> Dict[int, float]:
+        # Every node reachable by an upward search, with its cost. Backward
+        # searches follow the downward edges in reverse.
+        if backward:
+            offsets, neighbors, weights = (
+                self.down_offsets,
+                self.down_sources,
+                self.down_weights,
+            )
+        else:
+            offsets, neighbors, weights = (
+                self.up_offsets,
+                self.up_targets,
+                self.up_weights,
+            )
+
+        dist: Dict[int, float] = {}
+        heap: List[Tuple[float, int]] = []
+        for n, cost in initial.items():
+            i = self.node_index.get(n)
+            if i is None:
+                continue
+            if i not in dist or cost < dist[i]:
+                dist[i] = cost
+                heappush(heap, (cost, i))
+
+        settled: Dict[int, float] = {}
+        while heap:
+            d, i = heappop(heap)
+            if i in settled:
+                continue
+            settled[i] = d
+            start, end = offsets[i], offsets[i + 1]
+            for j, weight in zip(
+                neighbors[start:end].tolist(), weights[start:end].tolist()
+            ):
+                dj = d + weight
+                if j not in dist or dj < dist[j]:
+                    dist[j] = dj
+                    heappush(heap, (dj, j))
+
+        return settled
+
+    def unpack(self, path: List[int]) -> List[int]:
+        """Replace the shortcuts along a path (of node indices) with the
+        original edges that they bypass.
+
+        :param path: The node indices of a path through the hierarchy.
+
+        """
+        unpacked = path[:1]
+        for u, v in zip(path, path[1:]):
+            stack = [(u, v)]
+            while stack:
+                a, b = stack.pop()
+                via = self._via(a, b)
+                if via < 0:
+                    unpacked.append(b)
+                else:
+                    # Visit (a, via) first
+                    stack.append((via, b))
+                    stack.append((a, via))
+        return unpacked
+
+    def _via(self, u: int, v: int) -> int:
+        if self.ranks[u] < self.ranks[v]:
+            start, end = self.up_offsets[u], self.up_offsets[u + 1]
+            neighbors = self.up_targets[start:end]
+            vias = self.up_via[start:end]
+            j = v
+        else:
+            start, end = self.down_offsets[v], self.down_offsets[v + 1]
+            neighbors = self.down_sources[start:end]
+            vias = self.down_via[start:end]
+            j = u
+        matches = np.flatnonzero(neighbors == j)
+        if not len(matches):
+            raise KeyError((self.node_ids[u], self.node_ids[v]))
+        return int(vias[matches[0]])
+
+
+def _csr(
+    n: int, edges: List[HierarchyEdge], key: int, other: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    edges.sort(key=lambda e: e[key])
+    counts = np.bincount(
+        np.array([e[key] for e in edges], dtype=np.int64), minlength=n
+    )
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    neighbors = np.array([e[other] for e in edges], dtype=np.int64)
+    weights = np.array([e[2] for e in edges], dtype=np.float64)
+    via = np.array([e[3] for e in edges], dtype=np.int64)
+    return offsets, neighbors, weights, via
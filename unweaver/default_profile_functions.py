@@ -1,7 +1,13 @@
-from typing import List, Optional
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 
 from unweaver.geojson import Feature, Point
-from unweaver.graph_types import CostFunction, EdgeData
+from unweaver.graph_types import (
+    CostFunction,
+    EdgeData,
+    VectorizedCostFunction,
+)
 from unweaver.graphs import DiGraphGPKG, DiGraphGPKGView
 from unweaver.shortest_paths.shortest_path_tree import Paths, ReachedNodes
 
@@ -17,6 +23,19 @@ def cost_function_generator(G: DiGraphGPKGView) -> CostFunction:
     return cost_function
 
 
+def vectorized_cost_function_generator(
+    G: DiGraphGPKGView,
+) -> VectorizedCostFunction:
+    def cost_function(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        # Same as cost_function: NaN (missing) lengths are impassable
+        length = columns.get("length")
+        if length is None:
+            return np.full(len(columns["_u"]), np.nan)
+        return length
+
+    return cost_function
+
+
 def shortest_path(
     status: str,
     G: DiGraphGPKG,
@@ -52,25 +71,11 @@ def shortest_path_tree(
         "paths": list(paths),
         "edges": {
             "type": "FeatureCollection",
-            "features": [
-                {
-                    "type": "Feature",
-                    "geometry": edge.pop(G.network.edges.geom_column),
-                    "properties": edge,
-                }
-                for edge in edges
-            ],
+            "features": _edge_features(G, edges),
         },
         "node_costs": {
             "type": "FeatureCollection",
-            "features": [
-                {
-                    "type": "Feature",
-                    "geometry": n.geom,
-                    "properties": {"cost": n.cost},
-                }
-                for n in nodes.values()
-            ],
+            "features": _node_features(nodes),
         },
     }
 
@@ -86,6 +91,21 @@ def reachable_tree(
     """Return the total extent of reachable edges."""
     # FIXME: coordinates are derived from node string, should be derived from
     # node metadata (add node coordinates in graph data).
+    return {
+        "status": status,
+        "origin": origin,
+        "edges": {
+            "type": "FeatureCollection",
+            "features": _edge_features(G, _unique_edges(edges)),
+        },
+        "node_costs": {
+            "type": "FeatureCollection",
+            "features": _node_features(nodes),
+        },
+    }
+
+
+def _unique_edges(edges: Iterable[EdgeData]) -> List[EdgeData]:
     unique_edges = []
     seen = set()
     for edge in edges:
@@ -100,30 +120,141 @@ def reachable_tree(
 
         unique_edges.append(edge)
         seen.add(edge_id)
+    return unique_edges
+
+
+def _edge_features(
+    G: DiGraphGPKGView, edges: Iterable[EdgeData]
+) -> List[dict]:
+    # Edges are left as they are, as they may be cached and reused
+    geom_column = G.network.edges.geom_column
+    return [
+        {
+            "type": "Feature",
+            "geometry": edge[geom_column],
+            "properties": {k: v for k, v in edge.items() if k != geom_column},
+        }
+        for edge in edges
+    ]
+
+
+def _node_features(nodes: ReachedNodes) -> List[dict]:
+    return [
+        {
+            "type": "Feature",
+            "geometry": node.geom,
+            "properties": {"cost": node.cost},
+        }
+        for node in nodes.values()
+    ]
+
+
+def cost_matrix(
+    status: str,
+    G: DiGraphGPKGView,
+    origins: Sequence[Feature[Point]],
+    destinations: Sequence[Feature[Point]],
+    costs: List[List[Optional[float]]],
+) -> dict:
+    """Return the cost from every origin (row) to every destination
+    (column), or null where there is no path."""
+    return {
+        "status": status,
+        "origins": list(origins),
+        "destinations": list(destinations),
+        "costs": costs,
+    }
+
+
+def route(
+    status: str,
+    G: DiGraphGPKGView,
+    waypoints: Sequence[Feature[Point]],
+    cost: float,
+    legs: List[Tuple[float, List[str], List[EdgeData]]],
+) -> dict:
+    """Return the cost and edges of every leg between consecutive waypoints,
+    and the geometry of the whole route."""
+    geom_column = G.network.edges.geom_column
+    coordinates: List[List[float]] = []
+    for _, _, edges in legs:
+        for edge in edges:
+            edge_coordinates = edge[geom_column]["coordinates"]
+            # Consecutive edges share their ends
+            if coordinates and list(coordinates[-1]) == list(
+                edge_coordinates[0]
+            ):
+                edge_coordinates = edge_coordinates[1:]
+            coordinates.extend(edge_coordinates)
+
+    return {
+        "status": status,
+        "waypoints": list(waypoints),
+        "total_cost": cost,
+        "geometry": {"type": "LineString", "coordinates": coordinates},
+        "legs": [
+            {"total_cost": leg_cost, "edges": edges}
+            for leg_cost, _, edges in legs
+        ],
+    }
+
+
+def trip(
+    status: str,
+    G: DiGraphGPKGView,
+    stops: Sequence[Feature[Point]],
+    order: List[int],
+    cost: float,
+    legs: List[Tuple[float, List[str], List[EdgeData]]],
+) -> dict:
+    """Return the order in which the stops are visited (as indices into
+    stops), along with the route that visits them in that order."""
+    result = route(status, G, [stops[i] for i in order], cost, legs)
+    result["stops"] = list(stops)
+    result["order"] = order
+    return result
+
+
+def reachable_tree_multi(
+    status: str,
+    G: DiGraphGPKGView,
+    origins: Sequence[Feature[Point]],
+    nodes: ReachedNodes,
+    edges: List[EdgeData],
+    nearest_origins: Mapping[str, int],
+) -> dict:
+    """Return the total extent of edges reachable from any of the origins,
+    with the cost of every node and its nearest origin (an index into
+    origins)."""
+    result = reachable_tree(status, G, origins[0], nodes, edges)
+    del result["origin"]
+    result["origins"] = list(origins)
+    for feature, key in zip(result["node_costs"]["features"], nodes):
+        feature["properties"]["origin"] = nearest_origins[key]
+    return result
 
+
+def isochrone(
+    status: str,
+    G: DiGraphGPKGView,
+    origin: Feature[Point],
+    costs: List[float],
+    polygons: List[Optional[dict]],
+) -> dict:
+    """Return the area reachable within each cost, as one polygon per cost,
+    greatest cost first. Each polygon contains those of lesser costs."""
     return {
         "status": status,
         "origin": origin,
-        "edges": {
-            "type": "FeatureCollection",
-            "features": [
-                {
-                    "type": "Feature",
-                    "geometry": edge.pop(G.network.edges.geom_column),
-                    "properties": edge,
-                }
-                for edge in unique_edges
-            ],
-        },
-        "node_costs": {
+        "isochrones": {
             "type": "FeatureCollection",
             "features": [
                 {
                     "type": "Feature",
-                    "geometry": node.geom,
-                    "properties": {"cost": node.cost},
+                    "geometry": polygon,
+                    "properties": {"cost": cost},
                 }
-                for node in nodes.values()
+                for cost, polygon in reversed(list(zip(costs, polygons)))
             ],
         },
     }
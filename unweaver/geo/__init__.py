@@ -1,3 +1,17 @@
 from .cut import cut, cut_off
+from .distance import (
+    distance_to_bounds,
+    distance_to_geometry,
+    meters_per_degree,
+)
+from .polyline import decode_polyline, encode_polyline
 
-__all__ = ("cut", "cut_off")
+__all__ = (
+    "cut",
+    "cut_off",
+    "decode_polyline",
+    "distance_to_bounds",
+    "distance_to_geometry",
+    "encode_polyline",
+    "meters_per_degree",
+)
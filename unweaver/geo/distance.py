@@ -0,0 +1,76 @@
+"""Distances (in meters) from a point to nearby longitude-latitude geometries,
+measured in a local equirectangular frame centered on the point. At the scale
+of snapping a point to a graph (up to a few kilometers), the error is well
+below that of the data."""
+import math
+from typing import Sequence, Tuple
+
+from unweaver.utils import RADIUS
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = RADIUS * math.pi / 180
+
+
+def meters_per_degree(lat: float) -> Tuple[float, float]:
+    """The scale of the local frame at a latitude.
+
+    :param lat: The latitude of the center of the frame.
+    :returns: Meters per degree of longitude and per degree of latitude.
+
+    """
+    return METERS_PER_DEGREE * math.cos(math.radians(lat)), METERS_PER_DEGREE
+
+
+def distance_to_bounds(
+    lon: float,
+    lat: float,
+    bounds: Sequence[float],
+    scale: Tuple[float, float],
+) -> float:
+    """The distance from a point to the nearest point of a bounding box, which
+    is never more than the distance to anything inside the box.
+
+    :param lon: The longitude of the point.
+    :param lat: The latitude of the point.
+    :param bounds: The bounding box, as (min x, max x, min y, max y).
+    :param scale: The scale of the frame (see `meters_per_degree`).
+
+    """
+    min_x, max_x, min_y, max_y = bounds
+    dx = max(min_x - lon, 0, lon - max_x) * scale[0]
+    dy = max(min_y - lat, 0, lat - max_y) * scale[1]
+    return math.hypot(dx, dy)
+
+
+def distance_to_geometry(
+    lon: float, lat: float, geometry: dict, scale: Tuple[float, float]
+) -> float:
+    """The distance from a point to a GeoJSON-like Point or LineString.
+
+    :param lon: The longitude of the point.
+    :param lat: The latitude of the point.
+    :param geometry: The geometry.
+    :param scale: The scale of the frame (see `meters_per_degree`).
+
+    """
+    mx, my = scale
+    if geometry["type"] == "Point":
+        x, y = geometry["coordinates"][:2]
+        return math.hypot((x - lon) * mx, (y - lat) * my)
+
+    coordinates = geometry["coordinates"]
+    x1 = (coordinates[0][0] - lon) * mx
+    y1 = (coordinates[0][1] - lat) * my
+    nearest = math.hypot(x1, y1)
+    for coordinate in coordinates[1:]:
+        x2 = (coordinate[0] - lon) * mx
+        y2 = (coordinate[1] - lat) * my
+        # The nearest point of the segment to the origin (the point)
+        dx = x2 - x1
+        dy = y2 - y1
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else -(x1 * dx + y1 * dy) / length2
+        t = min(max(t, 0.0), 1.0)
+        nearest = min(nearest, math.hypot(x1 + t * dx, y1 + t * dy))
+        x1, y1 = x2, y2
+    return nearest
@@ -0,0 +1,63 @@
+"""Encode coordinates as polyline strings: coordinate deltas, in
+fixed-precision integers packed into printable characters (the Google
+encoded polyline algorithm)."""
+from typing import List, Sequence, Tuple
+
+from unweaver.constants import POLYLINE_PRECISION
+
+
+def encode_polyline(
+    coordinates: Sequence[Sequence[float]],
+    precision: int = POLYLINE_PRECISION,
+) -> str:
+    """Encode (lon, lat) coordinates as a polyline string. As is the
+    convention for polylines, each point is encoded as (lat, lon).
+
+    :param coordinates: The (lon, lat) coordinates, e.g. of a GeoJSON
+                        LineString. Any further dimensions are ignored.
+    :param precision: The number of decimal places to keep.
+
+    """
+    factor = 10**precision
+    chars: List[str] = []
+    last_lat = last_lon = 0
+    for lon, lat, *_ in coordinates:
+        lat_i = round(lat * factor)
+        lon_i = round(lon * factor)
+        for delta in (lat_i - last_lat, lon_i - last_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chars.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chars.append(chr(value + 63))
+        last_lat, last_lon = lat_i, lon_i
+    return "".join(chars)
+
+
+def decode_polyline(
+    polyline: str, precision: int = POLYLINE_PRECISION
+) -> List[Tuple[float, float]]:
+    """Decode a polyline string into (lon, lat) coordinates.
+
+    :param polyline: The polyline string.
+    :param precision: The number of decimal places with which it was encoded.
+
+    """
+    factor = 10**precision
+    values: List[int] = []
+    value = shift = 0
+    for char in polyline:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+
+    coordinates = []
+    lat = lon = 0
+    for delta_lat, delta_lon in zip(values[::2], values[1::2]):
+        lat += delta_lat
+        lon += delta_lon
+        coordinates.append((lon / factor, lat / factor))
+    return coordinates
@@ -1,5 +1,10 @@
-from .geopackage import GeoPackage
+from .geopackage import FeatureTableMetadata, GeoPackage
 from .feature_table import FeatureTable
 from .geom_types import GeoPackageGeoms
 
-__all__ = ("GeoPackage", "FeatureTable", "GeoPackageGeoms")
+__all__ = (
+    "GeoPackage",
+    "FeatureTable",
+    "FeatureTableMetadata",
+    "GeoPackageGeoms",
+)
@@ -1,23 +1,45 @@
 # Import annotations from __future__ so that circular GeoPackage reference
 # doesn't have to be a string in its hint
 from __future__ import annotations
+from bisect import insort
 from dataclasses import asdict
-from typing import Any, Dict, Generator, Iterable, List, Tuple, TYPE_CHECKING
+from heapq import heappop, heappush
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 from click._termui_impl import ProgressBar
 import geomet.wkb  # type: ignore
-from pyproj import Transformer
+import numpy as np
 from pyproj.crs.crs import CRS
-from pyproj.enums import TransformDirection
-from shapely.geometry import LineString, Point, shape, Polygon  # type: ignore
+from shapely.geometry import LineString, Point, Polygon  # type: ignore
 from shapely.geometry.base import BaseGeometry  # type: ignore
-from shapely.ops import transform  # type: ignore
 
 from unweaver.geojson import (
     LineString as GeoJSONLineString,
     Point as GeoJSONPoint,
     Polygon as GeoJSONPolygon,
 )
+from unweaver.constants import (
+    BATCH_SIZE,
+    DWITHIN,
+    NEAREST_RADIUS,
+    SQLITE_MAX_VARIABLES,
+)
+from unweaver.geo.distance import (
+    distance_to_bounds,
+    distance_to_geometry,
+    meters_per_degree,
+)
 from unweaver.utils import haversine
 
 from .geom_types import GeoPackageGeoms
@@ -39,11 +61,47 @@ COL_TYPE_MAP = {
     type(None): "DOUBLE",
 }
 
-# FIXME: don't hardcore 26910, discover an appropriate projection based on
-# data. NOTE: this entire strategy is based around having no function to
-# calculate the distance (meters) between a LineString and a point directly. If
-# such a function were implemented, reprojection would be unnecessary.
-TO_SRID = 3740
+# Number of bits per axis of the grid on which Hilbert curve keys are computed
+HILBERT_ORDER = 16
+
+
+def hilbert_order(
+    bounds: List[Tuple[Any, float, float, float, float]],
+    order: int = HILBERT_ORDER,
+) -> List[Tuple[Any, float, float, float, float]]:
+    """Sort bounding boxes by the position of their centers along a Hilbert
+    curve, so that consecutive boxes are close together. Inserting boxes into
+    an R-tree in this order touches fewer of its nodes.
+
+    :param bounds: The boxes, as (id, min x, max x, min y, max y).
+    :param order: The number of bits per axis of the curve's grid.
+
+    """
+    if not bounds:
+        return []
+    boxes = np.array([b[1:] for b in bounds], dtype=np.float64)
+    x = boxes[:, 0] + boxes[:, 1]
+    y = boxes[:, 2] + boxes[:, 3]
+    x -= x.min()
+    y -= y.min()
+    scale = ((1 << order) - 1) / (max(x.max(), y.max()) or 1)
+    xi = (x * scale).astype(np.int64)
+    yi = (y * scale).astype(np.int64)
+
+    keys = np.zeros(len(bounds), dtype=np.int64)
+    s = 1 << (order - 1)
+    while s > 0:
+        rx = (xi & s) > 0
+        ry = (yi & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant
+        flip = rx & ~ry
+        xi = np.where(flip, s - 1 - xi, xi)
+        yi = np.where(flip, s - 1 - yi, yi)
+        xi, yi = np.where(ry, xi, yi), np.where(ry, yi, xi)
+        s >>= 1
+
+    return [bounds[i] for i in np.argsort(keys, kind="stable").tolist()]
 
 
 class FeatureTable:
@@ -62,11 +120,9 @@ class FeatureTable:
         self.geom_type = geom_type
         self.srid = srid
 
-        self.add_srs()
-
-        self.transformer = Transformer.from_crs(
-            f"epsg:{self.srid}", f"epsg:{TO_SRID}", always_xy=True
-        )
+        # A read-only GeoPackage must already have its spatial references
+        if not self.gpkg.read_only:
+            self.add_srs()
 
     def create_tables(self) -> None:
         """Initialize the feature_table's tables, as they do not yet exist."""
@@ -153,113 +209,252 @@ class FeatureTable:
             conn.execute(f"DROP TABLE {self.name}")
 
     def intersects(
-        self, left: float, bottom: float, right: float, top: float
-    ) -> Iterable[dict]:
-        """Finds features intersecting a bounding box.
+        self,
+        left: float,
+        bottom: float,
+        right: float,
+        top: float,
+        column_names: Optional[Sequence[str]] = None,
+        deserialize: bool = True,
+    ) -> Generator[dict, None, None]:
+        """Finds features intersecting a bounding box, in a single query that
+        joins the R-tree to the table. Rows are streamed as they are read.
 
         :param left: left coordinate of bounding box.
         :param bottom: bottom coordinate of bounding box.
         :param right: right coordinate of bounding box.
         :param top: top coordinate of bounding box.
+        :param column_names: The columns to read. The primary key is always
+                             included. Defaults to every column.
+        :param deserialize: Whether to decode geometries into GeoJSON-like
+                            dicts. If False, they are left encoded, so that
+                            only the rows that are kept need to be decoded
+                            (with `deserialize_row`).
         :returns: Generator of copies of edge data (represented as dicts).
 
         """
+        if column_names is None:
+            columns = "t.*"
+        else:
+            columns = ", ".join(
+                f"t.{c}"
+                for c in [self.primary_key]
+                + [c for c in column_names if c != self.primary_key]
+            )
+        decode = deserialize and (
+            column_names is None or self.geom_column in column_names
+        )
+
         with self.gpkg.connect() as conn:
-            rtree_rows = conn.execute(
+            rows = conn.execute(
                 f"""
-                SELECT id
-                  FROM rtree_{self.name}_{self.geom_column}
-                 WHERE maxX >= ?
-                   AND minX <= ?
-                   AND maxY >= ?
-                   AND minY <= ?
+                SELECT {columns}
+                  FROM rtree_{self.name}_{self.geom_column} AS r
+                  JOIN {self.name} AS t
+                    ON t.{self.primary_key} = r.id
+                 WHERE r.maxX >= ?
+                   AND r.minX <= ?
+                   AND r.maxY >= ?
+                   AND r.minY <= ?
             """,
                 (left, right, bottom, top),
             )
-            ids = [r["id"] for r in rtree_rows]
+            for row in rows:
+                yield self.deserialize_row(row) if decode else row
+
+    def get_geometry(self, primary_key: int) -> Optional[dict]:
+        """Retrieve only the (deserialized) geometry of a single feature.
+
+        :param primary_key: The primary key (fid) of the feature.
+        :returns: A GeoJSON-like geometry dict or None if the feature has no
+                  geometry.
+
+        """
+        with self.gpkg.connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT {self.geom_column}
+                  FROM {self.name}
+                 WHERE {self.primary_key} = ?
+            """,
+                (primary_key,),
+            ).fetchone()
+        if row is None or row[self.geom_column] is None:
+            return None
+        return self._deserialize_geometry(row[self.geom_column])
+
+    def get_geometries(
+        self, primary_keys: Iterable[int]
+    ) -> Dict[int, Optional[dict]]:
+        """Retrieve only the (deserialized) geometries of many features using
+        as few queries as possible.
+
+        :param primary_keys: The primary keys (fids) of the features.
+        :returns: Mapping from primary key to a GeoJSON-like geometry dict, or
+                  None if the feature has no geometry. Missing features are
+                  omitted.
 
-        rows = []
+        """
+        keys = list(set(primary_keys))
+        geometries: Dict[int, Optional[dict]] = {}
         with self.gpkg.connect() as conn:
-            for i in ids:
-                row_result = conn.execute(
+            for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" for k in chunk)
+                rows = conn.execute(
                     f"""
-                    SELECT *
+                    SELECT {self.primary_key}, {self.geom_column}
                       FROM {self.name}
-                     WHERE {self.primary_key} = ?
+                     WHERE {self.primary_key} IN ({placeholders})
                 """,
-                    (i,),
+                    chunk,
                 )
-                row = self.deserialize_row(next(row_result))
-                rows.append(row)
-        return (row for row in rows)
+                for row in rows:
+                    geometry = row[self.geom_column]
+                    geometries[row[self.primary_key]] = (
+                        None
+                        if geometry is None
+                        else self._deserialize_geometry(geometry)
+                    )
+        return geometries
 
-    def dwithin_rtree(
-        self, lon: float, lat: float, distance: float
+    def dwithin(
+        self, lon: float, lat: float, distance: float, sort: bool = False
     ) -> Iterable[dict]:
-        """Finds features within some distance of a point using a bounding box.
-        Includes all entries within the bounding box, not just those within the
-        exact distance.
+        """Finds features within some distance of a point.
 
         :param lon: The longitude of the query point.
         :param lat: The latitude of the query point.
         :param distance: distance from point to search ('DWithin').
+        :param sort: Sort the results by distance (nearest first). Results are
+                     always sorted, this is kept for compatibility.
         :returns: Generator of copies of edge data (represented as dicts).
 
         """
-        # NOTE: Because these transformations are each in one dimension,
-        #       reprojection is not necessary. Can just translate from lon to
-        #       meters, lat to meters separately.
-        x, y = self.transformer.transform(lon, lat)
-
-        left = x - distance
-        bottom = y - distance
-        right = x + distance
-        top = y + distance
-
-        left, bottom = self.transformer.transform(
-            left, bottom, direction=TransformDirection.INVERSE
-        )
-        right, top = self.transformer.transform(
-            right, top, direction=TransformDirection.INVERSE
-        )
-
-        return self.intersects(left, bottom, right, top)
+        # FIXME: check for existence of rtree and if it doesn't exist, raise
+        #        custom exception. Repeat for all methods that refer to rtree.
+        return (row for row, _ in self.nearest(lon, lat, None, distance))
 
-    def dwithin(
-        self, lon: float, lat: float, distance: float, sort: bool = False
-    ) -> Iterable[dict]:
-        """Finds features within some distance of a point using a bounding box.
+    def nearest(
+        self,
+        lon: float,
+        lat: float,
+        k: Optional[int] = 1,
+        max_distance: float = DWITHIN,
+    ) -> List[Tuple[dict, float]]:
+        """Finds the k features nearest to a point, within a maximum distance.
+
+        The R-tree is searched within a box around the point, starting small
+        (NEAREST_RADIUS) and doubling until the k nearest features are
+        certain: everything outside of the box is farther than its radius.
+        Features are measured in order of the distance to their bounding box
+        and only while they could be nearer than the kth feature found so
+        far. Distances are measured in a local frame around the point (see
+        `unweaver.geo.distance`), without reprojecting geometries.
 
         :param lon: The longitude of the query point.
         :param lat: The latitude of the query point.
-        :param distance: distance from point to search ('DWithin').
-        :param sort: Sort the results by distance (nearest first).
-        :returns: Generator of copies of edge data (represented as dicts).
+        :param k: The maximum number of features to find. If None, every
+                  feature within max_distance is found.
+        :param max_distance: The maximum distance (in meters) of features.
+        :returns: List of (copy of feature data, distance in meters) pairs,
+                  nearest first.
 
         """
-        # FIXME: check for existence of rtree and if it doesn't exist, raise
-        #        custom exception. Repeat for all methods that refer to rtree.
-        rows = self.dwithin_rtree(lon, lat, distance)
-        # Note that this sorting strategy is inefficient, sorting the entire
-        # result and not using any distance-based tricks for optimal
-        # spitting-out of edges.
-        # TODO: Implement rtree-inspired real distance sort method using
-        #       minheap
-        distance_rows = []
-
-        for r in rows:
-            x, y = self.transformer.transform(lon, lat)
-            point2 = Point(x, y)
-            ls = shape(r[self.geom_column])
-            line2 = transform(self.transformer.transform, ls)
-            distance_between = point2.distance(line2)
-            distance_rows.append((r, distance_between))
-
-        if sort:
-            sorted_by_distance = sorted(distance_rows, key=lambda r: r[1])
-            return (r for r, d in sorted_by_distance if d < distance)
-
-        return (r for r, d in distance_rows if d < distance)
+        scale = meters_per_degree(lat)
+        if k is None:
+            radius = max_distance
+        else:
+            radius = min(NEAREST_RADIUS, max_distance)
+        # (bounding box distance, fid) heap of features not yet measured
+        pending: List[Tuple[float, int]] = []
+        seen: Set[int] = set()
+        # Sorted (distance, fid, row) of features within max_distance
+        found: List[Tuple[float, int, dict]] = []
+
+        while True:
+            for fid, *bounds in self._rtree_bounds(
+                lon - radius / scale[0],
+                lat - radius / scale[1],
+                lon + radius / scale[0],
+                lat + radius / scale[1],
+            ):
+                if fid not in seen:
+                    seen.add(fid)
+                    heappush(
+                        pending,
+                        (distance_to_bounds(lon, lat, bounds, scale), fid),
+                    )
+
+            # Measure the features in best-first batches of k
+            while True:
+                batch: List[int] = []
+                limit = len(pending) if k is None else k
+                while pending and pending[0][0] <= radius:
+                    if len(batch) >= limit:
+                        break
+                    if k is not None and len(found) >= k:
+                        if pending[0][0] >= found[k - 1][0]:
+                            break
+                    batch.append(heappop(pending)[1])
+                if not batch:
+                    break
+                for row in self._get_rows(batch):
+                    geometry = row[self.geom_column]
+                    if geometry is None:
+                        continue
+                    distance = distance_to_geometry(lon, lat, geometry, scale)
+                    if distance <= max_distance:
+                        insort(found, (distance, row[self.primary_key], row))
+
+            if radius >= max_distance:
+                break
+            if k is not None and len(found) >= k:
+                if found[k - 1][0] <= radius:
+                    break
+            radius = min(2 * radius, max_distance)
+
+        return [(row, distance) for distance, _, row in found[:k]]
+
+    def _rtree_bounds(
+        self, left: float, bottom: float, right: float, top: float
+    ) -> List[Tuple[int, float, float, float, float]]:
+        # (fid, min x, max x, min y, max y) of the features whose bounding box
+        # intersects a bounding box
+        with self.gpkg.connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            return cursor.execute(
+                f"""
+                SELECT id, minX, maxX, minY, maxY
+                  FROM rtree_{self.name}_{self.geom_column}
+                 WHERE maxX >= ?
+                   AND minX <= ?
+                   AND maxY >= ?
+                   AND minY <= ?
+            """,
+                (left, right, bottom, top),
+            ).fetchall()
+
+    def _get_rows(self, primary_keys: Sequence[int]) -> List[dict]:
+        # Deserialized rows of features, in no particular order
+        rows: List[dict] = []
+        with self.gpkg.connect() as conn:
+            for i in range(0, len(primary_keys), SQLITE_MAX_VARIABLES):
+                chunk = primary_keys[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" for k in chunk)
+                rows.extend(
+                    self.deserialize_row(row)
+                    for row in conn.execute(
+                        f"""
+                        SELECT *
+                          FROM {self.name}
+                         WHERE {self.primary_key} IN ({placeholders})
+                    """,
+                        chunk,
+                    )
+                )
+        return rows
 
     def update_batch(self, bunch: Iterable[Tuple[str, dict]]) -> None:
         bunch = list(bunch)
@@ -286,10 +481,122 @@ class FeatureTable:
                     (*set_values, primary_key),
                 )
 
+    def update_columns(
+        self, column_names: Sequence[str], rows: Iterable[Sequence[Any]]
+    ) -> None:
+        """Set a few columns of many rows in a single transaction. Columns
+        that do not exist yet are added, typed by their first non-null value.
+
+        :param column_names: The columns to set.
+        :param rows: Sequences of (primary key, *values), with one value per
+                     column.
+
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        first_values: Dict[str, Any] = {c: None for c in column_names}
+        for row in rows:
+            for column_name, value in zip(column_names, row[1:]):
+                if first_values[column_name] is None:
+                    first_values[column_name] = value
+        self._add_new_columns([first_values])
+
+        set_clauses = ", ".join(f"{c} = ?" for c in column_names)
+        with self.gpkg.connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    f"""
+                    UPDATE {self.name}
+                       SET {set_clauses}
+                     WHERE {self.primary_key} = ?
+                """,
+                    ((*row[1:], row[0]) for row in rows),
+                )
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def iter_batches(
+        self,
+        batch_size: int = BATCH_SIZE,
+        column_names: Optional[Sequence[str]] = None,
+        min_fid: Optional[int] = None,
+        max_fid: Optional[int] = None,
+        deserialize: bool = True,
+    ) -> Generator[List[dict], None, None]:
+        """Read the rows of the table in primary key order, one batch at a
+        time. Each batch is a separate query that resumes after the last
+        primary key read, so the table can be updated between batches.
+
+        :param batch_size: The maximum number of rows per batch.
+        :param column_names: The columns to read. The primary key is always
+                             included. Defaults to every column.
+        :param min_fid: The lowest primary key to read (inclusive).
+        :param max_fid: The highest primary key to read (inclusive).
+        :param deserialize: Whether to decode geometries into GeoJSON-like
+                            dicts.
+
+        """
+        if column_names is None:
+            columns = "*"
+        else:
+            columns = ", ".join(
+                [self.primary_key]
+                + [c for c in column_names if c != self.primary_key]
+            )
+        decode = deserialize and (
+            column_names is None or self.geom_column in column_names
+        )
+
+        last = None if min_fid is None else min_fid - 1
+        with self.gpkg.connect() as conn:
+            while True:
+                conditions = []
+                parameters: List[int] = []
+                if last is not None:
+                    conditions.append(f"{self.primary_key} > ?")
+                    parameters.append(last)
+                if max_fid is not None:
+                    conditions.append(f"{self.primary_key} <= ?")
+                    parameters.append(max_fid)
+                where = ""
+                if conditions:
+                    where = "WHERE " + " AND ".join(conditions)
+                rows = conn.execute(
+                    f"""
+                    SELECT {columns}
+                      FROM {self.name}
+                           {where}
+                  ORDER BY {self.primary_key}
+                     LIMIT ?
+                """,
+                    (*parameters, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                last = rows[-1][self.primary_key]
+                if decode:
+                    rows = [self.deserialize_row(row) for row in rows]
+                yield rows
+                if len(rows) < batch_size:
+                    break
+
     def update(self, primary_key: str, ddict: dict) -> None:
         self.update_batch(((primary_key, ddict),))
 
-    def add_rtree(self) -> None:
+    def add_rtree(self, sort: bool = False) -> None:
+        """Add an R-tree spatial index of the table's geometries, populated
+        from its existing rows and kept up to date by triggers.
+
+        :param sort: Whether to insert existing rows in the order of a
+                     Hilbert curve rather than of their primary keys. This is
+                     faster for large tables whose rows are not already
+                     spatially clustered.
+
+        """
         with self.gpkg.connect() as conn:
             rtree_table = f"rtree_{self.name}_{self.geom_column}"
             conn.execute(
@@ -325,9 +632,7 @@ class FeatureTable:
                 )
             """
             )
-            conn.execute(
-                f"""
-                INSERT OR IGNORE INTO {rtree_table}
+            bounds_query = f"""
                      SELECT {self.primary_key} id,
                             MbrMinX({self.geom_column}) minX,
                             MbrMaxX({self.geom_column}) maxX,
@@ -335,7 +640,23 @@ class FeatureTable:
                             MbrMaxY({self.geom_column}) maxY
                        FROM {self.name}
             """
-            )
+            if sort:
+                bounds = [
+                    (r["id"], r["minX"], r["maxX"], r["minY"], r["maxY"])
+                    for r in conn.execute(bounds_query)
+                    if r["minX"] is not None
+                ]
+                conn.execute("BEGIN")
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO {rtree_table} "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    hilbert_order(bounds),
+                )
+                conn.execute("COMMIT")
+            else:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {rtree_table} {bounds_query}"
+                )
             # Add geometry column insert trigger
             conn.execute(
                 f"""
@@ -538,6 +859,53 @@ class FeatureTable:
         # Write stragglers
         write_queues()
 
+    def write_rows(
+        self,
+        column_names: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        counter: ProgressBar = None,
+    ) -> None:
+        """Write rows whose values are already SQLite-compatible (i.e. whose
+        geometries are GeoPackage binary blobs) in a single transaction.
+        Columns that do not exist yet are added, typed by their first non-null
+        value.
+
+        :param column_names: The columns of the rows, other than the primary
+                             key.
+        :param rows: Sequences of values, one per column.
+        :param counter: A progress bar, updated as rows are written.
+
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        existing = set(self._get_column_names())
+        new_columns = []
+        for i, column_name in enumerate(column_names):
+            if column_name in existing:
+                continue
+            value = next((r[i] for r in rows if r[i] is not None), None)
+            new_columns.append((column_name, self._column_type(value)))
+        if new_columns:
+            self._add_feature_table_columns(new_columns)
+
+        columns = ", ".join(column_names)
+        placeholders = ", ".join("?" for c in column_names)
+        with self.gpkg.connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    f"REPLACE INTO {self.name} ({columns}) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        if counter is not None:
+            counter.update(len(rows))
+
     def write_feature(self, feature: dict) -> None:
         self.write_features([feature])
 
@@ -560,6 +928,13 @@ class FeatureTable:
                 )
 
     def _get_column_names(self) -> Tuple[str, ...]:
+        if self.name in self.gpkg.metadata:
+            # Read-only: the schema cannot change
+            return tuple(
+                column
+                for column in self.gpkg.metadata[self.name].columns
+                if column != self.primary_key
+            )
         column_names = []
         with self.gpkg.connect() as conn:
             for table_info in conn.execute(f"PRAGMA table_info({self.name})"):
@@ -686,6 +1061,22 @@ class FeatureTable:
         sql = f"REPLACE INTO {self.name} ({columns}) VALUES ({placeholders})"
         return sql
 
+    def primary_key_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """The lowest and highest primary keys (fids) in the table.
+
+        :returns: A (min, max) tuple, or (None, None) for an empty table.
+
+        """
+        with self.gpkg.connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT MIN({self.primary_key}) lo,
+                       MAX({self.primary_key}) hi
+                  FROM {self.name}
+            """
+            ).fetchone()
+        return row["lo"], row["hi"]
+
     def __len__(self) -> int:
         with self.gpkg.connect() as conn:
             rows = conn.execute(f"SELECT COUNT() c FROM {self.name}")
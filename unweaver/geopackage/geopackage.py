@@ -5,7 +5,10 @@ import contextlib
 import os
 import sqlite3
 import tempfile
-from typing import Any, Dict, Generator
+from typing import Any, Dict, Generator, NamedTuple, Optional, Tuple
+from urllib.request import pathname2url
+
+from unweaver.constants import BULK_LOAD_CACHE_SIZE
 
 from .feature_table import FeatureTable
 from .geom_types import GeoPackageGeoms
@@ -19,19 +22,36 @@ GPKG_USER_VERSION = 10200
 TO_SRID = 3740
 
 
+class FeatureTableMetadata(NamedTuple):
+    geometry_type: str
+    srid: int
+    columns: Tuple[str, ...]
+
+
+# Feature table metadata of read-only GeoPackages, keyed by (absolute path,
+# modification time, size) so that a changed file is read again.
+_read_only_metadata_cache: Dict[
+    Tuple[str, int, int], Dict[str, FeatureTableMetadata]
+] = {}
+
+
 class GeoPackage:
     """A Python interface to a GeoPackage, an SQLite-format OGC standard for
     geospatial vector data.
 
     :param path: Path to a GeoPackage (ends with .gpkg). If the path does not
     exist, it will be created.
+    :param read_only: Open an existing GeoPackage with a read-only connection
+    that refuses all writes (e.g. for serving). The connection may be used
+    from any thread, but only by one thread at a time.
 
     """
 
     VERSION = 0
     EMPTY = 1
 
-    def __init__(self, path: str = None):
+    def __init__(self, path: str = None, read_only: bool = False):
+        self.read_only = read_only
         if path is None:
             # TODO: revisit this behavior. Creating a temporary file by default
             #       may be undesirable.
@@ -43,9 +63,24 @@ class GeoPackage:
         else:
             self.path = path
 
-        self._setup_database()
+        if not read_only:
+            self._setup_database()
 
         self.feature_tables = {}
+        self.metadata: Dict[str, FeatureTableMetadata] = {}
+
+        if read_only:
+            # Schema metadata is read once per version of the file and shared
+            # by every read-only instance in the process
+            self.metadata = self._read_only_metadata()
+            for table_name, table_metadata in self.metadata.items():
+                self.feature_tables[table_name] = FeatureTable(
+                    self,
+                    table_name,
+                    getattr(GeoPackageGeoms, table_metadata.geometry_type),
+                    srid=table_metadata.srid,
+                )
+            return
 
         # Instantiate FeatureTables that already exist in the db
         with self.connect() as conn:
@@ -107,18 +142,106 @@ class GeoPackage:
 
     def _get_connection(self) -> None:
         if not self._is_connected():
-            conn = sqlite3.connect(self.path, uri=True, isolation_level=None)
+            if self.read_only:
+                conn = sqlite3.connect(
+                    self._read_only_uri(),
+                    uri=True,
+                    isolation_level=None,
+                    check_same_thread=False,
+                )
+                conn.execute("PRAGMA query_only = ON")
+            else:
+                conn = sqlite3.connect(
+                    self.path, uri=True, isolation_level=None
+                )
             # Spatialite used for rtree-based functions (MinX, etc). Can
             # eventually replace or make configurable with other extensions.
             conn.load_extension("mod_spatialite.so")
             conn.row_factory = self._dict_factory
             self.conn = conn
 
+    def _read_only_metadata(self) -> Dict[str, FeatureTableMetadata]:
+        key = self._file_identity()
+        if key is not None and key in _read_only_metadata_cache:
+            return _read_only_metadata_cache[key]
+
+        metadata = {}
+        with self.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT c.table_name, c.srs_id, g.geometry_type_name
+                  FROM gpkg_contents AS c
+                  JOIN gpkg_geometry_columns AS g
+                    ON g.table_name = c.table_name
+            """
+            ).fetchall()
+            for row in rows:
+                table_name = row["table_name"]
+                columns = tuple(
+                    table_info["name"]
+                    for table_info in conn.execute(
+                        f"PRAGMA table_info({table_name})"
+                    )
+                )
+                metadata[table_name] = FeatureTableMetadata(
+                    row["geometry_type_name"], row["srs_id"], columns
+                )
+
+        if key is not None:
+            _read_only_metadata_cache[key] = metadata
+        return metadata
+
+    def _file_identity(self) -> Optional[Tuple[str, int, int]]:
+        if self.path.startswith("file:"):
+            # URIs (e.g. in-memory databases) have no file to check
+            return None
+        stat = os.stat(self.path)
+        return (os.path.abspath(self.path), stat.st_mtime_ns, stat.st_size)
+
+    def _read_only_uri(self) -> str:
+        if self.path.startswith("file:"):
+            # Already a URI, e.g. a shared in-memory database
+            return self.path
+        return f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+
     @contextlib.contextmanager
     def connect(self) -> Generator[sqlite3.Connection, None, None]:
         self._get_connection()
         yield self.conn
 
+    def set_bulk_load(
+        self, enabled: bool, cache_size: int = BULK_LOAD_CACHE_SIZE
+    ) -> None:
+        """Trade durability for write speed, e.g. while building a new
+        GeoPackage in a temporary file: writes are neither journaled nor
+        synced to disk, and the page cache is enlarged. A crash while enabled
+        may corrupt the database.
+
+        :param enabled: Whether to enable bulk loading, or restore the
+                        defaults.
+        :param cache_size: The page cache size in bytes while enabled.
+
+        """
+        with self.connect() as conn:
+            if enabled:
+                conn.execute("PRAGMA journal_mode = OFF")
+                conn.execute("PRAGMA synchronous = OFF")
+                # Negative sizes are in KiB rather than pages
+                conn.execute(f"PRAGMA cache_size = -{cache_size // 1024}")
+            else:
+                conn.execute("PRAGMA journal_mode = DELETE")
+                conn.execute("PRAGMA synchronous = FULL")
+                # SQLite's default
+                conn.execute("PRAGMA cache_size = -2000")
+
+    def close(self) -> None:
+        """Close the database connection, if open. It will be reopened by the
+        next call to `connect`.
+
+        """
+        if self._is_connected():
+            self.conn.close()
+
     def _setup_database(self) -> None:
         if self._is_empty_database():
             self._create_database()
@@ -11,8 +11,9 @@ from unweaver.graph_types import EdgeTuple
 class ProjectedNode:
     n: str
     geometry: Point
-    edges_in: Optional[Tuple[EdgeTuple, EdgeTuple]] = None
-    edges_out: Optional[Tuple[EdgeTuple, EdgeTuple]] = None
+    # Temporary edges to and from the node, if it is along an edge
+    edges_in: Optional[Tuple[EdgeTuple, ...]] = None
+    edges_out: Optional[Tuple[EdgeTuple, ...]] = None
 
 
 def makeNodeID(lon: float, lat: float) -> str:
@@ -1,4 +1,6 @@
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
 
 # TODO: add derived properties to EdgeData? e.g. _length
 NodeData = dict
@@ -9,3 +11,6 @@ BuildingData = Dict[str, Any]
 BuildingTuple = Tuple[str, BuildingData]
 
 CostFunction = Callable[[str, str, EdgeData], Optional[float]]
+# Takes a mapping from column name to an array of values for a batch of edges
+# and returns an array of their weights (NaN for impassable edges)
+VectorizedCostFunction = Callable[[Mapping[str, np.ndarray]], np.ndarray]
@@ -1,4 +1,11 @@
 from .augmented import AugmentedDiGraphGPKGView
+from .digraphcsr import CSRAdjacency, DiGraphCSRView
 from .digraphgpkg import DiGraphGPKG, DiGraphGPKGView
 
-__all__ = ("AugmentedDiGraphGPKGView", "DiGraphGPKGView", "DiGraphGPKG")
+__all__ = (
+    "AugmentedDiGraphGPKGView",
+    "CSRAdjacency",
+    "DiGraphCSRView",
+    "DiGraphGPKGView",
+    "DiGraphGPKG",
+)
@@ -3,12 +3,24 @@
 from collections.abc import Mapping
 from itertools import chain
 from functools import partial
-from typing import Any, Callable, Dict, Iterator, Set, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import networkx as nx  # type: ignore
 
 from unweaver.geojson import Point
 from unweaver.graph import ProjectedNode
+from unweaver.graph_types import EdgeTuple
 from unweaver.graphs.digraphgpkg import DiGraphGPKGView
 
 
@@ -144,6 +156,39 @@ class AugmentedDiGraphGPKGView(nx.DiGraph):
         self._pred = AugmentedOuterPredecessorsView(_G=G, _G_overlay=G_overlay)
 
         self.network = G.network
+        self.base_graph = G
+        self.overlay = G_overlay
+
+    def edges_bunch(
+        self, ebunch: Iterable[Tuple[str, str]]
+    ) -> List[EdgeTuple]:
+        """Retrieve the data of many edges at once. Overlay edges are used
+        where present and all other edges are fetched from the base graph in
+        batches.
+
+        :param ebunch: Iterable of (u, v) node ID pairs.
+        :returns: List of (u, v, d) edge tuples in the same order as ebunch.
+        :raises KeyError: If any of the edges does not exist.
+
+        """
+        ebunch = list(ebunch)
+        overlay_adj = self.overlay._succ
+        base_pairs = [
+            (u, v)
+            for u, v in ebunch
+            if u not in overlay_adj or v not in overlay_adj[u]
+        ]
+        base_edges = {
+            (u, v): d for u, v, d in self.base_graph.edges_bunch(base_pairs)
+        }
+
+        result = []
+        for u, v in ebunch:
+            if (u, v) in base_edges:
+                result.append((u, v, base_edges[(u, v)]))
+            else:
+                result.append((u, v, dict(overlay_adj[u][v])))
+        return result
 
     @classmethod
     def prepare_augmented(
@@ -165,6 +210,21 @@ class AugmentedDiGraphGPKGView(nx.DiGraph):
             for e in candidate.edges_out:
                 temp_edges.append(e)
 
+        return cls.from_edges(G, temp_edges)
+
+    @classmethod
+    def from_edges(
+        cls: Type[T], G: DiGraphGPKGView, temp_edges: Iterable[EdgeTuple]
+    ) -> T:
+        """Create an AugmentedDiGraphGPKGView based on a DiGraphGPKGView and
+        any number of temporary edges, e.g. those of many start point
+        candidates (see `unweaver.candidates.overlay_edges`).
+
+        :param G: The base DiGraphGPKGView.
+        :param temp_edges: The (u, v, d) temporary edges to overlay.
+
+        """
+        temp_edges = list(temp_edges)
         G_overlay = nx.DiGraph()
         if temp_edges:
             G_overlay.add_edges_from(temp_edges)
@@ -177,6 +237,6 @@ class AugmentedDiGraphGPKGView(nx.DiGraph):
                 G_overlay.nodes[v][G.network.nodes.geom_column] = Point(
                     d[G.network.edges.geom_column]["coordinates"][-1]
                 )
-        G_augmented = AugmentedDiGraphGPKGView(G=G, G_overlay=G_overlay)
+        G_augmented = cls(G=G, G_overlay=G_overlay)
 
         return G_augmented
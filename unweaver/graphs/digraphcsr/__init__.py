@@ -0,0 +1,4 @@
+from .csr_adjacency import CSRAdjacency
+from .digraphcsr_view import DiGraphCSRView
+
+__all__ = ("CSRAdjacency", "DiGraphCSRView")
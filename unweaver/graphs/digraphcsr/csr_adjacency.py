@@ -0,0 +1,428 @@
+"""Array-backed, compressed sparse row (CSR) adjacency loaded from a routable
+GeoPackage."""
+# Imported so that classmethods can be annotated to return class instance
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from unweaver.network_adapters import GeoPackageNetwork
+
+
+class CSRColumn:
+    """A single table column stored as a NumPy array. Integer and real columns
+    are stored as typed arrays with an optional null mask, anything else is
+    stored as an object array.
+
+    :param values: The column values.
+    :param nulls: An optional boolean mask marking NULL values.
+
+    """
+
+    def __init__(self, values: np.ndarray, nulls: Optional[np.ndarray] = None):
+        self.values = values
+        self.nulls = nulls
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> CSRColumn:
+        """Create a column from a sequence of values as returned by sqlite3,
+        picking the most compact array type that can hold them.
+
+        :param values: The column values (int, float, str, bytes or None).
+
+        """
+        non_null = [value for value in values if value is not None]
+        has_nulls = len(non_null) != len(values)
+        nulls = None
+        if has_nulls:
+            nulls = np.fromiter(
+                (value is None for value in values),
+                dtype=bool,
+                count=len(values),
+            )
+
+        dtype: Any = object
+        fill: Any = None
+        if non_null and all(type(value) is int for value in non_null):
+            dtype = np.int64
+            fill = 0
+        elif non_null and all(
+            type(value) in (int, float) for value in non_null
+        ):
+            dtype = np.float64
+            fill = 0.0
+
+        if dtype is object:
+            array = np.empty(len(values), dtype=object)
+            array[:] = list(values)
+            return cls(array, None)
+
+        filled = [fill if value is None else value for value in values]
+        try:
+            array = np.array(filled, dtype=dtype)
+        except OverflowError:
+            # Integers that don't fit in 64 bits are kept as Python objects
+            array = np.empty(len(values), dtype=object)
+            array[:] = list(values)
+            return cls(array, None)
+
+        return cls(array, nulls)
+
+    def take(self, order: np.ndarray) -> CSRColumn:
+        """Reorder the column.
+
+        :param order: Array of indices into this column.
+
+        """
+        nulls = None if self.nulls is None else self.nulls[order]
+        return CSRColumn(self.values[order], nulls)
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = self.values.nbytes
+        if self.nulls is not None:
+            nbytes += self.nulls.nbytes
+        return nbytes
+
+    def __getitem__(self, i: int) -> Any:
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        value = self.values[i]
+        if isinstance(value, np.generic):
+            # Convert to the Python-native type so that values behave exactly
+            # like those read from the database (e.g. are JSON-serializable).
+            return value.item()
+        return value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class CSRAdjacency:
+    """Integer-indexed, immutable adjacency structure for a directed graph.
+    Node IDs are interned into consecutive integers and the outgoing edges of
+    node i are stored at positions offsets[i]:offsets[i + 1] of the edge
+    arrays. A second (reverse) index provides predecessor lookups. Edge and
+    node attributes are stored column-wise, except for edge geometries, which
+    stay in the GeoPackage and are fetched on demand.
+
+    Instances hold no database connections and can be shared between threads
+    and between graph instances.
+
+    :param node_ids: Node IDs, in interned (integer index) order.
+    :param node_x: The x (longitude) coordinate of every node.
+    :param node_y: The y (latitude) coordinate of every node.
+    :param node_columns: Any extra node attribute columns.
+    :param offsets: Start of every node's outgoing edges (length n + 1).
+    :param sources: Source node index of every edge.
+    :param targets: Target node index of every edge.
+    :param edge_columns: Edge attribute columns (including the fid), in edge
+                         order.
+    :param edge_keys: The ordered edge attribute keys, including the geometry
+                      column.
+    :param pred_offsets: Start of every node's incoming edges (length n + 1).
+    :param pred_edges: Edge indices, grouped by target node.
+    :param geom_column: Name of the geometry column.
+    :param u_key: Name of the edge start node column.
+    :param v_key: Name of the edge end node column.
+
+    """
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        node_x: np.ndarray,
+        node_y: np.ndarray,
+        node_columns: Dict[str, CSRColumn],
+        offsets: np.ndarray,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        edge_columns: Dict[str, CSRColumn],
+        edge_keys: Tuple[str, ...],
+        pred_offsets: np.ndarray,
+        pred_edges: np.ndarray,
+        geom_column: str = "geom",
+        u_key: str = "_u",
+        v_key: str = "_v",
+    ):
+        self.node_ids = node_ids
+        self.node_index = {n: i for i, n in enumerate(node_ids)}
+        self.node_x = node_x
+        self.node_y = node_y
+        self.node_columns = node_columns
+        self.offsets = offsets
+        self.sources = sources
+        self.targets = targets
+        self.edge_columns = edge_columns
+        self.edge_keys = edge_keys
+        self.pred_offsets = pred_offsets
+        self.pred_edges = pred_edges
+        self.geom_column = geom_column
+        self.u_key = u_key
+        self.v_key = v_key
+
+    @classmethod
+    def from_network(cls, network: GeoPackageNetwork) -> CSRAdjacency:
+        """Load the nodes and edges tables of a GeoPackageNetwork into memory.
+        Edge geometries are not loaded.
+
+        :param network: The GeoPackageNetwork to load.
+
+        """
+        edges = network.edges
+        nodes = network.nodes
+        geom_column = edges.geom_column
+
+        # Nodes: intern IDs in table order, keep coordinates as arrays
+        node_column_names = [
+            c
+            for c in nodes._get_column_names()
+            if c not in (nodes.node_key, nodes.geom_column)
+        ]
+        node_rows = _fetch_rows(
+            network,
+            nodes.name,
+            [nodes.primary_key, nodes.node_key, nodes.geom_column]
+            + node_column_names,
+        )
+        node_ids: List[str] = []
+        node_index: Dict[str, int] = {}
+        unique_rows = []
+        xs: List[float] = []
+        ys: List[float] = []
+        for row in node_rows:
+            n = row[1]
+            if n in node_index:
+                continue
+            node_index[n] = len(node_ids)
+            node_ids.append(n)
+            unique_rows.append(row)
+            if row[2] is None:
+                xs.append(np.nan)
+                ys.append(np.nan)
+            else:
+                x, y = nodes._deserialize_geometry(row[2])["coordinates"][:2]
+                xs.append(x)
+                ys.append(y)
+
+        node_columns = {
+            nodes.primary_key: CSRColumn.from_values(
+                [row[0] for row in unique_rows]
+            )
+        }
+        for i, name in enumerate(node_column_names):
+            node_columns[name] = CSRColumn.from_values(
+                [row[i + 3] for row in unique_rows]
+            )
+
+        # Edges: everything but the geometry
+        edge_keys = (edges.primary_key, *edges._get_column_names())
+        attr_names = [
+            k
+            for k in edge_keys
+            if k not in (geom_column, edges.u_key, edges.v_key)
+        ]
+        edge_rows = _fetch_rows(
+            network, edges.name, [edges.u_key, edges.v_key] + attr_names
+        )
+        m = len(edge_rows)
+
+        for row in edge_rows:
+            for n in (row[0], row[1]):
+                if n not in node_index:
+                    # Nodes that only exist in the edges table
+                    node_index[n] = len(node_ids)
+                    node_ids.append(n)
+                    xs.append(np.nan)
+                    ys.append(np.nan)
+        n_nodes = len(node_ids)
+        for column in node_columns.values():
+            _pad_column(column, n_nodes)
+
+        u_idx = np.fromiter(
+            (node_index[row[0]] for row in edge_rows), dtype=np.int64, count=m
+        )
+        v_idx = np.fromiter(
+            (node_index[row[1]] for row in edge_rows), dtype=np.int64, count=m
+        )
+
+        order = np.argsort(u_idx, kind="stable")
+        sources = u_idx[order]
+        targets = v_idx[order]
+        offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(u_idx, minlength=n_nodes))
+
+        pred_edges = np.argsort(targets, kind="stable")
+        pred_offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        pred_offsets[1:] = np.cumsum(np.bincount(v_idx, minlength=n_nodes))
+
+        edge_columns = {
+            name: CSRColumn.from_values(
+                [row[i + 2] for row in edge_rows]
+            ).take(order)
+            for i, name in enumerate(attr_names)
+        }
+
+        return cls(
+            node_ids=node_ids,
+            node_x=np.array(xs, dtype=np.float64),
+            node_y=np.array(ys, dtype=np.float64),
+            node_columns=node_columns,
+            offsets=offsets,
+            sources=sources,
+            targets=targets,
+            edge_columns=edge_columns,
+            edge_keys=edge_keys,
+            pred_offsets=pred_offsets,
+            pred_edges=pred_edges,
+            geom_column=geom_column,
+            u_key=edges.u_key,
+            v_key=edges.v_key,
+        )
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.targets)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the array data, in bytes. Does not account for
+        the Python node ID strings."""
+        arrays = (
+            self.node_x,
+            self.node_y,
+            self.offsets,
+            self.sources,
+            self.targets,
+            self.pred_offsets,
+            self.pred_edges,
+        )
+        nbytes = sum(a.nbytes for a in arrays)
+        nbytes += sum(c.nbytes for c in self.node_columns.values())
+        nbytes += sum(c.nbytes for c in self.edge_columns.values())
+        return nbytes
+
+    def index(self, n: str) -> int:
+        """Get the integer index of a node ID.
+
+        :param n: The node ID.
+        :raises KeyError: If the node is not in the graph.
+
+        """
+        return self.node_index[n]
+
+    def edge_index(self, u: int, v: int) -> int:
+        """Get the index of the edge from node index u to node index v.
+
+        :param u: Index of the start node.
+        :param v: Index of the end node.
+        :raises KeyError: If there is no such edge.
+
+        """
+        start = self.offsets[u]
+        hits = np.flatnonzero(self.targets[start : self.offsets[u + 1]] == v)
+        if not len(hits):
+            raise KeyError((self.node_ids[u], self.node_ids[v]))
+        return int(start + hits[0])
+
+    def edge_attr(self, e: int, key: str) -> Any:
+        """Get a single, non-geometry attribute of an edge.
+
+        :param e: The edge index.
+        :param key: The attribute name.
+        :raises KeyError: If the edge has no such attribute.
+
+        """
+        if key == self.u_key:
+            return self.node_ids[self.sources[e]]
+        if key == self.v_key:
+            return self.node_ids[self.targets[e]]
+        return self.edge_columns[key][e]
+
+    def edge_data(self, e: int) -> Dict[str, Any]:
+        """Get the non-geometry attributes of an edge.
+
+        :param e: The edge index.
+
+        """
+        d = {k: c[e] for k, c in self.edge_columns.items()}
+        d[self.u_key] = self.node_ids[self.sources[e]]
+        d[self.v_key] = self.node_ids[self.targets[e]]
+        return d
+
+    def edge_geometry(
+        self, network: GeoPackageNetwork, e: int
+    ) -> Optional[dict]:
+        """Fetch the geometry of an edge from the GeoPackage.
+
+        :param network: A GeoPackageNetwork for the same GeoPackage that was
+                        loaded.
+        :param e: The edge index.
+
+        """
+        fid = self.edge_columns[network.edges.primary_key][e]
+        return network.edges.get_geometry(fid)
+
+    def node_data(self, i: int) -> Dict[str, Any]:
+        """Get the attributes of a node in the same format as rows from the
+        nodes table.
+
+        :param i: The node index.
+
+        """
+        d = {k: c[i] for k, c in self.node_columns.items()}
+        coordinates = self.node_coordinates(i)
+        if coordinates is None:
+            d[self.geom_column] = None
+        else:
+            d[self.geom_column] = {
+                "type": "Point",
+                "coordinates": list(coordinates),
+            }
+        d["_n"] = self.node_ids[i]
+        return d
+
+    def node_coordinates(self, i: int) -> Optional[Tuple[float, float]]:
+        """Get the (lon, lat) coordinates of a node.
+
+        :param i: The node index.
+        :returns: The coordinates, or None if the node has no geometry.
+
+        """
+        x = self.node_x[i]
+        if np.isnan(x):
+            return None
+        return float(x), float(self.node_y[i])
+
+
+def _fetch_rows(
+    network: GeoPackageNetwork, table: str, columns: Sequence[str]
+) -> List[Tuple[Any, ...]]:
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    with network.gpkg.connect() as conn:
+        # Plain tuples: the dict row factory is too slow for full table scans
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(f"SELECT {column_list} FROM {table}").fetchall()
+    return rows
+
+
+def _pad_column(column: CSRColumn, length: int) -> None:
+    missing = length - len(column)
+    if missing <= 0:
+        return
+    if column.values.dtype == object:
+        padding = np.empty(missing, dtype=object)
+        column.values = np.concatenate([column.values, padding])
+        return
+    column.values = np.concatenate(
+        [column.values, np.zeros(missing, dtype=column.values.dtype)]
+    )
+    nulls = column.nulls
+    if nulls is None:
+        nulls = np.zeros(len(column.values) - missing, dtype=bool)
+    column.nulls = np.concatenate([nulls, np.ones(missing, dtype=bool)])
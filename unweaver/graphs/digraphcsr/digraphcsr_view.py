@@ -0,0 +1,124 @@
+"""In-memory, read-only graph view over a routable GeoPackage."""
+from __future__ import annotations
+from typing import Any, Iterable, List, Optional, Tuple
+import uuid
+
+from unweaver.graph_types import EdgeTuple
+from unweaver.network_adapters import EdgeIndex, GeoPackageNetwork
+from ..digraphgpkg import DiGraphGPKGView
+from .csr_adjacency import CSRAdjacency
+from .nodes_view import CSRNodesView
+from .outer_adjlist_view import CSROuterAdjlistView, CSROuterPredecessorsView
+
+
+class DiGraphCSRView(DiGraphGPKGView):
+    """An immutable, `networkx`-compatible directed graph view with the same
+    read API as DiGraphGPKGView, but with its adjacency and edge/node
+    attributes held in memory as compressed sparse row (CSR) arrays. Graph
+    traversals (e.g. Dijkstra's algorithm) never touch the database; only edge
+    geometries are fetched from the GeoPackage, and only when accessed.
+
+    The CSRAdjacency holds no database connections, so a single instance can
+    be loaded once and shared between many DiGraphCSRView instances (e.g. one
+    per thread or request) via the `csr` parameter.
+
+    :param path: A path to the GeoPackage file (.gpkg).
+    :param network: An existing GeoPackageNetwork instance.
+    :param csr: An already-loaded CSRAdjacency for this GeoPackage. If not
+    provided, one is loaded from the GeoPackage.
+    :param read_only: Open the GeoPackage at `path` without ever writing to
+    it. The file must already contain a built graph.
+    :param edge_index: An in-memory EdgeIndex of the graph's edges, which may
+    be shared by many graph views, for faster nearest-edge searches.
+    :param **attr: Any parameters to be attached as graph attributes.
+
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        network: Optional[GeoPackageNetwork] = None,
+        csr: Optional[CSRAdjacency] = None,
+        read_only: bool = False,
+        edge_index: Optional[EdgeIndex] = None,
+        **attr: Any,
+    ):
+        if path:
+            network = GeoPackageNetwork(
+                path, read_only=read_only, edge_index=edge_index
+            )
+        elif network is None:
+            raise ValueError("Path or network must be set")
+
+        self.network = network
+        if csr is None:
+            csr = CSRAdjacency.from_network(network)
+        self.csr = csr
+
+        self.adjlist_inner_dict_factory = self.adjlist_inner_dict_factory
+
+        self.graph = {}
+        # setattr: these differ from the DiGraphGPKGView mapping types
+        setattr(self, "_node", CSRNodesView(self.csr))
+        succ = CSROuterAdjlistView(self.csr, self.network)
+        setattr(self, "_succ", succ)
+        setattr(self, "_adj", succ)
+        setattr(
+            self, "_pred", CSROuterPredecessorsView(self.csr, self.network)
+        )
+
+        self.graph.update(attr)
+
+        self.mutable = False
+
+    def size(self, weight: Optional[str] = None) -> int:
+        """The 'size' of the directed graph, with the same behavior as
+        `networkx.DiGraph`.
+
+        :param weight: The string to use as an edge dictionary key to
+        calculate a weighted sum over all edges.
+
+        """
+        if weight is None:
+            return self.csr.number_of_edges
+        return super().size(weight=weight)
+
+    def edges_bunch(
+        self, ebunch: Iterable[Tuple[str, str]]
+    ) -> List[EdgeTuple]:
+        """Retrieve the data of many edges at once: attributes are read from
+        memory and geometries are fetched from the GeoPackage in batches.
+
+        :param ebunch: Iterable of (u, v) node ID pairs.
+        :returns: List of (u, v, d) edge tuples in the same order as ebunch,
+                  where d is a dictionary in the same format as dict(G[u][v]).
+        :raises KeyError: If any of the edges does not exist.
+
+        """
+        csr = self.csr
+        edges = self.network.edges
+        indices = [
+            (u, v, csr.edge_index(csr.index(u), csr.index(v)))
+            for u, v in ebunch
+        ]
+        fid_column = csr.edge_columns[edges.primary_key]
+        geometries = edges.get_geometries(fid_column[e] for _, _, e in indices)
+
+        result = []
+        for u, v, e in indices:
+            d = csr.edge_data(e)
+            d[csr.geom_column] = geometries.get(fid_column[e])
+            result.append((u, v, d))
+        return result
+
+    def to_in_memory(self) -> DiGraphCSRView:
+        """Copy the GeoPackage into an in-memory SQLite database, reusing the
+        already-loaded CSR arrays.
+
+        :returns: A new DiGraphCSRView backed by an in-memory SQLite database.
+
+        """
+        db_id = uuid.uuid4()
+        path = f"file:unweaver-{db_id}?mode=memory&cache=shared"
+        new_network = self.network.copy(path)
+        return self.__class__(network=new_network, csr=self.csr)
@@ -0,0 +1,57 @@
+"""Read-only edge attribute mapping backed by a CSRAdjacency."""
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+from unweaver.network_adapters import GeoPackageNetwork
+from .csr_adjacency import CSRAdjacency
+
+
+class CSREdgeView(Mapping):
+    """Read-only edge attributes for a single edge of a CSRAdjacency. All
+    attributes but the geometry are read from in-memory arrays: the geometry is
+    only fetched from the GeoPackage when it is accessed, so that cost
+    functions never pay for geometry decoding.
+
+    :param _csr: The CSRAdjacency holding the edge.
+    :param _network: GeoPackageNetwork used to fetch the geometry.
+    :param _e: The edge index.
+
+    """
+
+    def __init__(
+        self, _csr: CSRAdjacency, _network: GeoPackageNetwork, _e: int
+    ):
+        self.csr = _csr
+        self.network = _network
+        self.e = _e
+        self._geometry: Optional[dict] = None
+        self._has_geometry = False
+
+    @property
+    def u(self) -> str:
+        return self.csr.node_ids[self.csr.sources[self.e]]
+
+    @property
+    def v(self) -> str:
+        return self.csr.node_ids[self.csr.targets[self.e]]
+
+    def __getitem__(self, key: str) -> Any:
+        if key == self.csr.geom_column:
+            if not self._has_geometry:
+                self._geometry = self.csr.edge_geometry(self.network, self.e)
+                self._has_geometry = True
+            return self._geometry
+        return self.csr.edge_attr(self.e, key)
+
+    def __contains__(self, key: object) -> bool:
+        # Overridden so that membership checks don't fetch the geometry.
+        return key in self.csr.edge_keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.csr.edge_keys)
+
+    def __len__(self) -> int:
+        return len(self.csr.edge_keys)
+
+    def __hash__(self) -> int:
+        return hash(self.e)
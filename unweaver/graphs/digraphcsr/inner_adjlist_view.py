@@ -0,0 +1,80 @@
+"""CSR adapter for networkx inner adjacency list mappings."""
+from collections.abc import Mapping
+from typing import ItemsView, Iterator, Tuple
+
+from unweaver.network_adapters import GeoPackageNetwork
+from .csr_adjacency import CSRAdjacency
+from .edge_view import CSREdgeView
+
+
+class CSRInnerItemsView(ItemsView[str, CSREdgeView]):
+    _mapping: "CSRInnerAdjlistView"
+
+    def __iter__(self) -> Iterator[Tuple[str, CSREdgeView]]:
+        # Walks the CSR slice directly rather than looking up each key again.
+        return self._mapping.iter_items()
+
+
+class CSRInnerAdjlistView(Mapping):
+    """The successors of a single node: maps successor node IDs to edge
+    attributes.
+
+    :param _csr: The CSRAdjacency.
+    :param _network: GeoPackageNetwork used to lazily fetch geometries.
+    :param _i: Index of the node.
+
+    """
+
+    def __init__(
+        self, _csr: CSRAdjacency, _network: GeoPackageNetwork, _i: int
+    ):
+        self.csr = _csr
+        self.network = _network
+        self.i = _i
+
+    def _edge_range(self) -> range:
+        return range(self.csr.offsets[self.i], self.csr.offsets[self.i + 1])
+
+    def _edge(self, j: int) -> Tuple[int, int]:
+        # Returns the (neighbor index, edge index) of the jth edge position
+        return int(self.csr.targets[j]), j
+
+    def _edge_to(self, neighbor: int) -> int:
+        return self.csr.edge_index(self.i, neighbor)
+
+    def iter_items(self) -> Iterator[Tuple[str, CSREdgeView]]:
+        node_ids = self.csr.node_ids
+        for j in self._edge_range():
+            neighbor, e = self._edge(j)
+            yield node_ids[neighbor], CSREdgeView(self.csr, self.network, e)
+
+    def __getitem__(self, key: str) -> CSREdgeView:
+        neighbor = self.csr.index(key)
+        return CSREdgeView(self.csr, self.network, self._edge_to(neighbor))
+
+    def __iter__(self) -> Iterator[str]:
+        node_ids = self.csr.node_ids
+        return (node_ids[self._edge(j)[0]] for j in self._edge_range())
+
+    def __len__(self) -> int:
+        return len(self._edge_range())
+
+    def items(self) -> CSRInnerItemsView:
+        return CSRInnerItemsView(self)
+
+
+class CSRInnerPredecessorsView(CSRInnerAdjlistView):
+    """The predecessors of a single node: maps predecessor node IDs to edge
+    attributes."""
+
+    def _edge_range(self) -> range:
+        return range(
+            self.csr.pred_offsets[self.i], self.csr.pred_offsets[self.i + 1]
+        )
+
+    def _edge(self, j: int) -> Tuple[int, int]:
+        e = int(self.csr.pred_edges[j])
+        return int(self.csr.sources[e]), e
+
+    def _edge_to(self, neighbor: int) -> int:
+        return self.csr.edge_index(neighbor, self.i)
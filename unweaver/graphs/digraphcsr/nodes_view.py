@@ -0,0 +1,29 @@
+"""CSR-backed node container."""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+from .csr_adjacency import CSRAdjacency
+
+
+class CSRNodesView(Mapping):
+    """An immutable mapping from node IDs to node attributes, read from the
+    in-memory arrays of a CSRAdjacency.
+
+    :param _csr: The CSRAdjacency.
+
+    """
+
+    def __init__(self, _csr: CSRAdjacency):
+        self.csr = _csr
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self.csr.node_data(self.csr.index(key))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.csr.node_ids)
+
+    def __len__(self) -> int:
+        return self.csr.number_of_nodes
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.csr.node_index
@@ -0,0 +1,42 @@
+"""CSR adapter for networkx outer adjacency list mappings."""
+from collections.abc import Mapping
+from typing import Iterator, Type
+
+from unweaver.network_adapters import GeoPackageNetwork
+from .csr_adjacency import CSRAdjacency
+from .inner_adjlist_view import CSRInnerAdjlistView, CSRInnerPredecessorsView
+
+
+class CSROuterAdjlistView(Mapping):
+    """Maps every node ID to its successors.
+
+    :param _csr: The CSRAdjacency.
+    :param _network: GeoPackageNetwork used to lazily fetch geometries.
+
+    """
+
+    inner_adjlist_factory: Type[CSRInnerAdjlistView] = CSRInnerAdjlistView
+
+    def __init__(self, _csr: CSRAdjacency, _network: GeoPackageNetwork):
+        self.csr = _csr
+        self.network = _network
+
+    def __getitem__(self, key: str) -> CSRInnerAdjlistView:
+        return self.inner_adjlist_factory(
+            self.csr, self.network, self.csr.index(key)
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.csr.node_ids)
+
+    def __len__(self) -> int:
+        return self.csr.number_of_nodes
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.csr.node_index
+
+
+class CSROuterPredecessorsView(CSROuterAdjlistView):
+    """Maps every node ID to its predecessors."""
+
+    inner_adjlist_factory = CSRInnerPredecessorsView
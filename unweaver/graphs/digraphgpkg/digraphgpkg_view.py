@@ -1,12 +1,12 @@
 """Dict-like interface(s) for graphs."""
 from __future__ import annotations
-from typing import Any, Iterable, Optional
+from typing import Any, Iterable, List, Optional, Tuple
 import uuid
 
 import networkx as nx  # type: ignore
 
 from unweaver.graph_types import EdgeTuple
-from unweaver.network_adapters import GeoPackageNetwork
+from unweaver.network_adapters import EdgeIndex, GeoPackageNetwork, RowCache
 from .edges import EdgeView
 from .nodes import NodesView
 from .outer_adjlists import OuterPredecessorsView, OuterSuccessorsView
@@ -23,6 +23,13 @@ class DiGraphGPKGView(nx.DiGraph):
     :param path: A path to the GeoPackage file (.gpkg). If no file exists
     at this path, one will be created.
     :param network: An existing GeoPackageNetwork instance.
+    :param read_only: Open the GeoPackage at `path` without ever writing to
+    it, e.g. to serve a database shared by many processes. The file must
+    already contain a built graph.
+    :param cache: A RowCache for node, edge, and adjacency rows, which may be
+    shared by many graph views. Requires `read_only`.
+    :param edge_index: An in-memory EdgeIndex of the graph's edges, which may
+    be shared by many graph views, for faster nearest-edge searches.
     :param **attr: Any parameters to be attached as graph attributes.
 
     """
@@ -41,11 +48,16 @@ class DiGraphGPKGView(nx.DiGraph):
         incoming_graph_data: Optional[nx.DiGraph] = None,
         path: Optional[str] = None,
         network: Optional[GeoPackageNetwork] = None,
+        read_only: bool = False,
+        cache: Optional[RowCache] = None,
+        edge_index: Optional[EdgeIndex] = None,
         **attr: Any,
     ):
         # Path attr overrides sqlite attr
         if path:
-            network = GeoPackageNetwork(path)
+            network = GeoPackageNetwork(
+                path, read_only=read_only, cache=cache, edge_index=edge_index
+            )
         elif network is None:
             raise ValueError("Path or network must be set")
 
@@ -102,6 +114,36 @@ class DiGraphGPKGView(nx.DiGraph):
             for u, v, d in self.network.edges.iter_edges()
         )
 
+    def edges_bunch(
+        self, ebunch: Iterable[Tuple[str, str]]
+    ) -> List[EdgeTuple]:
+        """Retrieve the data of many edges at once, using far fewer database
+        queries than looking each one up with G[u][v].
+
+        :param ebunch: Iterable of (u, v) node ID pairs.
+        :returns: List of (u, v, d) edge tuples in the same order as ebunch,
+                  where d is a dictionary in the same format as dict(G[u][v]).
+        :raises KeyError: If any of the edges does not exist.
+
+        """
+        ebunch = list(ebunch)
+        cache = self.network.cache
+        if cache is None:
+            edges = self.network.edges.get_edges(ebunch)
+        else:
+            edges = {}
+            missing = []
+            for u, v in ebunch:
+                d = cache.get(("edge", u, v))
+                if d is None:
+                    missing.append((u, v))
+                else:
+                    edges[(u, v)] = d
+            for (u, v), d in self.network.edges.get_edges(missing).items():
+                cache.put(("edge", u, v), d)
+                edges[(u, v)] = d
+        return [(u, v, dict(edges[(u, v)])) for u, v in ebunch]
+
     def edges_dwithin(
         self, lon: float, lat: float, distance: float, sort: bool = False
     ) -> Iterable[EdgeTuple]:
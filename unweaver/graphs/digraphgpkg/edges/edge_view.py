@@ -38,7 +38,7 @@ class EdgeView(Mapping):
             self.sync_from_db()
 
     def sync_from_db(self) -> None:
-        self.ddict = dict(self.network.edges.get_edge(self.u, self.v))
+        self.ddict = dict(self._get_edge(self.network, self.u, self.v))
 
     def sync_to_db(self) -> None:
         raise ImmutableGraphError(
@@ -48,7 +48,15 @@ class EdgeView(Mapping):
     @classmethod
     def from_db(cls, network: GeoPackageNetwork, u: str, v: str) -> EdgeView:
         return cls(
-            _network=network, _u=u, _v=v, **network.edges.get_edge(u, v)
+            _network=network, _u=u, _v=v, **cls._get_edge(network, u, v)
+        )
+
+    @staticmethod
+    def _get_edge(network: GeoPackageNetwork, u: str, v: str) -> dict:
+        if network.cache is None:
+            return network.edges.get_edge(u, v)
+        return network.cache.fetch(
+            ("edge", u, v), lambda: network.edges.get_edge(u, v)
         )
 
     def __getitem__(self, key: str) -> EdgeData:
@@ -1,6 +1,6 @@
 """GeoPackage adapter for networkx inner adjacency list mapping."""
 from collections.abc import Mapping
-from typing import AbstractSet, Iterator, Tuple
+from typing import AbstractSet, Iterator, List, Tuple
 
 from unweaver.network_adapters import GeoPackageNetwork
 from ..edges import EdgeView
@@ -24,14 +24,26 @@ class InnerAdjlistView(Mapping):
         return self.edge_factory(self.network, self.n, key)
 
     def __iter__(self) -> Iterator[str]:
+        if self.network.cache is not None:
+            return iter([v for v, row in self._neighbors()])
         return iter(self.id_iterator(self.n))
 
     def __len__(self) -> int:
+        if self.network.cache is not None:
+            return len({v for v, row in self._neighbors()})
         return self.size(self.n)
 
     def items(self) -> AbstractSet[Tuple[str, EdgeView]]:
         # This method is overridden to avoid two round trips to the database.
         return {
             (v, self.edge_factory(self.network, self.n, v, **row))
-            for v, row in self.iterator(self.n)
+            for v, row in self._neighbors()
         }
+
+    def _neighbors(self) -> List[Tuple[str, dict]]:
+        cache = self.network.cache
+        if cache is None:
+            return self.iterator(self.n)
+        return cache.fetch(
+            (self.iterator_str, self.n), lambda: self.iterator(self.n)
+        )
@@ -20,20 +20,28 @@ class NodeView(Mapping):
 
         try:
             # TODO: store the data!
-            self.network.nodes.get_node(_n)
+            self._get_node()
         except NodeNotFound:
             raise KeyError(f"Node {_n} not found")
 
+    def _get_node(self) -> dict:
+        cache = self.network.cache
+        if cache is None:
+            return self.network.nodes.get_node(self.n)
+        return cache.fetch(
+            ("node", self.n), lambda: self.network.nodes.get_node(self.n)
+        )
+
     # TODO: consider that .items() requires two round trips - may want to
     #       override
     def __getitem__(self, key: str) -> dict:
         try:
-            return self.network.nodes.get_node(self.n)[key]
+            return self._get_node()[key]
         except NodeNotFound:
             raise KeyError(key)
 
     def __iter__(self) -> Iterator[str]:
-        return iter(self.network.nodes.get_node(self.n).keys())
+        return iter(self._get_node().keys())
 
     def __len__(self) -> int:
-        return len(self.network.nodes.get_node(self.n))
+        return len(self._get_node())
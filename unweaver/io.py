@@ -1,6 +1,7 @@
 """Wraps various readers/writers for different geospatial formats with a focus
 on low-memory reading."""
 import os
+import re
 from typing import Iterable, List, Optional
 
 import fiona  # type: ignore
@@ -9,6 +10,9 @@ from unweaver.exceptions import UnrecognizedFileFormat
 from unweaver.geojson import LineString
 from unweaver.graph_types import EdgeTuple
 
+# The "type" member of a GeoJSON Feature (but not of a FeatureCollection)
+FEATURE_TYPE_PATTERN = re.compile(rb'"type"\s*:\s*"Feature"')
+
 
 def edge_generator(
     path: str,
@@ -42,6 +46,24 @@ def edge_generator(
         )
 
 
+def estimate_feature_count(path: str, sample_size: int = 2**20) -> int:
+    """Estimate the number of features in a GeoJSON file from the features in
+    its first sample_size bytes, without parsing it. The count is exact for
+    files no larger than the sample.
+
+    :param path: Path to the GeoJSON file.
+    :param sample_size: The number of bytes to sample.
+
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    n = len(FEATURE_TYPE_PATTERN.findall(sample))
+    if not sample or len(sample) == size:
+        return n
+    return round(n * size / len(sample))
+
+
 def create_node_id(lon: float, lat: float, precision: int) -> str:
     return f"{round(lon, precision)}, {round(lat, precision)}"
 
@@ -1,3 +1,3 @@
-from .geopackagenetwork import GeoPackageNetwork
+from .geopackagenetwork import EdgeIndex, GeoPackageNetwork, RowCache
 
-__all__ = ("GeoPackageNetwork",)
+__all__ = ("EdgeIndex", "GeoPackageNetwork", "RowCache")
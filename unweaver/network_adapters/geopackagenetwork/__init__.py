@@ -1,3 +1,5 @@
+from .edge_index import EdgeIndex
 from .geopackage_network import GeoPackageNetwork
+from .row_cache import RowCache
 
-__all__ = ("GeoPackageNetwork",)
+__all__ = ("EdgeIndex", "GeoPackageNetwork", "RowCache")
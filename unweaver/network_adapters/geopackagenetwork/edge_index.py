@@ -0,0 +1,261 @@
+"""An in-memory spatial index of the edges of a read-only graph."""
+# Imported so that classmethods can be annotated to return class instance
+from __future__ import annotations
+import math
+from typing import TYPE_CHECKING, List, Tuple
+
+import numpy as np
+
+from unweaver.constants import (
+    BATCH_SIZE,
+    DWITHIN,
+    EDGE_INDEX_CELL_SIZE,
+    NEAREST_RADIUS,
+)
+from unweaver.geo.distance import meters_per_degree
+
+if TYPE_CHECKING:
+    from .geopackage_network import GeoPackageNetwork
+
+
+class EdgeIndex:
+    """A uniform grid of the segments of every edge, held in packed NumPy
+    arrays, for nearest-edge searches that never touch the database. Like
+    `EdgeTable.nearest_edges`, which uses it when it is set as the table's
+    `index`, it measures distances in a local frame around the query point,
+    so both find the same edges (ties may be ordered differently).
+
+    Grid cells are about cell_size meters wide. Each segment is listed in
+    every cell its bounding box overlaps, sorted by cell, so that the
+    segments of a column of cells are a single slice of an array.
+
+    The index is a snapshot of the edges: it is meant for read-only graphs
+    and must be rebuilt after any change.
+
+    :param fids: The fid of the edge of every segment.
+    :param segments: The (x1, y1, x2, y2) coordinates of every segment.
+    :param cell_keys: The sorted keys of the non-empty cells.
+    :param cell_offsets: Start of every cell's entries (length cells + 1).
+    :param cell_segments: Segment indices, grouped by cell.
+    :param origin: The (x, y) coordinates of the grid origin.
+    :param cell_width: The width of a cell, in degrees of longitude.
+    :param cell_height: The height of a cell, in degrees of latitude.
+
+    """
+
+    def __init__(
+        self,
+        fids: np.ndarray,
+        segments: np.ndarray,
+        cell_keys: np.ndarray,
+        cell_offsets: np.ndarray,
+        cell_segments: np.ndarray,
+        origin: Tuple[float, float],
+        cell_width: float,
+        cell_height: float,
+    ):
+        self.fids = fids
+        self.segments = segments
+        self.cell_keys = cell_keys
+        self.cell_offsets = cell_offsets
+        self.cell_segments = cell_segments
+        self.origin = origin
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+    @classmethod
+    def from_network(
+        cls,
+        network: GeoPackageNetwork,
+        cell_size: float = EDGE_INDEX_CELL_SIZE,
+    ) -> EdgeIndex:
+        """Index the edges of a GeoPackageNetwork.
+
+        :param network: The GeoPackageNetwork.
+        :param cell_size: The approximate width of grid cells, in meters.
+
+        """
+        edges = network.edges
+        fids: List[int] = []
+        coordinates: List[float] = []
+        for rows in edges.iter_batches(
+            10 * BATCH_SIZE, column_names=[edges.geom_column]
+        ):
+            for row in rows:
+                geometry = row[edges.geom_column]
+                if geometry is None:
+                    continue
+                points = geometry["coordinates"]
+                for (x1, y1, *_), (x2, y2, *_) in zip(points, points[1:]):
+                    fids.append(row[edges.primary_key])
+                    coordinates.extend((x1, y1, x2, y2))
+
+        segments = np.array(coordinates, dtype=np.float64).reshape(-1, 4)
+        if not len(segments):
+            return cls(
+                np.zeros(0, dtype=np.int64),
+                segments,
+                np.zeros(0, dtype=np.int64),
+                np.zeros(1, dtype=np.int64),
+                np.zeros(0, dtype=np.int64),
+                (0.0, 0.0),
+                1.0,
+                1.0,
+            )
+
+        min_x = segments[:, [0, 2]].min()
+        min_y = segments[:, [1, 3]].min()
+        max_y = segments[:, [1, 3]].max()
+        mx, my = meters_per_degree((min_y + max_y) / 2)
+        cell_width = cell_size / mx
+        cell_height = cell_size / my
+
+        # The range of cells of every segment
+        xs = segments[:, [0, 2]] - min_x
+        ys = segments[:, [1, 3]] - min_y
+        i_min = (xs.min(axis=1) // cell_width).astype(np.int64)
+        i_max = (xs.max(axis=1) // cell_width).astype(np.int64)
+        j_min = (ys.min(axis=1) // cell_height).astype(np.int64)
+        j_max = (ys.max(axis=1) // cell_height).astype(np.int64)
+        rows = j_max - j_min + 1
+        counts = (i_max - i_min + 1) * rows
+
+        # One entry per (segment, cell)
+        entry_segments = np.repeat(np.arange(len(segments)), counts)
+        local = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        i = i_min[entry_segments] + local // rows[entry_segments]
+        j = j_min[entry_segments] + local % rows[entry_segments]
+        keys = (i << 32) | j  # As _cell_key
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        cell_keys, starts = np.unique(keys, return_index=True)
+        cell_offsets = np.append(starts, len(keys)).astype(np.int64)
+
+        return cls(
+            np.array(fids, dtype=np.int64),
+            segments,
+            cell_keys,
+            cell_offsets,
+            entry_segments[order],
+            (float(min_x), float(min_y)),
+            cell_width,
+            cell_height,
+        )
+
+    @property
+    def number_of_segments(self) -> int:
+        return len(self.segments)
+
+    @property
+    def number_of_cells(self) -> int:
+        return len(self.cell_keys)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the index's arrays, in bytes."""
+        arrays = (
+            self.fids,
+            self.segments,
+            self.cell_keys,
+            self.cell_offsets,
+            self.cell_segments,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def nearest(
+        self,
+        lon: float,
+        lat: float,
+        k: int = 1,
+        max_distance: float = DWITHIN,
+    ) -> List[Tuple[int, float]]:
+        """Find the k edges nearest to a point, within a maximum distance.
+
+        As with `FeatureTable.nearest`, the search box starts small and
+        doubles until the k nearest edges are certain.
+
+        :param lon: The longitude of the query point.
+        :param lat: The latitude of the query point.
+        :param k: The maximum number of edges to find.
+        :param max_distance: The maximum distance (in meters) of edges.
+        :returns: List of (fid, distance in meters) pairs, nearest first.
+
+        """
+        scale = meters_per_degree(lat)
+        radius = min(NEAREST_RADIUS, max_distance)
+        while True:
+            fids, distances = self._measure(lon, lat, radius, scale)
+            # The nearest segment of every edge, nearest edges first
+            found: List[Tuple[int, float]] = []
+            seen = set()
+            for segment in np.lexsort((fids, distances)).tolist():
+                distance = float(distances[segment])
+                if distance > max_distance or len(found) == k:
+                    break
+                fid = int(fids[segment])
+                if fid not in seen:
+                    seen.add(fid)
+                    found.append((fid, distance))
+            if radius >= max_distance or (
+                len(found) == k and found[-1][1] <= radius
+            ):
+                return found
+            radius = min(2 * radius, max_distance)
+
+    def _measure(
+        self,
+        lon: float,
+        lat: float,
+        radius: float,
+        scale: Tuple[float, float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # The edge fids and distances of the segments in the cells within
+        # radius of a point
+        x0, y0 = self.origin
+        dx = radius / scale[0]
+        dy = radius / scale[1]
+        i_min = math.floor((lon - dx - x0) / self.cell_width)
+        i_max = math.floor((lon + dx - x0) / self.cell_width)
+        j_min = math.floor((lat - dy - y0) / self.cell_height)
+        j_max = math.floor((lat + dy - y0) / self.cell_height)
+
+        slices = []
+        if j_max >= 0:
+            for i in range(max(i_min, 0), i_max + 1):
+                lo = np.searchsorted(
+                    self.cell_keys, _cell_key(i, max(j_min, 0))
+                )
+                hi = np.searchsorted(
+                    self.cell_keys, _cell_key(i, j_max), "right"
+                )
+                if lo < hi:
+                    start = self.cell_offsets[lo]
+                    stop = self.cell_offsets[hi]
+                    slices.append(self.cell_segments[start:stop])
+        if not slices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        # Segments in more than one cell are measured more than once, which
+        # is cheaper than deduplicating them
+        segment_ids = np.concatenate(slices)
+        segments = self.segments[segment_ids]
+        x1 = (segments[:, 0] - lon) * scale[0]
+        y1 = (segments[:, 1] - lat) * scale[1]
+        x2 = (segments[:, 2] - lon) * scale[0]
+        y2 = (segments[:, 3] - lat) * scale[1]
+        sx = x2 - x1
+        sy = y2 - y1
+        length2 = sx * sx + sy * sy
+        t = np.zeros(len(segments))
+        np.divide(-(x1 * sx + y1 * sy), length2, out=t, where=length2 > 0)
+        np.clip(t, 0.0, 1.0, out=t)
+        distances = np.hypot(x1 + t * sx, y1 + t * sy)
+        return self.fids[segment_ids], distances
+
+
+def _cell_key(i: int, j: int) -> int:
+    # Cells of the same column (i) have consecutive keys
+    return (i << 32) | j
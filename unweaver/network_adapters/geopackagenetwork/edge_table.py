@@ -1,9 +1,26 @@
-from typing import Any, Dict, Generator, Iterable, List, Tuple
+from bisect import insort
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from click._termui_impl import ProgressBar
 
-from unweaver.geopackage.feature_table import FeatureTable
+from unweaver.constants import DWITHIN, SNAP_TILE_SIZE, SQLITE_MAX_VARIABLES
+from unweaver.geo.distance import (
+    distance_to_bounds,
+    distance_to_geometry,
+    meters_per_degree,
+)
+from unweaver.geopackage.feature_table import FeatureTable, hilbert_order
 from unweaver.graph_types import EdgeData, EdgeTuple
+from .edge_index import EdgeIndex
 
 # FIXME: define Row type to make serialization/deserializaiton and mapping
 # easier to type
@@ -12,6 +29,7 @@ from unweaver.graph_types import EdgeData, EdgeTuple
 class EdgeTable(FeatureTable):
     u_key = "_u"
     v_key = "_v"
+    index: Optional[EdgeIndex] = None
 
     def write_features(
         self,
@@ -22,14 +40,17 @@ class EdgeTable(FeatureTable):
         # FIXME: should fill a nodes queue instead of realizing a full list at
         # this step
         ways_queue: List[Dict[str, Any]] = []
-        nodes_queue: List[Dict[str, Any]] = []
+        # Keyed by node ID, so that each node is written once per batch
+        nodes_queue: Dict[str, Dict[str, Any]] = {}
 
         for feature in features:
             if len(ways_queue) >= batch_size:
                 super().write_features(ways_queue, 10000, counter)
-                self.gpkg.feature_tables["nodes"].write_features(nodes_queue)
+                self.gpkg.feature_tables["nodes"].write_features(
+                    nodes_queue.values()
+                )
                 ways_queue = []
-                nodes_queue = []
+                nodes_queue = {}
             ways_queue.append(feature)
             u_feature = {"_n": feature[self.u_key]}
             v_feature = {"_n": feature[self.v_key]}
@@ -42,10 +63,10 @@ class EdgeTable(FeatureTable):
                     "type": "Point",
                     "coordinates": feature["geom"].coordinates[-1],
                 }
-            nodes_queue.append(u_feature)
-            nodes_queue.append(v_feature)
+            nodes_queue[u_feature["_n"]] = u_feature
+            nodes_queue[v_feature["_n"]] = v_feature
 
-        self.gpkg.feature_tables["nodes"].write_features(nodes_queue)
+        self.gpkg.feature_tables["nodes"].write_features(nodes_queue.values())
         super().write_features(ways_queue, batch_size, counter)
 
     def dwithin_edges(
@@ -54,6 +75,163 @@ class EdgeTable(FeatureTable):
         rows = super().dwithin(lon, lat, distance, sort=sort)
         return (self._graph_format(row) for row in rows)
 
+    def intersects_edges(
+        self,
+        left: float,
+        bottom: float,
+        right: float,
+        top: float,
+        column_names: Optional[Sequence[str]] = None,
+        deserialize: bool = True,
+    ) -> Generator[EdgeTuple, None, None]:
+        """Find edges intersecting a bounding box (see
+        `FeatureTable.intersects`).
+
+        :param left: left coordinate of bounding box.
+        :param bottom: bottom coordinate of bounding box.
+        :param right: right coordinate of bounding box.
+        :param top: top coordinate of bounding box.
+        :param column_names: The columns to read, besides the primary key
+                             and node IDs. Defaults to every column.
+        :param deserialize: Whether to decode geometries.
+        :returns: Generator of edges.
+
+        """
+        if column_names is not None:
+            column_names = [self.u_key, self.v_key, *column_names]
+        for row in self.intersects(
+            left, bottom, right, top, column_names, deserialize
+        ):
+            yield self._graph_format(row)
+
+    def nearest_edges(
+        self,
+        lon: float,
+        lat: float,
+        k: int = 1,
+        max_distance: float = DWITHIN,
+    ) -> List[EdgeTuple]:
+        """Find the k edges nearest to a point (see `FeatureTable.nearest`).
+        If the table has an in-memory EdgeIndex, it is searched instead of the
+        R-tree, and only the rows of the edges found are read.
+
+        :param lon: The longitude of the query point.
+        :param lat: The latitude of the query point.
+        :param k: The maximum number of edges to find.
+        :param max_distance: The maximum distance (in meters) of edges.
+        :returns: List of edges, nearest first.
+
+        """
+        if self.index is not None:
+            fids = [
+                fid for fid, _ in self.index.nearest(lon, lat, k, max_distance)
+            ]
+            rows = {row[self.primary_key]: row for row in self._get_rows(fids)}
+            return [self._graph_format(rows[fid]) for fid in fids]
+        return [
+            self._graph_format(row)
+            for row, _ in self.nearest(lon, lat, k, max_distance)
+        ]
+
+    def nearest_edges_many(
+        self,
+        points: Sequence[Tuple[float, float]],
+        k: int = 1,
+        max_distance: float = DWITHIN,
+        tile_size: float = SNAP_TILE_SIZE,
+    ) -> List[List[EdgeTuple]]:
+        """Find the k edges nearest to each of many points, with the same
+        results as calling `nearest_edges` for each point.
+
+        The points are visited in Hilbert curve order and grouped into tiles
+        of nearby points, which share a single R-tree query and the edges
+        read for any of them: each point measures edges in order of the
+        distance to their bounding box, as `FeatureTable.nearest` does, but
+        edges already read for a nearby point are not read again. If the
+        table has an in-memory EdgeIndex, it is searched instead, and the
+        edges found for a tile are read with a single query. Nearby points
+        may therefore share the same edge data dictionaries, which must not
+        be modified.
+
+        :param points: The (lon, lat) query points.
+        :param k: The maximum number of edges to find per point.
+        :param max_distance: The maximum distance (in meters) of edges.
+        :param tile_size: The approximate width of tiles, in meters.
+        :returns: List of the edges near each point, nearest first, in the
+                  same order as points.
+
+        """
+        results: List[List[EdgeTuple]] = [[] for _ in points]
+        for tile in _tiles(points, tile_size):
+            if self.index is not None:
+                found = {
+                    i: self.index.nearest(*points[i], k, max_distance)
+                    for i in tile
+                }
+                fids = sorted(
+                    {fid for pairs in found.values() for fid, _ in pairs}
+                )
+                edges = {
+                    row[self.primary_key]: self._graph_format(row)
+                    for row in self._get_rows(fids)
+                }
+                for i, pairs in found.items():
+                    results[i] = [edges[fid] for fid, _ in pairs]
+                continue
+
+            # The bounding box of every edge within max_distance of any point
+            # of the tile
+            lons = [points[i][0] for i in tile]
+            lats = [points[i][1] for i in tile]
+            # Degrees of longitude are shortest far from the equator
+            mx, my = meters_per_degree(max(abs(lat) for lat in lats))
+            tile_bounds = self._rtree_bounds(
+                min(lons) - max_distance / mx,
+                min(lats) - max_distance / my,
+                max(lons) + max_distance / mx,
+                max(lats) + max_distance / my,
+            )
+            # The edges read so far (None for those without a geometry)
+            read: Dict[int, Optional[EdgeTuple]] = {}
+
+            for i in tile:
+                lon, lat = points[i]
+                scale = meters_per_degree(lat)
+                pending = sorted(
+                    (distance_to_bounds(lon, lat, bounds, scale), fid)
+                    for fid, *bounds in tile_bounds
+                )
+                nearest: List[Tuple[float, int, EdgeTuple]] = []
+                for position, (bounds_distance, fid) in enumerate(pending):
+                    if bounds_distance > max_distance:
+                        break
+                    if len(nearest) >= k:
+                        if bounds_distance >= nearest[k - 1][0]:
+                            break
+                    if fid not in read:
+                        # Read the next k unread edges at once
+                        batch = [
+                            f for _, f in pending[position:] if f not in read
+                        ][:k]
+                        for f in batch:
+                            read[f] = None
+                        for row in self._get_rows(batch):
+                            if row[self.geom_column] is not None:
+                                read[
+                                    row[self.primary_key]
+                                ] = self._graph_format(row)
+                    candidate = read[fid]
+                    if candidate is None:
+                        continue
+                    distance = distance_to_geometry(
+                        lon, lat, candidate[2][self.geom_column], scale
+                    )
+                    if distance <= max_distance:
+                        insort(nearest, (distance, fid, candidate))
+                results[i] = [edge for _, _, edge in nearest[:k]]
+
+        return results
+
     def update_edges(self, ebunch: Iterable[EdgeTuple]) -> None:
         with self.gpkg.connect() as conn:
             fids = []
@@ -138,6 +316,55 @@ class EdgeTable(FeatureTable):
             ns = [(r.pop(self.u_key), r) for r in rows]
         return ns
 
+    def successors_bunch(
+        self, nbunch: Iterable[str]
+    ) -> Dict[str, List[Tuple[str, dict]]]:
+        """Retrieve the successors of many nodes using as few queries as
+        possible.
+
+        :param nbunch: Iterable of node IDs.
+        :returns: Mapping from each node ID to a list of (successor, edge data)
+                  tuples. Edge data has the same format as get_edge.
+
+        """
+        return self._adjacent_bunch(nbunch, self.u_key, self.v_key)
+
+    def predecessors_bunch(
+        self, nbunch: Iterable[str]
+    ) -> Dict[str, List[Tuple[str, dict]]]:
+        """Retrieve the predecessors of many nodes using as few queries as
+        possible.
+
+        :param nbunch: Iterable of node IDs.
+        :returns: Mapping from each node ID to a list of (predecessor, edge
+                  data) tuples. Edge data has the same format as get_edge.
+
+        """
+        return self._adjacent_bunch(nbunch, self.v_key, self.u_key)
+
+    def _adjacent_bunch(
+        self, nbunch: Iterable[str], key: str, other_key: str
+    ) -> Dict[str, List[Tuple[str, dict]]]:
+        nodes = list(set(nbunch))
+        adjacent: Dict[str, List[Tuple[str, dict]]] = {n: [] for n in nodes}
+        with self.gpkg.connect() as conn:
+            for i in range(0, len(nodes), SQLITE_MAX_VARIABLES):
+                chunk = nodes[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" for n in chunk)
+                rows = conn.execute(
+                    f"""
+                    SELECT *
+                      FROM {self.name}
+                     WHERE {key} IN ({placeholders})
+                """,
+                    chunk,
+                )
+                for row in rows:
+                    adjacent[row[key]].append(
+                        (row[other_key], self.deserialize_row(row))
+                    )
+        return adjacent
+
     def unique_predecessors(self, n: str = None) -> int:
         with self.gpkg.connect() as conn:
             if n is None:
@@ -188,6 +415,42 @@ class EdgeTable(FeatureTable):
             # TODO: performance increase by temporary changing row handler?
             return self.deserialize_row(next(rows))
 
+    def get_edges(
+        self, pairs: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], dict]:
+        """Retrieve many edges using as few queries as possible.
+
+        :param pairs: Iterable of (u, v) node ID pairs.
+        :returns: Mapping from (u, v) to edge data, in the same format as
+                  get_edge. Pairs with no edge are omitted.
+
+        """
+        unique_pairs = list(set(pairs))
+        edges: Dict[Tuple[str, str], dict] = {}
+        # Two variables per pair
+        chunk_size = SQLITE_MAX_VARIABLES // 2
+        with self.gpkg.connect() as conn:
+            for i in range(0, len(unique_pairs), chunk_size):
+                chunk = unique_pairs[i : i + chunk_size]
+                values = ", ".join("(?, ?)" for pair in chunk)
+                # Joining on a VALUES list (rather than using a row value IN
+                # clause) lets SQLite use the (u, v) index.
+                rows = conn.execute(
+                    f"""
+                    SELECT e.*
+                      FROM (VALUES {values}) AS pairs
+                      JOIN {self.name} AS e
+                        ON e.{self.u_key} = pairs.column1
+                       AND e.{self.v_key} = pairs.column2
+                """,
+                    [n for pair in chunk for n in pair],
+                )
+                for row in rows:
+                    edges[
+                        (row[self.u_key], row[self.v_key])
+                    ] = self.deserialize_row(row)
+        return edges
+
     def delete(self, u: str, v: str) -> None:
         with self.gpkg.connect() as conn:
             conn.execute(
@@ -216,3 +479,30 @@ class EdgeTable(FeatureTable):
             if "fid" in ddict:
                 ddict.pop("fid")
             yield ddict
+
+
+def _tiles(
+    points: Sequence[Tuple[float, float]], tile_size: float
+) -> Generator[List[int], None, None]:
+    # Group the indices of points into tiles of nearby points: consecutive
+    # points along a Hilbert curve, within about tile_size meters of one
+    # another
+    ordered = hilbert_order(
+        [(i, lon, lon, lat, lat) for i, (lon, lat) in enumerate(points)]
+    )
+    tile: List[int] = []
+    # The first point of the tile
+    x0 = y0 = 0.0
+    for i, lon, _, lat, _ in ordered:
+        if tile:
+            mx, my = meters_per_degree(lat)
+            dx = abs(lon - x0) * mx
+            dy = abs(lat - y0) * my
+            if dx > tile_size or dy > tile_size:
+                yield tile
+                tile = []
+        if not tile:
+            x0, y0 = lon, lat
+        tile.append(i)
+    if tile:
+        yield tile
@@ -1,31 +1,53 @@
 # Imported annotations from __future__ so that method returning class instance
 # can be hinted
 from __future__ import annotations
-from typing import Any, Collection, Dict, Iterable, List
+from typing import Any, Collection, Dict, Iterable, List, Optional
 import sqlite3
 
+from unweaver.exceptions import UnderspecifiedGraphError
 from unweaver.geopackage import GeoPackage, GeoPackageGeoms
 from unweaver.graph_types import EdgeTuple
+from .edge_index import EdgeIndex
 from .edge_table import EdgeTable
 from .node_table import NodeTable
+from .row_cache import RowCache
 
 
 class GeoPackageNetwork:
-    def __init__(self, path: str = None, srid: int = 4326):
+    def __init__(
+        self,
+        path: str = None,
+        srid: int = 4326,
+        read_only: bool = False,
+        cache: Optional[RowCache] = None,
+        create_indices: bool = True,
+        edge_index: Optional[EdgeIndex] = None,
+    ):
+        if cache is not None and not read_only:
+            # Writes would leave stale rows in the cache
+            raise ValueError("Only read-only networks can use a RowCache.")
         self.path = path
-        self.gpkg = GeoPackage(path=path)
+        self.cache = cache
+        self.gpkg = GeoPackage(path=path, read_only=read_only)
         # TODO: handle reprojection during addition of features
         self.srid = srid
 
         # TODO: handle recognition of existing geopackage (with expected
         #       tables) vs. initializing one from scratch.
-        self._create_graph_tables()
+        if read_only:
+            self._validate_graph_tables()
+        else:
+            self._create_graph_tables()
+            if create_indices:
+                self.create_indices()
         self.edges = EdgeTable(
             self.gpkg, "edges", GeoPackageGeoms.LINESTRING, srid=srid
         )
         self.nodes = NodeTable(
             self.gpkg, "nodes", GeoPackageGeoms.POINT, srid=srid
         )
+        # Nearest-edge searches use the in-memory index, if there is one
+        self.edges.index = edge_index
         self.gpkg.feature_tables["edges"] = self.edges
         self.gpkg.feature_tables["nodes"] = self.nodes
 
@@ -77,8 +99,36 @@ class GeoPackageNetwork:
                 # Ignore case where columns already exist
                 pass
 
+    def create_indices(self, deduplicate: bool = False) -> None:
+        """Create the indices of node IDs and edge (u, v) IDs, if they don't
+        exist. Creating them after rows have been written (see the
+        create_indices parameter) is faster than updating them on every
+        write.
+
+        :param deduplicate: Whether to first delete all but the last row
+                            written of every node ID and edge (u, v), which
+                            the (unique) indices would otherwise have
+                            replaced as they were written.
+
+        """
         with self.gpkg.connect() as conn:
-            # NOTE: create these indices later to improve performance?
+            if deduplicate:
+                conn.execute(
+                    """
+                    DELETE FROM nodes
+                          WHERE fid NOT IN (
+                              SELECT MAX(fid) FROM nodes GROUP BY _n
+                          )
+                """
+                )
+                conn.execute(
+                    """
+                    DELETE FROM edges
+                          WHERE fid NOT IN (
+                              SELECT MAX(fid) FROM edges GROUP BY _u, _v
+                          )
+                """
+                )
             conn.execute(
                 """
                 CREATE UNIQUE INDEX IF NOT EXISTS nodes_n_index
@@ -97,6 +147,23 @@ class GeoPackageNetwork:
             """
             )
 
+    def _validate_graph_tables(self) -> None:
+        # A read-only network can't create its tables, so check that they
+        # exist using the GeoPackage's cached schema metadata.
+        required = {"edges": ("_u", "_v"), "nodes": ("_n",)}
+        for table_name, columns in required.items():
+            if table_name not in self.gpkg.metadata:
+                raise UnderspecifiedGraphError(
+                    f"No {table_name} table: not a routable GeoPackage."
+                )
+            table_columns = self.gpkg.metadata[table_name].columns
+            missing = [c for c in columns if c not in table_columns]
+            if missing:
+                raise UnderspecifiedGraphError(
+                    f"The {table_name} table is missing columns: "
+                    f"{', '.join(missing)}."
+                )
+
     def has_node(self, n: str) -> bool:
         """Check whether a node with id 'n' is in the graph.
         :param n: The node id.
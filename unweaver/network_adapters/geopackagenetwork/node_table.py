@@ -1,5 +1,14 @@
-from typing import Any, Dict, Generator, Iterable
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+from unweaver.constants import SQLITE_MAX_VARIABLES
 from unweaver.exceptions import NodeNotFound
 from unweaver.geopackage.feature_table import FeatureTable
 from unweaver.graph_types import NodeTuple
@@ -14,6 +23,35 @@ class NodeTable(FeatureTable):
         rows = super().dwithin(lon, lat, distance, sort=sort)
         return (self._graph_format(row) for row in rows)
 
+    def intersects_nodes(
+        self,
+        left: float,
+        bottom: float,
+        right: float,
+        top: float,
+        column_names: Optional[Sequence[str]] = None,
+        deserialize: bool = True,
+    ) -> Generator[NodeTuple, None, None]:
+        """Find nodes intersecting a bounding box (see
+        `FeatureTable.intersects`).
+
+        :param left: left coordinate of bounding box.
+        :param bottom: bottom coordinate of bounding box.
+        :param right: right coordinate of bounding box.
+        :param top: top coordinate of bounding box.
+        :param column_names: The columns to read, besides the primary key
+                             and node ID. Defaults to every column.
+        :param deserialize: Whether to decode geometries.
+        :returns: Generator of nodes.
+
+        """
+        if column_names is not None:
+            column_names = [self.node_key, *column_names]
+        for row in self.intersects(
+            left, bottom, right, top, column_names, deserialize
+        ):
+            yield self._graph_format(row)
+
     def update_nodes(self, nbunch: Iterable[NodeTuple]) -> None:
         serialized = [(n, self.serialize_row(d)) for n, d in nbunch]
         super().update_batch(serialized)
@@ -35,6 +73,41 @@ class NodeTable(FeatureTable):
             except StopIteration:
                 raise NodeNotFound()
 
+    def get_coordinates_bunch(
+        self, nbunch: Iterable[str]
+    ) -> Dict[str, Tuple[float, float]]:
+        """Retrieve the (lon, lat) coordinates of many nodes using as few
+        queries as possible.
+
+        :param nbunch: Iterable of node IDs.
+        :returns: Mapping from node ID to coordinates. Nodes that do not exist
+                  or have no geometry are omitted.
+
+        """
+        nodes = list(set(nbunch))
+        coordinates: Dict[str, Tuple[float, float]] = {}
+        with self.gpkg.connect() as conn:
+            for i in range(0, len(nodes), SQLITE_MAX_VARIABLES):
+                chunk = nodes[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" for n in chunk)
+                rows = conn.execute(
+                    f"""
+                    SELECT {self.node_key}, {self.geom_column}
+                      FROM {self.name}
+                     WHERE {self.node_key} IN ({placeholders})
+                """,
+                    chunk,
+                )
+                for row in rows:
+                    if row[self.geom_column] is None:
+                        continue
+                    geometry = self._deserialize_geometry(
+                        row[self.geom_column]
+                    )
+                    lon, lat = geometry["coordinates"][:2]
+                    coordinates[row[self.node_key]] = (lon, lat)
+        return coordinates
+
     def insert(self, n: str, ddict: Dict[str, Any]) -> None:
         self.write_feature({**ddict, self.node_key: n})
         with self.gpkg.connect() as conn:
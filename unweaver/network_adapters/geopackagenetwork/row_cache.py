@@ -0,0 +1,125 @@
+"""A byte-budgeted LRU cache for decoded rows of a read-only graph."""
+from collections import OrderedDict
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+from unweaver.constants import ROW_CACHE_BYTES
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class RowCache:
+    """A least-recently-used cache of decoded database rows (nodes, edges and
+    adjacency lists), bounded by an estimate of their size in memory. A
+    single instance can be shared by many read-only GeoPackageNetworks for
+    the same GeoPackage, e.g. by every request thread of a web server.
+
+    Cached values are shared, so callers must copy them before making any
+    changes.
+
+    :param max_bytes: The approximate maximum size of all cached values, in
+    bytes.
+
+    """
+
+    def __init__(self, max_bytes: int = ROW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retrieve a cached value, counting a hit or miss.
+
+        :param key: The cache key.
+        :param default: The value to return if the key is not cached.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used values if the cache
+        would exceed its size. Values larger than the whole cache are not
+        stored.
+
+        :param key: The cache key.
+        :param value: The value.
+
+        """
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+
+    def fetch(self, key: Hashable, fetch: Callable[[], T]) -> T:
+        """Retrieve a cached value, calling `fetch` to get (and cache) it on
+        a miss. Exceptions raised by `fetch` are not cached.
+
+        :param key: The cache key.
+        :param fetch: A function with no arguments that returns the value.
+
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = fetch()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Remove every value, e.g. after the GeoPackage has changed."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size, e.g. for monitoring.
+
+        :returns: A dictionary of hits, misses, entries, and bytes.
+
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+        }
+
+
+def _sizeof(value: Any) -> int:
+    # An estimate of the memory held by a decoded row: the containers and
+    # everything they hold, which is usually not shared with other rows.
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + _sizeof(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += _sizeof(v)
+    return size
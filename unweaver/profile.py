@@ -1,6 +1,7 @@
 import importlib.util
 from functools import partial
 import os
+from types import ModuleType
 from typing import (
     Any,
     Callable,
@@ -12,10 +13,10 @@ from typing import (
     Union,
 )
 
-from marshmallow import Schema, fields, post_load
+from marshmallow import Schema, fields, post_load, validate
 
 from unweaver.fields.eval import Eval
-from unweaver.graph_types import CostFunction
+from unweaver.graph_types import CostFunction, VectorizedCostFunction
 from unweaver import default_profile_functions
 
 
@@ -33,10 +34,17 @@ class OptionalProfile(TypedDict, total=False):
     args: List[ProfileArg]
     static: Dict[str, fields.Field]
     precalculate: bool
+    min_cost_per_meter: float
     cost_function: Callable[..., CostFunction]
+    vectorized_cost_function: Callable[..., VectorizedCostFunction]
     shortest_path: Callable
     shortest_path_tree: Callable
     reachable_tree: Callable
+    cost_matrix: Callable
+    route: Callable
+    trip: Callable
+    reachable_tree_multi: Callable
+    isochrone: Callable
 
 
 class Profile(OptionalProfile, RequiredProfile):
@@ -57,8 +65,14 @@ class ProfileSchema(Schema):
     args = fields.List(fields.Nested(ProfileArgSchema))
     cost_function = fields.Str()
     shortest_path = fields.Str()
+    cost_matrix = fields.Str()
+    route = fields.Str()
+    trip = fields.Str()
+    reachable_tree_multi = fields.Str()
+    isochrone = fields.Str()
     id = fields.Str(required=True)
     precalculate = fields.Boolean()
+    min_cost_per_meter = fields.Float(validate=validate.Range(min=0))
     static = fields.Dict(
         keys=fields.Str(), values=fields.Field(), required=False
     )
@@ -77,18 +91,36 @@ class ProfileSchema(Schema):
 
         static = data.get("static", None)
 
+        # Loaded once, as it may also define a vectorized cost function
+        cost_module: Optional[ModuleType] = None
+        if "cost_function" in data:
+            cost_module = load_module(
+                path,
+                data["cost_function"],
+                "unweaver.user_defined.cost_fun_generator",
+            )
+
         user_defined = {}
         for field_name in [
             "cost_function",
             "shortest_path",
             "shortest_path_tree",
             "reachable_tree",
+            "cost_matrix",
+            "route",
+            "trip",
+            "reachable_tree_multi",
+            "isochrone",
         ]:
             function_name = field_name
             if function_name == "cost_function":
                 function_name = "cost_fun_generator"
 
-            if field_name in data:
+            if cost_module is not None and field_name == "cost_function":
+                function = apply_static(
+                    getattr(cost_module, function_name), static
+                )
+            elif field_name in data:
                 function = load_function(
                     path,
                     data[field_name],
@@ -101,6 +133,20 @@ class ProfileSchema(Schema):
 
             user_defined[field_name] = function
 
+        # Optional: a cost function over arrays of column values, used to
+        # precalculate weights in bulk
+        vectorized_cost_function: Optional[Callable] = None
+        if cost_module is not None:
+            vectorized = getattr(
+                cost_module, "vectorized_cost_fun_generator", None
+            )
+            if vectorized is not None:
+                vectorized_cost_function = apply_static(vectorized, static)
+        else:
+            vectorized_cost_function = (
+                default_profile_functions.vectorized_cost_function_generator
+            )
+
         precalculate = data.get("precalculate", False)
 
         profile: Profile = {
@@ -109,30 +155,60 @@ class ProfileSchema(Schema):
             "shortest_path": user_defined["shortest_path"],
             "shortest_path_tree": user_defined["shortest_path_tree"],
             "reachable_tree": user_defined["reachable_tree"],
+            "cost_matrix": user_defined["cost_matrix"],
+            "route": user_defined["route"],
+            "trip": user_defined["trip"],
+            "reachable_tree_multi": user_defined["reachable_tree_multi"],
+            "isochrone": user_defined["isochrone"],
             "precalculate": precalculate,
         }
 
+        if vectorized_cost_function is not None:
+            profile["vectorized_cost_function"] = vectorized_cost_function
+
         if "args" in data:
             profile["args"] = data["args"]
 
-        return profile
+        if "min_cost_per_meter" in data:
+            profile["min_cost_per_meter"] = data["min_cost_per_meter"]
 
+        return profile
 
-def load_function_from_file(
-    path: str, module_name: str, funcname: str
-) -> Callable:
-    renamed_module = f"{module_name}.{funcname}"
 
-    spec = importlib.util.spec_from_file_location(renamed_module, path)
+def load_module_from_file(path: str, module_name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(module_name, path)
     if spec is None:
-        raise Exception(f"Invalid function: {module_name}, {funcname}")
+        raise Exception(f"Invalid module: {module_name}")
     # TODO: investigate type errors here - unclear if they matter
     module = importlib.util.module_from_spec(spec)  # type: ignore
     spec.loader.exec_module(module)  # type: ignore
+    return module
+
 
+def load_function_from_file(
+    path: str, module_name: str, funcname: str
+) -> Callable:
+    module = load_module_from_file(path, f"{module_name}.{funcname}")
     return getattr(module, funcname)
 
 
+def load_module(
+    working_path: str, module_path: str, module_name: str
+) -> ModuleType:
+    return load_module_from_file(
+        os.path.join(working_path, module_path), module_name
+    )
+
+
+def apply_static(
+    function: Callable, static: Optional[Dict[str, fields.Field]] = None
+) -> Callable:
+    if static is not None:
+        # Apply static arguments
+        function = partial(function, **static)
+    return function
+
+
 def load_function(
     working_path: str,
     function_path: str,
@@ -144,7 +220,4 @@ def load_function(
     function = load_function_from_file(
         function_path, module_name, function_name
     )
-    if static is not None:
-        # Apply static arguments
-        function = partial(function, **static)
-    return function
+    return apply_static(function, static)
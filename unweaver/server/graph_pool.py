@@ -0,0 +1,130 @@
+"""A process-level pool of read-only graph handles for the web server."""
+import contextlib
+import threading
+from typing import Generator, List, Optional
+
+from unweaver.constants import GRAPH_POOL_SIZE
+from unweaver.graphs import CSRAdjacency, DiGraphCSRView, DiGraphGPKGView
+from unweaver.network_adapters import EdgeIndex, RowCache
+
+
+class GraphPool:
+    """A fixed-size pool of graph handles, each with its own read-only
+    database connection. Handles are created lazily and reused across
+    requests, so borrowing one costs no connection setup, extension loading,
+    or schema checks.
+
+    A handle is only ever used by one thread at a time. If a thread acquires
+    a handle while already holding one, it gets the same handle back.
+
+    :param path: Path to the GeoPackage (graph.gpkg).
+    :param size: The maximum number of handles. When every handle is in use,
+    `acquire` blocks until one is released.
+    :param csr: A shared in-memory adjacency: if set, handles are
+    DiGraphCSRViews.
+    :param cache: A RowCache shared by every handle, so that popular nodes
+    and edges are read from the database once per process. Unused with
+    `csr`, which already holds all non-geometry data in memory.
+    :param edge_index: An in-memory EdgeIndex shared by every handle, used
+    to snap waypoints to edges.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int = GRAPH_POOL_SIZE,
+        csr: Optional[CSRAdjacency] = None,
+        cache: Optional[RowCache] = None,
+        edge_index: Optional[EdgeIndex] = None,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.path = path
+        self.size = size
+        self.csr = csr
+        self.cache = cache
+        self.edge_index = edge_index
+
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(size)
+        self._idle: List[DiGraphGPKGView] = []
+        self._handles: List[DiGraphGPKGView] = []
+        self._local = threading.local()
+
+    def _create(self) -> DiGraphGPKGView:
+        if self.csr is not None:
+            return DiGraphCSRView(
+                path=self.path,
+                csr=self.csr,
+                read_only=True,
+                edge_index=self.edge_index,
+            )
+        return DiGraphGPKGView(
+            path=self.path,
+            read_only=True,
+            cache=self.cache,
+            edge_index=self.edge_index,
+        )
+
+    def acquire(self) -> DiGraphGPKGView:
+        """Borrow a graph handle, creating it if the pool is not yet full.
+        Every call must be matched by a call to `release`.
+
+        :returns: A read-only graph.
+
+        """
+        G = getattr(self._local, "G", None)
+        if G is not None:
+            self._local.depth += 1
+            return G
+
+        self._available.acquire()
+        try:
+            with self._lock:
+                # Most recently used first: its pages are likeliest cached
+                G = self._idle.pop() if self._idle else None
+            if G is None:
+                G = self._create()
+                with self._lock:
+                    self._handles.append(G)
+        except Exception:
+            self._available.release()
+            raise
+
+        self._local.G = G
+        self._local.depth = 1
+        return G
+
+    def release(self, G: DiGraphGPKGView) -> None:
+        """Return a graph handle to the pool.
+
+        :param G: A graph from `acquire`.
+
+        """
+        if getattr(self._local, "G", None) is not G:
+            raise ValueError("Graph was not acquired by this thread.")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.G = None
+        with self._lock:
+            self._idle.append(G)
+        self._available.release()
+
+    @contextlib.contextmanager
+    def graph(self) -> Generator[DiGraphGPKGView, None, None]:
+        """Borrow a graph handle for the duration of a `with` block."""
+        G = self.acquire()
+        try:
+            yield G
+        finally:
+            self.release(G)
+
+    def close(self) -> None:
+        """Close the database connections of every idle handle."""
+        with self._lock:
+            for G in self._idle:
+                G.network.gpkg.close()
+                self._handles.remove(G)
+            self._idle = []
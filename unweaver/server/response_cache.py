@@ -0,0 +1,93 @@
+"""A cache of analysis results shared by the web server's views."""
+from collections import OrderedDict
+import os
+import threading
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+from unweaver.constants import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+
+
+class ResponseCache:
+    """A least-recently-used cache of analysis results with a maximum number
+    of entries and a time-to-live. Every entry is dropped as soon as the
+    graph's GeoPackage changes (e.g. is rebuilt or reweighted), as detected
+    by its modification time and size.
+
+    :param path: Path to the GeoPackage (graph.gpkg).
+    :param max_entries: The maximum number of cached results.
+    :param ttl: The number of seconds for which a result is valid. If None,
+    results only expire when evicted or when the GeoPackage changes.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        ttl: Optional[float] = RESPONSE_CACHE_TTL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_id = self._get_build_id()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_build_id(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _check_build(self) -> None:
+        build_id = self._get_build_id()
+        if build_id != self._build_id:
+            self._entries.clear()
+            self._build_id = build_id
+
+    def get(self, key: Hashable) -> Any:
+        """Retrieve a cached result.
+
+        :param key: The cache key.
+        :returns: The result, or None if it is not cached or has expired.
+
+        """
+        with self._lock:
+            self._check_build()
+            entry = self._entries.get(key)
+            if entry is None or (
+                self.ttl is not None and time.monotonic() > entry[0]
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, result: Any) -> None:
+        """Cache a result, evicting the least recently used result if the
+        cache is full.
+
+        :param key: The cache key.
+        :param result: The result. It must not be modified afterwards.
+
+        """
+        expires = time.monotonic() + (self.ttl or 0)
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every result."""
+        with self._lock:
+            self._entries.clear()
@@ -1,23 +1,68 @@
 import os
-from typing import List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import flask
 from flask import g
 
-from unweaver.constants import DB_PATH
-from unweaver.graphs import DiGraphGPKGView
+from unweaver.constants import (
+    DB_PATH,
+    GRAPH_POOL_SIZE,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    ROW_CACHE_BYTES,
+)
+from unweaver.contraction import ContractionHierarchy
+from unweaver.graphs import CSRAdjacency
+from unweaver.network_adapters import EdgeIndex, GeoPackageNetwork, RowCache
 from unweaver.server.app import create_app
 from unweaver.parsers import parse_profiles
+from unweaver.profile import Profile
+from .graph_pool import GraphPool
+from .response_cache import ResponseCache
 from .views import add_views
 
 
 Header = Tuple[str, str]
 
 
-def _get_graph(base_path: str) -> DiGraphGPKGView:
+def _load_csr(base_path: str) -> CSRAdjacency:
     db_path = os.path.join(base_path, DB_PATH)
 
-    return DiGraphGPKGView(path=db_path)
+    return CSRAdjacency.from_network(
+        GeoPackageNetwork(db_path, read_only=True)
+    )
+
+
+def _load_edge_index(base_path: str) -> EdgeIndex:
+    db_path = os.path.join(base_path, DB_PATH)
+
+    edge_index = EdgeIndex.from_network(
+        GeoPackageNetwork(db_path, read_only=True)
+    )
+    print(
+        f"Loaded edge index: {edge_index.number_of_segments} segments in "
+        f"{edge_index.number_of_cells} cells, about "
+        f"{edge_index.nbytes / 2**20:.1f} MiB"
+    )
+    return edge_index
+
+
+def _load_hierarchies(
+    base_path: str, profiles: List[Profile]
+) -> Dict[str, ContractionHierarchy]:
+    db_path = os.path.join(base_path, DB_PATH)
+    network = GeoPackageNetwork(db_path, read_only=True)
+
+    hierarchies = {}
+    for profile in profiles:
+        if not profile.get("precalculate", False):
+            continue
+        if ContractionHierarchy.exists(network, profile["id"]):
+            hierarchies[profile["id"]] = ContractionHierarchy.from_network(
+                network, profile["id"]
+            )
+
+    return hierarchies
 
 
 def run_app(
@@ -26,44 +71,92 @@ def run_app(
     port: Union[str, int] = 8000,
     add_headers: List[Header] = None,
     debug: bool = False,
+    csr: bool = False,
+    pool_size: int = GRAPH_POOL_SIZE,
+    cache_bytes: int = ROW_CACHE_BYTES,
+    response_cache_size: int = RESPONSE_CACHE_SIZE,
+    response_cache_ttl: Optional[float] = RESPONSE_CACHE_TTL,
+    spatial_index: bool = False,
 ) -> None:
-    app = setup_app(path, add_headers, debug)
+    app = setup_app(
+        path,
+        add_headers,
+        debug,
+        csr=csr,
+        spatial_index=spatial_index,
+        pool_size=pool_size,
+        cache_bytes=cache_bytes,
+        response_cache_size=response_cache_size,
+        response_cache_ttl=response_cache_ttl,
+    )
     app.run(host=host, port=port)
 
 
 def setup_app(
-    path: str, add_headers: Optional[List[Header]] = None, debug: bool = False
+    path: str,
+    add_headers: Optional[List[Header]] = None,
+    debug: bool = False,
+    csr: bool = False,
+    pool_size: int = GRAPH_POOL_SIZE,
+    cache_bytes: int = ROW_CACHE_BYTES,
+    response_cache_size: int = RESPONSE_CACHE_SIZE,
+    response_cache_ttl: Optional[float] = RESPONSE_CACHE_TTL,
+    spatial_index: bool = False,
 ) -> flask.Flask:
     if add_headers is None:
         # Using new variable name to make mypy happy
         headers = [
             ("Access-Control-Allow-Origin", "*"),
             ("Access-Control-Allow-Headers", "Content-Type,Authorization"),
-            ("Access-Control-Allow-Methods", "GET"),
+            ("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
         ]
     else:
         headers = add_headers
 
     profiles = parse_profiles(path)
 
+    # The in-memory adjacency, edge index and contraction hierarchies are
+    # loaded once and shared by every request
+    shared_csr: Optional[CSRAdjacency] = None
+    edge_index: Optional[EdgeIndex] = None
+    hierarchies: Dict[str, ContractionHierarchy] = {}
     try:
-        _get_graph(path)
+        if csr:
+            shared_csr = _load_csr(path)
+        if spatial_index:
+            edge_index = _load_edge_index(path)
+        hierarchies = _load_hierarchies(path, profiles)
     except Exception as e:
         print("Failed to retrieve the graph. Error below.")
         print(e)
 
+    # Requests borrow graph handles (read-only db connections) from a pool
+    # rather than reconnecting every time, and share a cache of rows
+    cache: Optional[RowCache] = None
+    if cache_bytes > 0 and shared_csr is None:
+        cache = RowCache(cache_bytes)
+    pool = GraphPool(
+        os.path.join(path, DB_PATH),
+        pool_size,
+        shared_csr,
+        cache=cache,
+        edge_index=edge_index,
+    )
+    try:
+        with pool.graph():
+            pass
+    except Exception as e:
+        print("Failed to open the graph. Error below.")
+        print(e)
+
     app = create_app()
 
-    # Share graph db connection
     @app.before_request
     def before_request() -> None:
-        # Create a db connection
         g.failed_graph = False
         try:
-            # TODO: any issues with concurrent connections? Should we share
-            # one db connection (DiGraphGPKG instance) vs. reconnecting?
             if "G" not in g:
-                g.G = _get_graph(path)
+                g.G = pool.acquire()
         except Exception as e:
             # TODO: Check this during startup as well to detect graph issues
             print("Failed to retrieve the graph. Error below.")
@@ -81,9 +174,25 @@ def setup_app(
     @app.teardown_request
     def teardown_request(exception: Exception = None) -> None:
         # TODO: add CORS info?
-        g.G = None
+        G = g.pop("G", None)
+        if G is not None:
+            pool.release(G)
+
+    # Analysis results for recently-requested places, shared by all views
+    response_cache: Optional[ResponseCache] = None
+    if response_cache_size > 0:
+        response_cache = ResponseCache(
+            os.path.join(path, DB_PATH),
+            max_entries=response_cache_size,
+            ttl=response_cache_ttl,
+        )
 
     for profile in profiles:
-        add_views(app, profile)
+        add_views(
+            app,
+            profile,
+            hierarchy=hierarchies.get(profile["id"]),
+            response_cache=response_cache,
+        )
 
     return app
@@ -0,0 +1,103 @@
+"""Encode JSON-like results as a stream of text chunks, so that large
+responses start to reach clients before they have been fully encoded, and the
+encoded text held in memory is bounded by the chunk size rather than the size
+of the response."""
+from dataclasses import asdict, is_dataclass
+import json
+from typing import Any, Iterator, List, Mapping
+
+from unweaver.constants import STREAM_CHUNK_SIZE
+from unweaver.geo import encode_polyline
+
+JSON_MIMETYPE = "application/json"
+# JSON in which every LineString's coordinates are replaced by a "polyline"
+# string (see `unweaver.geo.encode_polyline`)
+POLYLINE_MIMETYPE = "application/vnd.unweaver.polyline+json"
+
+
+def iter_json(
+    obj: Any, polyline: bool = False, chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[str]:
+    """Encode a JSON-like object as JSON, in chunks. Arrays of objects (e.g.
+    GeoJSON features) within the object, including within nested mappings,
+    are encoded one item at a time. So are iterators (e.g. generators), which
+    are only consumed as the chunks are.
+
+    :param obj: The object, e.g. the result of a profile function.
+    :param polyline: Whether to encode LineString coordinates as polylines.
+    :param chunk_size: The approximate size of every chunk, in characters.
+
+    """
+    parts: List[str] = []
+    size = 0
+    for part in _encode(obj, polyline):
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield "".join(parts)
+
+
+def _encode(obj: Any, polyline: bool) -> Iterator[str]:
+    if isinstance(obj, Iterator) or (
+        isinstance(obj, (list, tuple)) and _is_streamed(obj)
+    ):
+        yield "["
+        for i, item in enumerate(obj):
+            if i:
+                yield ","
+            yield from _encode(item, polyline)
+        yield "]"
+    elif _is_streamed(obj):
+        yield "{"
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                yield ","
+            yield json.dumps(str(key))
+            yield ":"
+            yield from _encode(value, polyline)
+        yield "}"
+    else:
+        if polyline:
+            obj = _polylines(obj)
+        yield json.dumps(obj, default=_default, separators=(",", ":"))
+
+
+def _is_streamed(obj: Any) -> bool:
+    # Iterators, arrays of objects, and objects that contain either. Anything
+    # else (e.g. a single feature, or coordinates) is encoded at once.
+    if isinstance(obj, Iterator):
+        return True
+    if isinstance(obj, (list, tuple)):
+        return bool(obj) and (
+            isinstance(obj[0], Mapping) or is_dataclass(obj[0])
+        )
+    if isinstance(obj, Mapping):
+        return any(_is_streamed(value) for value in obj.values())
+    return False
+
+
+def _polylines(obj: Any) -> Any:
+    if is_dataclass(obj) and not isinstance(obj, type):
+        obj = asdict(obj)
+    if isinstance(obj, Mapping):
+        if obj.get("type") == "LineString" and "coordinates" in obj:
+            encoded = {k: v for k, v in obj.items() if k != "coordinates"}
+            encoded["polyline"] = encode_polyline(obj["coordinates"])
+            return encoded
+        return {key: _polylines(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_polylines(value) for value in obj]
+    return obj
+
+
+def _default(obj: Any) -> Any:
+    # As with flask.jsonify, e.g. for the unweaver.geojson dataclasses
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable"
+    )
@@ -1,31 +1,93 @@
-from typing import Type, Union
+from typing import Optional, Type, Union
 
 from flask import Flask
 
+from unweaver.contraction import ContractionHierarchy
 from unweaver.profile import Profile
+from ..response_cache import ResponseCache
+from .base_view import BaseView
+from .cost_matrix import CostMatrixView
+from .isochrone import IsochroneView
 from .shortest_path import ShortestPathView
 from .reachable_tree import ReachableTreeView
+from .reachable_tree_multi import ReachableTreeMultiView
+from .route import RouteView
+from .trip import TripView
 from .shortest_path_tree import ShortestPathTreeView
 
 View = Union[
-    Type[ShortestPathView], Type[ReachableTreeView], Type[ShortestPathTreeView]
+    Type[ShortestPathView],
+    Type[ReachableTreeView],
+    Type[ShortestPathTreeView],
+    Type[CostMatrixView],
+    Type[RouteView],
+    Type[TripView],
+    Type[ReachableTreeMultiView],
+    Type[IsochroneView],
 ]
 
 
-def add_view(app: Flask, view: View, profile: Profile) -> None:
+def add_view(
+    app: Flask,
+    view: View,
+    profile: Profile,
+    hierarchy: Optional[ContractionHierarchy] = None,
+    response_cache: Optional[ResponseCache] = None,
+) -> None:
     # TODO: Could use url_for and a real Flask route template?
     url = f"/{view.view_name}/{profile['id']}.json"
 
-    instantiated_view = view(profile)
+    instantiated_view: BaseView = view(
+        profile,
+        response_cache=response_cache,
+        hierarchy=hierarchy if view.uses_hierarchy else None,
+    )
 
     app.add_url_rule(
         url,
         f"{view.view_name}-{profile['id']}",
         instantiated_view.create_view(),
+        methods=list(view.methods),
     )
 
 
-def add_views(app: Flask, profile: Profile) -> None:
-    add_view(app, ShortestPathView, profile)
-    add_view(app, ShortestPathTreeView, profile)
-    add_view(app, ReachableTreeView, profile)
+def add_views(
+    app: Flask,
+    profile: Profile,
+    hierarchy: Optional[ContractionHierarchy] = None,
+    response_cache: Optional[ResponseCache] = None,
+) -> None:
+    add_view(
+        app,
+        ShortestPathView,
+        profile,
+        hierarchy=hierarchy,
+        response_cache=response_cache,
+    )
+    add_view(app, ShortestPathTreeView, profile, response_cache=response_cache)
+    add_view(app, ReachableTreeView, profile, response_cache=response_cache)
+    add_view(
+        app, ReachableTreeMultiView, profile, response_cache=response_cache
+    )
+    add_view(app, IsochroneView, profile, response_cache=response_cache)
+    add_view(
+        app,
+        CostMatrixView,
+        profile,
+        hierarchy=hierarchy,
+        response_cache=response_cache,
+    )
+    add_view(
+        app,
+        RouteView,
+        profile,
+        hierarchy=hierarchy,
+        response_cache=response_cache,
+    )
+    add_view(
+        app,
+        TripView,
+        profile,
+        hierarchy=hierarchy,
+        response_cache=response_cache,
+    )
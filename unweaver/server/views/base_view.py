@@ -1,23 +1,62 @@
-from typing import Any, Callable, Optional, Type, Union
+import json
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
-from flask import g, jsonify
+from flask import Response, g, jsonify, request, stream_with_context
 from marshmallow import Schema
 from webargs.flaskparser import use_args
 
+from unweaver.constants import SNAP_KEY_PRECISION
+from unweaver.contraction import ContractionHierarchy
+from unweaver.graph import ProjectedNode
 from unweaver.graph_types import CostFunction
 from unweaver.profile import Profile
+from unweaver.utils import haversine
+from ..response_cache import ResponseCache
+from ..streaming import JSON_MIMETYPE, POLYLINE_MIMETYPE, iter_json
+
+Waypoint = Union[str, ProjectedNode]
 
 
 class BaseView:
     view_name: Optional[str] = None
     schema: Type[Schema]
+    # Arguments that are snapped to the graph as waypoints, and so are left
+    # out of response cache keys in favor of the waypoints themselves
+    waypoint_args: Tuple[str, ...] = ()
+    # HTTP methods of the view and where webargs reads its arguments from
+    methods: Tuple[str, ...] = ("GET",)
+    args_location = "query"
+    # Whether results are streamed in chunks as they are encoded, rather
+    # than encoded whole, and may have polyline-encoded geometries
+    streamed = False
+    # Whether the view is given the profile's contraction hierarchy, if any
+    uses_hierarchy = False
 
-    def __init__(self, profile: Profile):
+    def __init__(
+        self,
+        profile: Profile,
+        response_cache: Optional[ResponseCache] = None,
+        hierarchy: Optional[ContractionHierarchy] = None,
+    ):
         if self.view_name is None:
             raise AttributeError(
                 "BaseView subclass must have view_name class attribute."
             )
         self.profile = profile
+        self.response_cache = response_cache
+        # Only valid for the profile's precalculated weights
+        self.hierarchy = hierarchy
 
     @property
     def cost_function_generator(self) -> Callable[..., CostFunction]:
@@ -31,27 +70,82 @@ class BaseView:
         else:
             return None
 
+    def snap_waypoints(
+        self, arguments: dict, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        """Find the on-graph places (nodes or points along edges) of the
+        request's coordinates.
+
+        :returns: The waypoints, or None if any coordinate could not be
+                  snapped to the graph.
+
+        """
+        raise NotImplementedError
+
+    def run_analysis(
+        self,
+        arguments: dict,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Tuple:
+        """Run the analysis from snapped waypoints. The result must depend
+        only on the arguments and waypoints, as it may be cached and reused
+        for other requests that snap to the same places.
+
+        :returns: A tuple starting with a status code, e.g. "Ok" or "NoPath".
+
+        """
+        raise NotImplementedError
+
     # FIXME: don't constrain to Any type: constrain to a union of:
     #   Tuple[str],
     #   An extension of Tuple[str, ...]
     #   (or change return type to make this more straightforward).
-    def run_analysis(
-        self, arguments: dict, cost_function: CostFunction
+    def prepare_result(
+        self, arguments: dict, waypoints: List[Waypoint], analysis: Any
     ) -> Any:
+        """Add the request-specific parts (e.g. the graph and the input
+        coordinates) to an "Ok" analysis result, in the order expected by
+        the profile's interpretation function.
+
+        """
         raise NotImplementedError
 
+    def cache_key(
+        self, arguments: dict, waypoints: List[Waypoint]
+    ) -> Hashable:
+        other_args = {
+            k: v for k, v in arguments.items() if k not in self.waypoint_args
+        }
+        geom_column = g.G.network.edges.geom_column
+        return (
+            self.profile["id"],
+            self.view_name,
+            json.dumps(other_args, sort_keys=True, default=str),
+            tuple(_waypoint_key(wp, geom_column) for wp in waypoints),
+        )
+
     def interpret_result(self, result: Any) -> str:
-        if self.view_name == "shortest_path":
-            interpretation_function = self.profile["shortest_path"]
-        elif self.view_name == "shortest_path_tree":
-            interpretation_function = self.profile["shortest_path_tree"]
-        elif self.view_name == "reachable_tree":
-            interpretation_function = self.profile["reachable_tree"]
-        else:
-            interpretation_function = self.profile["shortest_path"]
+        # Every view is interpreted by the profile function of the same name
+        functions = cast(Mapping[str, Callable[..., Any]], self.profile)
+        interpretation_function = functions[cast(str, self.view_name)]
         interpreted_result = interpretation_function(*result)
         return interpreted_result
 
+    def make_response(self, result: Any) -> Response:
+        """Encode an interpreted result as a response. Streamed views
+        negotiate the encoding with the request's Accept header: JSON, or
+        JSON with polyline-encoded LineStrings.
+
+        """
+        if not self.streamed:
+            return jsonify(result)
+        mimetype = request.accept_mimetypes.best_match(
+            [JSON_MIMETYPE, POLYLINE_MIMETYPE], default=JSON_MIMETYPE
+        )
+        chunks = iter_json(result, polyline=mimetype == POLYLINE_MIMETYPE)
+        return Response(stream_with_context(chunks), mimetype=mimetype)
+
     def create_view(self) -> Callable:
         profile_args = {
             arg["name"]: arg["type"] for arg in self.profile.get("args", [])
@@ -62,18 +156,47 @@ class BaseView:
         class CombinedSchema(self.schema, profile_schema):  # type: ignore
             pass
 
-        @use_args(CombinedSchema(), location="query")
+        @use_args(CombinedSchema(), location=self.args_location)
         def view(args: dict) -> Any:
             if g.get("failed_graph", True):
                 return jsonify({"code": "NoGraph"})
             cost_args = {k: v for k, v in args.items() if k in profile_args}
             cost_function = self.cost_function_generator(g.G, **cost_args)
-            analysis_result = self.run_analysis(args, cost_function)
 
-            code = analysis_result[0]
+            waypoints = self.snap_waypoints(args, cost_function)
+            if waypoints is None:
+                return jsonify({"code": "InvalidWaypoint"})
+
+            cache = self.response_cache
+            key = None
+            analysis = None
+            if cache is not None:
+                key = self.cache_key(args, waypoints)
+                analysis = cache.get(key)
+            if analysis is None:
+                analysis = self.run_analysis(args, cost_function, waypoints)
+                if cache is not None:
+                    cache.put(key, analysis)
+
+            code = analysis[0]
             if code in ("NoPath", "InvalidWaypoint"):
                 return jsonify({"code": code})
 
-            return jsonify(self.interpret_result(analysis_result))
+            analysis_result = self.prepare_result(args, waypoints, analysis)
+
+            return self.make_response(self.interpret_result(analysis_result))
 
         return view
+
+
+def _waypoint_key(waypoint: Waypoint, geom_column: str) -> Hashable:
+    # On-graph nodes are keyed by ID, points along edges by the edge and the
+    # (rounded) distance along it.
+    if isinstance(waypoint, str):
+        return waypoint
+    if waypoint.edges_in is None or waypoint.edges_out is None:
+        return waypoint.n
+    u, _, d = waypoint.edges_in[0]
+    v = waypoint.edges_out[0][1]
+    distance = haversine(d[geom_column]["coordinates"])
+    return (u, v, round(distance / SNAP_KEY_PRECISION))
@@ -0,0 +1,126 @@
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from flask import g
+from marshmallow import Schema, fields, validate
+
+from unweaver.constants import MAX_COST_MATRIX_POINTS
+from unweaver.graph_types import CostFunction
+from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.cost_matrix import (
+    Matrix,
+    cost_matrix,
+    matrix_nodes,
+)
+from .base_view import BaseView, Waypoint
+
+Coordinates = fields.List(fields.Float(), validate=validate.Length(equal=2))
+
+
+class CostMatrixSchema(Schema):
+    origins = fields.List(
+        Coordinates,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_COST_MATRIX_POINTS),
+    )
+    destinations = fields.List(
+        Coordinates,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_COST_MATRIX_POINTS),
+    )
+    max_cost = fields.Float()
+
+
+class CostMatrixView(BaseView):
+    view_name = "cost_matrix"
+    schema = CostMatrixSchema
+
+    waypoint_args = ("origins", "destinations")
+    # Too many points for a query string
+    methods = ("POST",)
+    args_location = "json"
+    uses_hierarchy = True
+
+    def snap_waypoints(
+        self, arguments: Dict, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        origins, destinations = matrix_nodes(
+            g.G,
+            [makePointFeature(*point) for point in arguments["origins"]],
+            [makePointFeature(*point) for point in arguments["destinations"]],
+            cost_function,
+        )
+
+        checked_nodes: List[Waypoint] = []
+        for node in origins + destinations:
+            if node is None:
+                return None
+            checked_nodes.append(node)
+
+        return checked_nodes
+
+    def run_analysis(
+        self,
+        arguments: Dict,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Union[Tuple[str], Tuple[str, Matrix]]:
+        hierarchy = None
+        if (
+            self.profile.get("precalculate", False)
+            and self.precalculated_cost_function is not None
+        ):
+            cost_fun = self.precalculated_cost_function
+            hierarchy = self.hierarchy
+        else:
+            cost_fun = cost_function
+
+        n_origins = len(arguments["origins"])
+        costs = cost_matrix(
+            g.G,
+            waypoints[:n_origins],
+            waypoints[n_origins:],
+            cost_fun,
+            max_cost=arguments.get("max_cost"),
+            hierarchy=hierarchy,
+        )
+
+        return ("Ok", costs)
+
+    def cache_key(
+        self, arguments: Dict, waypoints: List[Waypoint]
+    ) -> Hashable:
+        # The same waypoints can be split into origins and destinations in
+        # different ways
+        return (
+            super().cache_key(arguments, waypoints),
+            len(arguments["origins"]),
+        )
+
+    def prepare_result(
+        self,
+        arguments: Dict,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, Matrix],
+    ) -> Tuple[
+        str,
+        DiGraphGPKGView,
+        List[Feature[Point]],
+        List[Feature[Point]],
+        Matrix,
+    ]:
+        status, costs = analysis
+
+        origins = [makePointFeature(*point) for point in arguments["origins"]]
+        destinations = [
+            makePointFeature(*point) for point in arguments["destinations"]
+        ]
+
+        # Copies: the analysis may be cached
+        return (
+            status,
+            g.G,
+            origins,
+            destinations,
+            [list(row) for row in costs],
+        )
@@ -0,0 +1,109 @@
+from typing import List, Mapping, Optional, Tuple, cast
+
+from flask import g
+from marshmallow import Schema, fields, validate
+from shapely.geometry import mapping  # type: ignore
+
+from unweaver.candidates import waypoint_candidates, choose_candidate
+from unweaver.constants import (
+    DWITHIN,
+    ISOCHRONE_BUFFER,
+    ISOCHRONE_TOLERANCE,
+    MAX_ISOCHRONE_BANDS,
+)
+from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graph import ProjectedNode
+from unweaver.graphs import AugmentedDiGraphGPKGView, DiGraphGPKGView
+from unweaver.graph_types import CostFunction
+from unweaver.shortest_paths.isochrone import isochrones, reachable_costs
+from unweaver.shortest_paths.reachable_tree import reachable_tree
+
+from .base_view import BaseView, Waypoint
+
+Polygons = List[Optional[dict]]
+
+
+class IsochroneSchema(Schema):
+    lon = fields.Float(required=True)
+    lat = fields.Float(required=True)
+    max_cost = fields.Float(required=True)
+    bands = fields.Int(validate=validate.Range(min=1, max=MAX_ISOCHRONE_BANDS))
+    buffer = fields.Float(validate=validate.Range(min=0, min_inclusive=False))
+    tolerance = fields.Float(validate=validate.Range(min=0))
+
+
+class IsochroneView(BaseView):
+    view_name = "isochrone"
+    schema = IsochroneSchema
+
+    waypoint_args = ("lon", "lat")
+
+    def snap_waypoints(
+        self, arguments: Mapping, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        lon = arguments["lon"]
+        lat = arguments["lat"]
+
+        candidates = waypoint_candidates(g.G, lon, lat, 4, dwithin=DWITHIN)
+        if candidates is None:
+            return None
+        candidate = choose_candidate(g.G, candidates, "origin", cost_function)
+        if candidate is None:
+            return None
+
+        return [candidate]
+
+    def run_analysis(
+        self,
+        arguments: Mapping,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Tuple[str, List[float], Polygons]:
+        max_cost = arguments["max_cost"]
+        candidate = cast(ProjectedNode, waypoints[0])
+
+        G_aug = AugmentedDiGraphGPKGView.prepare_augmented(g.G, candidate)
+        if self.profile.get("precalculate", False):
+            precalculated_cost_function = self.precalculated_cost_function
+        else:
+            precalculated_cost_function = cost_function
+        nodes, edges = reachable_tree(
+            G_aug,
+            candidate,
+            cost_function,
+            max_cost,
+            precalculated_cost_function,
+        )
+
+        costs = reachable_costs(max_cost, arguments.get("bands", 1))
+        polygons = isochrones(
+            G_aug,
+            nodes,
+            edges,
+            cost_function,
+            costs,
+            buffer=arguments.get("buffer", ISOCHRONE_BUFFER),
+            tolerance=arguments.get("tolerance", ISOCHRONE_TOLERANCE),
+        )
+
+        return ("Ok", costs, polygons)
+
+    def prepare_result(
+        self,
+        arguments: Mapping,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, List[float], Polygons],
+    ) -> Tuple[str, DiGraphGPKGView, Feature[Point], List[float], Polygons]:
+        status, costs, polygons = analysis
+        candidate = cast(ProjectedNode, waypoints[0])
+
+        origin = makePointFeature(*mapping(candidate.geometry)["coordinates"])
+
+        # Copies: the analysis may be cached
+        return (
+            status,
+            g.G,
+            origin,
+            list(costs),
+            [None if p is None else dict(p) for p in polygons],
+        )
@@ -1,4 +1,4 @@
-from typing import List, Mapping, Tuple, Union
+from typing import List, Mapping, Optional, Tuple, cast
 
 from flask import g
 from marshmallow import Schema, fields
@@ -7,12 +7,13 @@ from shapely.geometry import mapping  # type: ignore
 from unweaver.candidates import waypoint_candidates, choose_candidate
 from unweaver.constants import DWITHIN
 from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graph import ProjectedNode
 from unweaver.graphs import AugmentedDiGraphGPKGView
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.shortest_paths.shortest_path_tree import ReachedNodes
 from unweaver.shortest_paths.reachable_tree import reachable_tree
 
-from .base_view import BaseView
+from .base_view import BaseView, Waypoint
 
 
 class ReachableTreeSchema(Schema):
@@ -25,31 +26,35 @@ class ReachableTreeView(BaseView):
     view_name = "reachable_tree"
     schema = ReachableTreeSchema
 
-    # TODO: more specific than Mapping
-    def run_analysis(
+    waypoint_args = ("lon", "lat")
+    streamed = True
+
+    def snap_waypoints(
         self, arguments: Mapping, cost_function: CostFunction
-    ) -> Union[
-        Tuple[str],
-        Tuple[
-            str,
-            AugmentedDiGraphGPKGView,
-            Feature[Point],
-            ReachedNodes,
-            List[EdgeData],
-        ],
-    ]:
+    ) -> Optional[List[Waypoint]]:
         lon = arguments["lon"]
         lat = arguments["lat"]
-        max_cost = arguments["max_cost"]
 
         candidates = waypoint_candidates(g.G, lon, lat, 4, dwithin=DWITHIN)
         if candidates is None:
             # TODO: return too-far-away result
-            return ("InvalidWaypoint",)
+            return None
         candidate = choose_candidate(g.G, candidates, "origin", cost_function)
         if candidate is None:
             # TODO: return no-suitable-start-candidates result
-            return ("InvalidWaypoint",)
+            return None
+
+        return [candidate]
+
+    # TODO: more specific than Mapping
+    def run_analysis(
+        self,
+        arguments: Mapping,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Tuple[str, ReachedNodes, List[EdgeData]]:
+        max_cost = arguments["max_cost"]
+        candidate = cast(ProjectedNode, waypoints[0])
 
         G_aug = AugmentedDiGraphGPKGView.prepare_augmented(g.G, candidate)
         if self.profile.get("precalculate", False):
@@ -65,6 +70,32 @@ class ReachableTreeView(BaseView):
                 G_aug, candidate, cost_function, max_cost, cost_function
             )
 
+        return ("Ok", nodes, edges)
+
+    def prepare_result(
+        self,
+        arguments: Mapping,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, ReachedNodes, List[EdgeData]],
+    ) -> Tuple[
+        str,
+        AugmentedDiGraphGPKGView,
+        Feature[Point],
+        ReachedNodes,
+        List[EdgeData],
+    ]:
+        status, nodes, edges = analysis
+        candidate = cast(ProjectedNode, waypoints[0])
+
+        G_aug = AugmentedDiGraphGPKGView.prepare_augmented(g.G, candidate)
         origin = makePointFeature(*mapping(candidate.geometry)["coordinates"])
 
-        return ("Ok", G_aug, origin, nodes, edges)
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            G_aug,
+            origin,
+            dict(nodes),
+            [dict(edge) for edge in edges],
+        )
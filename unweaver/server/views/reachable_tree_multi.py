@@ -0,0 +1,139 @@
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from flask import g
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
+
+from unweaver.candidates import overlay_edges, snap_points
+from unweaver.constants import MAX_REACHABLE_TREE_ORIGINS
+from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graph import ProjectedNode
+from unweaver.graphs import AugmentedDiGraphGPKGView
+from unweaver.graph_types import CostFunction, EdgeData
+from unweaver.shortest_paths.reachable_tree import reachable_tree_multi
+from unweaver.shortest_paths.shortest_path_tree import Origins, ReachedNodes
+
+from .base_view import BaseView, Waypoint
+
+Coordinates = fields.List(fields.Float(), validate=validate.Length(equal=2))
+
+
+class ReachableTreeMultiSchema(Schema):
+    origins = fields.List(
+        Coordinates,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_REACHABLE_TREE_ORIGINS),
+    )
+    initial_costs = fields.List(fields.Float())
+    max_cost = fields.Float(required=True)
+
+    @validates_schema
+    def validate_initial_costs(self, data: Dict, **kwargs: Dict) -> None:
+        initial_costs = data.get("initial_costs")
+        if initial_costs is not None and len(initial_costs) != len(
+            data.get("origins", [])
+        ):
+            raise ValidationError(
+                "There must be one initial cost per origin.", "initial_costs"
+            )
+
+
+class ReachableTreeMultiView(BaseView):
+    view_name = "reachable_tree_multi"
+    schema = ReachableTreeMultiSchema
+
+    waypoint_args = ("origins",)
+    # Too many points for a query string
+    methods = ("POST",)
+    args_location = "json"
+    streamed = True
+
+    def snap_waypoints(
+        self, arguments: Mapping, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        candidates = snap_points(
+            g.G,
+            [(lon, lat) for lon, lat in arguments["origins"]],
+            edge_filter=cost_function,
+        )
+
+        checked_nodes: List[Waypoint] = []
+        for candidate in candidates:
+            if candidate is None:
+                return None
+            checked_nodes.append(candidate)
+
+        return checked_nodes
+
+    def run_analysis(
+        self,
+        arguments: Mapping,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Tuple[str, ReachedNodes, List[EdgeData], Origins]:
+        candidates = _candidates(waypoints)
+
+        G_aug = AugmentedDiGraphGPKGView.from_edges(
+            g.G, overlay_edges(g.G, candidates)
+        )
+        if self.profile.get("precalculate", False):
+            precalculated_cost_function = self.precalculated_cost_function
+        else:
+            precalculated_cost_function = cost_function
+        nodes, edges, origins = reachable_tree_multi(
+            G_aug,
+            candidates,
+            cost_function,
+            arguments["max_cost"],
+            initial_costs=arguments.get("initial_costs"),
+            precalculated_cost_function=precalculated_cost_function,
+        )
+
+        return ("Ok", nodes, edges, origins)
+
+    def prepare_result(
+        self,
+        arguments: Mapping,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, ReachedNodes, List[EdgeData], Origins],
+    ) -> Tuple[
+        str,
+        AugmentedDiGraphGPKGView,
+        List[Feature[Point]],
+        ReachedNodes,
+        List[EdgeData],
+        Dict[str, int],
+    ]:
+        status, nodes, edges, origins = analysis
+        candidates = _candidates(waypoints)
+
+        G_aug = AugmentedDiGraphGPKGView.from_edges(
+            g.G, overlay_edges(g.G, candidates)
+        )
+        points = [makePointFeature(*point) for point in arguments["origins"]]
+
+        # The nearest origin of every node, as an index into the origins.
+        # Origins that snapped to the same node share the first's index.
+        indices: Dict[str, int] = {}
+        for i, candidate in enumerate(candidates):
+            indices.setdefault(candidate.n, i)
+
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            G_aug,
+            points,
+            dict(nodes),
+            [dict(edge) for edge in edges],
+            {n: indices[origin] for n, origin in origins.items()},
+        )
+
+
+def _candidates(waypoints: List[Waypoint]) -> List[ProjectedNode]:
+    return [wp for wp in waypoints if isinstance(wp, ProjectedNode)]
@@ -0,0 +1,108 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from flask import g
+from marshmallow import Schema, fields, validate
+
+from unweaver.constants import MAX_ROUTE_WAYPOINTS
+from unweaver.exceptions import NoPathError
+from unweaver.graph_types import CostFunction
+from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.shortest_path import (
+    Leg,
+    join_legs,
+    shortest_path_legs,
+    waypoint_nodes,
+)
+from .base_view import BaseView, Waypoint
+
+Coordinates = fields.List(fields.Float(), validate=validate.Length(equal=2))
+
+
+class RouteSchema(Schema):
+    waypoints = fields.List(
+        Coordinates,
+        required=True,
+        validate=validate.Length(min=2, max=MAX_ROUTE_WAYPOINTS),
+    )
+
+
+class RouteView(BaseView):
+    view_name = "route"
+    schema = RouteSchema
+
+    waypoint_args = ("waypoints",)
+    # Too many points for a query string
+    methods = ("POST",)
+    args_location = "json"
+    uses_hierarchy = True
+
+    def snap_waypoints(
+        self, arguments: Dict, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        waypoints = [
+            makePointFeature(*point) for point in arguments["waypoints"]
+        ]
+        nodes = waypoint_nodes(g.G, waypoints, cost_function)
+
+        checked_nodes: List[Waypoint] = []
+        for node in nodes:
+            if node is None:
+                return None
+            checked_nodes.append(node)
+
+        return checked_nodes
+
+    def run_analysis(
+        self,
+        arguments: Dict,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Union[Tuple[str], Tuple[str, float, List[Leg]]]:
+        hierarchy = None
+        if (
+            self.profile.get("precalculate", False)
+            and self.precalculated_cost_function is not None
+        ):
+            cost_fun = self.precalculated_cost_function
+            hierarchy = self.hierarchy
+        else:
+            cost_fun = cost_function
+
+        try:
+            legs = shortest_path_legs(
+                g.G,
+                waypoints,
+                cost_fun,
+                min_cost_per_meter=self.profile.get("min_cost_per_meter"),
+                hierarchy=hierarchy,
+            )
+        except NoPathError:
+            return ("NoPath",)
+
+        cost, _, _ = join_legs(legs)
+
+        return ("Ok", cost, legs)
+
+    def prepare_result(
+        self,
+        arguments: Dict,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, float, List[Leg]],
+    ) -> Tuple[str, DiGraphGPKGView, List[Feature[Point]], float, List[Leg]]:
+        status, cost, legs = analysis
+
+        points = [makePointFeature(*point) for point in arguments["waypoints"]]
+
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            g.G,
+            points,
+            cost,
+            [
+                (leg_cost, list(path), [dict(edge) for edge in edges])
+                for leg_cost, path, edges in legs
+            ],
+        )
@@ -1,11 +1,10 @@
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from flask import g
 from marshmallow import Schema, fields
 
 
 from unweaver.exceptions import NoPathError
-from unweaver.graph import ProjectedNode
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.geojson import Feature, Point, makePointFeature
 from unweaver.graphs import DiGraphGPKG
@@ -13,7 +12,7 @@ from unweaver.shortest_paths.shortest_path import (
     shortest_path_multi,
     waypoint_nodes,
 )
-from .base_view import BaseView
+from .base_view import BaseView, Waypoint
 
 
 class ShortestPathSchema(Schema):
@@ -27,59 +26,88 @@ class ShortestPathView(BaseView):
     view_name = "shortest_path"
     schema = ShortestPathSchema
 
-    def run_analysis(
-        self, arguments: Dict, cost_function: CostFunction
-    ) -> Union[
-        Tuple[str],
-        Tuple[
-            str,
-            DiGraphGPKG,
-            Feature[Point],
-            Feature[Point],
-            float,
-            List[str],
-            List[EdgeData],
-        ],
-    ]:
-        lon1 = arguments["lon1"]
-        lat1 = arguments["lat1"]
-        lon2 = arguments["lon2"]
-        lat2 = arguments["lat2"]
+    waypoint_args = ("lon1", "lat1", "lon2", "lat2")
+    uses_hierarchy = True
 
+    def snap_waypoints(
+        self, arguments: Dict, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
         waypoints = [
-            makePointFeature(lon1, lat1),
-            makePointFeature(lon2, lat2),
+            makePointFeature(arguments["lon1"], arguments["lat1"]),
+            makePointFeature(arguments["lon2"], arguments["lat2"]),
         ]
         nodes = waypoint_nodes(g.G, waypoints, cost_function)
 
         # NOTE: Have to create new variable for mypy to notice that a None
         # check has been done...
-        checked_nodes: List[Union[str, ProjectedNode]] = []
+        checked_nodes: List[Waypoint] = []
         for node in nodes:
             if node is None:
-                return ("InvalidWaypoint",)
+                return None
             checked_nodes.append(node)
 
+        return checked_nodes
+
+    def run_analysis(
+        self,
+        arguments: Dict,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Union[Tuple[str], Tuple[str, float, List[str], List[EdgeData]]]:
         cost: float
         path: List[str]
         edges: List[EdgeData]
 
+        hierarchy = None
         if (
             self.profile.get("precalculate", False)
             and self.precalculated_cost_function is not None
         ):
             cost_fun = self.precalculated_cost_function
+            hierarchy = self.hierarchy
         else:
             cost_fun = cost_function
 
         try:
             cost, path, edges = shortest_path_multi(
-                g.G, checked_nodes, cost_fun
+                g.G,
+                waypoints,
+                cost_fun,
+                min_cost_per_meter=self.profile.get("min_cost_per_meter"),
+                hierarchy=hierarchy,
             )
         except NoPathError:
             return ("NoPath",)
 
-        origin = makePointFeature(lon1, lat1)
-        destination = makePointFeature(lon2, lat2)
+        return ("Ok", cost, path, edges)
+
+    def prepare_result(
+        self,
+        arguments: Dict,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, float, List[str], List[EdgeData]],
+    ) -> Tuple[
+        str,
+        DiGraphGPKG,
+        Feature[Point],
+        Feature[Point],
+        float,
+        List[str],
+        List[EdgeData],
+    ]:
+        status, cost, path, edges = analysis
+
+        origin = makePointFeature(arguments["lon1"], arguments["lat1"])
+        destination = makePointFeature(arguments["lon2"], arguments["lat2"])
 
-        return ("Ok", g.G, origin, destination, cost, path, edges)
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            g.G,
+            origin,
+            destination,
+            cost,
+            list(path),
+            [dict(edge) for edge in edges],
+        )
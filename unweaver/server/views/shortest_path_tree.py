@@ -1,4 +1,4 @@
-from typing import Any, Iterable, Mapping, Tuple, Union
+from typing import List, Mapping, Optional, Tuple, cast
 
 from flask import g
 from marshmallow import Schema, fields
@@ -7,15 +7,17 @@ from shapely.geometry import mapping  # type: ignore
 from unweaver.candidates import waypoint_candidates, choose_candidate
 from unweaver.constants import DWITHIN
 from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graph import ProjectedNode
 from unweaver.graphs import AugmentedDiGraphGPKGView
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.shortest_paths.shortest_path_tree import (
     shortest_path_tree,
+    Paths,
     ReachedNode,
     ReachedNodes,
 )
 
-from .base_view import BaseView
+from .base_view import BaseView, Waypoint
 
 
 class ShortestPathTreeSchema(Schema):
@@ -28,32 +30,35 @@ class ShortestPathTreeView(BaseView):
     view_name = "shortest_path_tree"
     schema = ShortestPathTreeSchema
 
-    def run_analysis(
+    waypoint_args = ("lon", "lat")
+    streamed = True
+
+    def snap_waypoints(
         self, arguments: Mapping, cost_function: CostFunction
-    ) -> Union[
-        Tuple[str],
-        Tuple[
-            str,
-            AugmentedDiGraphGPKGView,
-            Feature[Point],
-            ReachedNodes,
-            Any,
-            Iterable[EdgeData],
-        ],
-    ]:
+    ) -> Optional[List[Waypoint]]:
         lon = arguments["lon"]
         lat = arguments["lat"]
-        max_cost = arguments["max_cost"]
 
         candidates = waypoint_candidates(g.G, lon, lat, 4, dwithin=DWITHIN)
         if candidates is None:
             # TODO: return too-far-away result
             # TODO: normalize return type to be mapping with optional keys
-            return ("InvalidWaypoint",)
+            return None
         candidate = choose_candidate(g.G, candidates, "origin", cost_function)
         if candidate is None:
             # TODO: return no-suitable-start-candidates result
-            return ("InvalidWaypoint",)
+            return None
+
+        return [candidate]
+
+    def run_analysis(
+        self,
+        arguments: Mapping,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Tuple[str, ReachedNodes, Paths, List[EdgeData]]:
+        max_cost = arguments["max_cost"]
+        candidate = cast(ProjectedNode, waypoints[0])
 
         G_aug = AugmentedDiGraphGPKGView.prepare_augmented(g.G, candidate)
         if self.profile.get("precalculate", False):
@@ -77,6 +82,35 @@ class ShortestPathTreeView(BaseView):
             nodes[node_id] = ReachedNode(
                 key=node_id, geom=node_attr[geom_key], cost=reached_node.cost
             )
+
+        return ("Ok", nodes, paths, list(edges))
+
+    def prepare_result(
+        self,
+        arguments: Mapping,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, ReachedNodes, Paths, List[EdgeData]],
+    ) -> Tuple[
+        str,
+        AugmentedDiGraphGPKGView,
+        Feature[Point],
+        ReachedNodes,
+        Paths,
+        List[EdgeData],
+    ]:
+        status, nodes, paths, edges = analysis
+        candidate = cast(ProjectedNode, waypoints[0])
+
+        G_aug = AugmentedDiGraphGPKGView.prepare_augmented(g.G, candidate)
         origin = makePointFeature(*mapping(candidate.geometry)["coordinates"])
 
-        return ("Ok", G_aug, origin, nodes, paths, edges)
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            G_aug,
+            origin,
+            dict(nodes),
+            dict(paths),
+            [dict(edge) for edge in edges],
+        )
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from flask import g
+from marshmallow import Schema, fields, validate
+
+from unweaver.candidates import snap_points
+from unweaver.constants import MAX_TRIP_STOPS
+from unweaver.exceptions import NoPathError
+from unweaver.graph_types import CostFunction
+from unweaver.geojson import Feature, Point, makePointFeature
+from unweaver.graphs import DiGraphGPKGView
+from unweaver.shortest_paths.shortest_path import Leg, join_legs
+from unweaver.shortest_paths.trip import trip
+from .base_view import BaseView, Waypoint
+
+Coordinates = fields.List(fields.Float(), validate=validate.Length(equal=2))
+
+
+class TripSchema(Schema):
+    stops = fields.List(
+        Coordinates,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_TRIP_STOPS),
+    )
+    roundtrip = fields.Boolean()
+
+
+class TripView(BaseView):
+    view_name = "trip"
+    schema = TripSchema
+
+    waypoint_args = ("stops",)
+    # Too many points for a query string
+    methods = ("POST",)
+    args_location = "json"
+    uses_hierarchy = True
+
+    def snap_waypoints(
+        self, arguments: Dict, cost_function: CostFunction
+    ) -> Optional[List[Waypoint]]:
+        # Every stop may be both arrived at and left
+        nodes = snap_points(
+            g.G,
+            [(lon, lat) for lon, lat in arguments["stops"]],
+            edge_filter=cost_function,
+            context="both",
+        )
+
+        checked_nodes: List[Waypoint] = []
+        for node in nodes:
+            if node is None:
+                return None
+            checked_nodes.append(node)
+
+        return checked_nodes
+
+    def run_analysis(
+        self,
+        arguments: Dict,
+        cost_function: CostFunction,
+        waypoints: List[Waypoint],
+    ) -> Union[Tuple[str], Tuple[str, List[int], float, List[Leg]]]:
+        hierarchy = None
+        if (
+            self.profile.get("precalculate", False)
+            and self.precalculated_cost_function is not None
+        ):
+            cost_fun = self.precalculated_cost_function
+            hierarchy = self.hierarchy
+        else:
+            cost_fun = cost_function
+
+        try:
+            order, legs = trip(
+                g.G,
+                waypoints,
+                cost_fun,
+                roundtrip=arguments.get("roundtrip", True),
+                min_cost_per_meter=self.profile.get("min_cost_per_meter"),
+                hierarchy=hierarchy,
+            )
+        except NoPathError:
+            return ("NoPath",)
+
+        cost = join_legs(legs)[0] if legs else 0.0
+
+        return ("Ok", order, cost, legs)
+
+    def prepare_result(
+        self,
+        arguments: Dict,
+        waypoints: List[Waypoint],
+        analysis: Tuple[str, List[int], float, List[Leg]],
+    ) -> Tuple[
+        str,
+        DiGraphGPKGView,
+        List[Feature[Point]],
+        List[int],
+        float,
+        List[Leg],
+    ]:
+        status, order, cost, legs = analysis
+
+        stops = [makePointFeature(*point) for point in arguments["stops"]]
+
+        # Copies: the analysis may be cached and interpretation functions may
+        # modify edges
+        return (
+            status,
+            g.G,
+            stops,
+            list(order),
+            cost,
+            [
+                (leg_cost, list(path), [dict(edge) for edge in edges])
+                for leg_cost, path, edges in legs
+            ],
+        )
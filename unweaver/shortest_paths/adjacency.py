@@ -0,0 +1,224 @@
+"""Neighbor lookups for unweaver's native graph searches."""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union, cast
+
+from unweaver.graph_types import EdgeData, EdgeTuple
+from unweaver.graphs import (
+    AugmentedDiGraphGPKGView,
+    DiGraphCSRView,
+    DiGraphGPKGView,
+)
+
+# Number of nodes whose neighbors are fetched from the database at once
+PREFETCH_SIZE = 256
+
+Coordinates = Tuple[float, float]
+Neighbors = List[Tuple[str, EdgeData]]
+
+
+class SearchAdjacency:
+    """Successor and predecessor lookups over a graph plus an optional overlay
+    of temporary edges (e.g. the half-edges of a ProjectedNode), without going
+    through the networkx dict-of-dicts interface.
+
+    Neighbor lists are cached for the lifetime of the instance. For
+    GeoPackage-backed graphs, a cache miss fetches the neighbors of the
+    requested node and of up to PREFETCH_SIZE - 1 other nodes that the search
+    has hinted it will likely expand next (usually its frontier) in a single
+    query. In-memory (CSR) graphs are read directly from their arrays.
+
+    :param G: The graph to search. An AugmentedDiGraphGPKGView contributes its
+              overlay edges as well.
+    :param overlay_edges: Temporary edges to add. Where an overlay edge and a
+                          graph edge share (u, v), the overlay edge is used.
+    :param prefetch_size: Maximum number of nodes to fetch at once.
+
+    """
+
+    def __init__(
+        self,
+        G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+        overlay_edges: Optional[Iterable[EdgeTuple]] = None,
+        prefetch_size: int = PREFETCH_SIZE,
+    ):
+        self.overlay_succ: Dict[str, Dict[str, EdgeData]] = defaultdict(dict)
+        self.overlay_pred: Dict[str, Dict[str, EdgeData]] = defaultdict(dict)
+        self._coordinates: Dict[str, Optional[Coordinates]] = {}
+        self._geom_column = G.network.edges.geom_column
+
+        if isinstance(G, AugmentedDiGraphGPKGView):
+            for u, neighbors in G.overlay._succ.items():
+                for v, d in neighbors.items():
+                    self._add_overlay_edge(u, v, d)
+            G = G.base_graph
+
+        if overlay_edges is not None:
+            for u, v, d in overlay_edges:
+                self._add_overlay_edge(u, v, d)
+
+        self.G = G
+        # In-memory graphs gain nothing from batching: read them directly
+        self.batched = not isinstance(G, DiGraphCSRView)
+
+        self.prefetch_size = prefetch_size
+
+        self._succ: Dict[str, Neighbors] = {}
+        self._pred: Dict[str, Neighbors] = {}
+        self._succ_hints: Set[str] = set()
+        self._pred_hints: Set[str] = set()
+        self._coordinates_hints: Set[str] = set()
+
+    def _add_overlay_edge(self, u: str, v: str, d: EdgeData) -> None:
+        self.overlay_succ[u][v] = d
+        self.overlay_pred[v][u] = d
+        # Temporary nodes are not in the nodes table: take their coordinates
+        # from the ends of their edges.
+        geometry = d.get(self._geom_column)
+        if geometry is not None:
+            lon, lat = geometry["coordinates"][0][:2]
+            self._coordinates.setdefault(u, (lon, lat))
+            lon, lat = geometry["coordinates"][-1][:2]
+            self._coordinates.setdefault(v, (lon, lat))
+
+    def hint_successors(self, n: str) -> None:
+        """Signal that the successors of a node will likely be requested.
+
+        :param n: The node ID.
+
+        """
+        if n not in self._succ:
+            self._succ_hints.add(n)
+
+    def hint_predecessors(self, n: str) -> None:
+        """Signal that the predecessors of a node will likely be requested.
+
+        :param n: The node ID.
+
+        """
+        if n not in self._pred:
+            self._pred_hints.add(n)
+
+    def hint_coordinates(self, n: str) -> None:
+        """Signal that the coordinates of a node will likely be requested.
+
+        :param n: The node ID.
+
+        """
+        if n not in self._coordinates:
+            self._coordinates_hints.add(n)
+
+    def coordinates(self, n: str) -> Optional[Coordinates]:
+        """Get the (lon, lat) coordinates of a node.
+
+        :param n: The node ID.
+        :returns: The coordinates, or None if the node has no geometry.
+
+        """
+        if n not in self._coordinates:
+            hints = self._coordinates_hints
+            hints.discard(n)
+            nbunch = [n]
+            if self.batched:
+                while hints and len(nbunch) < self.prefetch_size:
+                    hinted = hints.pop()
+                    if hinted not in self._coordinates:
+                        nbunch.append(hinted)
+            self._coordinates.update(self._fetch_coordinates(nbunch))
+        return self._coordinates[n]
+
+    def successors(self, n: str) -> Neighbors:
+        """Get the (successor, edge data) pairs of a node.
+
+        :param n: The node ID.
+
+        """
+        if n not in self._succ:
+            self._fetch(n, self._succ, self._succ_hints, self.overlay_succ)
+        return self._succ[n]
+
+    def predecessors(self, n: str) -> Neighbors:
+        """Get the (predecessor, edge data) pairs of a node.
+
+        :param n: The node ID.
+
+        """
+        if n not in self._pred:
+            self._fetch(n, self._pred, self._pred_hints, self.overlay_pred)
+        return self._pred[n]
+
+    def _fetch(
+        self,
+        n: str,
+        cache: Dict[str, Neighbors],
+        hints: Set[str],
+        overlay: Dict[str, Dict[str, EdgeData]],
+    ) -> None:
+        forward = cache is self._succ
+        hints.discard(n)
+        nbunch = [n]
+        if self.batched:
+            while hints and len(nbunch) < self.prefetch_size:
+                hinted = hints.pop()
+                if hinted not in cache:
+                    nbunch.append(hinted)
+
+        fetched = self._fetch_base(nbunch, forward)
+        for m in nbunch:
+            neighbors = fetched.get(m, [])
+            if m in overlay:
+                merged: Dict[str, EdgeData] = dict(neighbors)
+                merged.update(overlay[m])
+                neighbors = list(merged.items())
+            cache[m] = neighbors
+
+    def _fetch_base(
+        self, nbunch: List[str], forward: bool
+    ) -> Dict[str, Neighbors]:
+        if not self.batched:
+            # CSR edge views are read-only mappings rather than dicts
+            outer = self.G._succ if forward else self.G._pred
+            return {
+                n: cast(Neighbors, list(outer[n].items()))
+                for n in nbunch
+                if n in outer
+            }
+
+        edges = self.G.network.edges
+        fetch_bunch = (
+            edges.successors_bunch if forward else edges.predecessors_bunch
+        )
+        cache = self.G.network.cache
+        if cache is None:
+            return fetch_bunch(nbunch)
+
+        # Rows shared across searches (e.g. requests) by a read-only graph
+        key = "successors_bunch" if forward else "predecessors_bunch"
+        fetched: Dict[str, Neighbors] = {}
+        missing = []
+        for n in nbunch:
+            neighbors = cache.get((key, n))
+            if neighbors is None:
+                missing.append(n)
+            else:
+                fetched[n] = neighbors
+        if missing:
+            for n, neighbors in fetch_bunch(missing).items():
+                cache.put((key, n), neighbors)
+                fetched[n] = neighbors
+        return fetched
+
+    def _fetch_coordinates(
+        self, nbunch: List[str]
+    ) -> Dict[str, Optional[Coordinates]]:
+        fetched: Dict[str, Optional[Coordinates]]
+        if isinstance(self.G, DiGraphCSRView):
+            csr = self.G.csr
+            fetched = {
+                n: csr.node_coordinates(csr.node_index[n])
+                for n in nbunch
+                if n in csr.node_index
+            }
+        else:
+            nodes = self.G.network.nodes
+            fetched = dict(nodes.get_coordinates_bunch(nbunch))
+        return {n: fetched.get(n) for n in nbunch}
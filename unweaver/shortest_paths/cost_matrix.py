@@ -0,0 +1,209 @@
+"""Find the costs of the shortest paths between many origins and many
+destinations at once."""
+from heapq import heappop, heappush
+from itertools import count
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from unweaver.candidates import overlay_edges, snap_points
+from unweaver.constants import DWITHIN
+from unweaver.contraction import ContractionHierarchy
+from unweaver.graph import ProjectedNode
+from unweaver.graph_types import CostFunction
+from unweaver.graphs import DiGraphGPKGView
+from .adjacency import SearchAdjacency
+from .shortest_path import Waypoints, cache_costs, overlay_paths
+
+Matrix = List[List[Optional[float]]]
+
+
+def matrix_nodes(
+    G: DiGraphGPKGView,
+    origins: Waypoints,
+    destinations: Waypoints,
+    cost_function: CostFunction,
+    dwithin: float = DWITHIN,
+) -> Tuple[List[Optional[ProjectedNode]], List[Optional[ProjectedNode]]]:
+    """Snap the origins and destinations of a cost matrix to the graph. Each
+    point is snapped once and gets its own temporary node ID, so that every
+    one of them can share a single search overlay.
+
+    :param G: The routing graph.
+    :param origins: The origin points.
+    :param destinations: The destination points.
+    :param cost_function: A networkx-compatible cost function, used to skip
+                          candidates that cannot be left (origins) or reached
+                          (destinations).
+    :param dwithin: The distance in meters within which to search for edges.
+    :returns: The origin and destination nodes, each None if the point could
+              not be snapped.
+
+    """
+    origin_nodes = snap_points(
+        G, _coords(origins), dwithin=dwithin, edge_filter=cost_function
+    )
+    destination_nodes = snap_points(
+        G,
+        _coords(destinations),
+        dwithin=dwithin,
+        edge_filter=cost_function,
+        context="destination",
+        first_id=len(origins) + 1,
+    )
+    return origin_nodes, destination_nodes
+
+
+def _coords(points: Waypoints) -> List[Tuple[float, float]]:
+    return [
+        (lon, lat) for lon, lat in (p.geometry.coordinates for p in points)
+    ]
+
+
+def cost_matrix(
+    G: DiGraphGPKGView,
+    origins: Sequence[Union[str, ProjectedNode]],
+    destinations: Sequence[Union[str, ProjectedNode]],
+    cost_function: CostFunction,
+    max_cost: Optional[float] = None,
+    hierarchy: Optional[ContractionHierarchy] = None,
+) -> Matrix:
+    """Find the cost of the shortest path from every origin to every
+    destination.
+
+    Without a hierarchy, one Dijkstra search is run per origin, stopping once
+    every destination (or max_cost) has been reached. All of the searches
+    share their neighbor lookups and the cost function is evaluated at most
+    once per edge. With a hierarchy, a bucket-based many-to-many search is
+    used instead.
+
+    :param G: The routing graph.
+    :param origins: The origin nodes: on-graph node IDs or ProjectedNodes
+                    with distinct IDs (e.g. from `matrix_nodes`).
+    :param destinations: The destination nodes.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :param max_cost: Costs greater than this are not searched for.
+    :param hierarchy: A contraction hierarchy built from the same (static)
+                      costs as the cost function.
+    :returns: A list of rows, one per origin, of the costs to each
+              destination. Destinations that cannot be reached are None.
+
+    """
+    adjacency = SearchAdjacency(
+        G, overlay_edges=overlay_edges(G, [*origins, *destinations])
+    )
+
+    origin_ids = [_node_id(node) for node in origins]
+    destination_ids = [_node_id(node) for node in destinations]
+    cached_cost_function = cache_costs(cost_function)
+
+    if hierarchy is not None:
+        return _hierarchy_matrix(
+            hierarchy,
+            adjacency,
+            origin_ids,
+            destination_ids,
+            cached_cost_function,
+            max_cost,
+        )
+
+    return [
+        _one_to_many(
+            adjacency, origin, destination_ids, cached_cost_function, max_cost
+        )
+        for origin in origin_ids
+    ]
+
+
+def _node_id(node: Union[str, ProjectedNode]) -> str:
+    return node.n if isinstance(node, ProjectedNode) else node
+
+
+def _one_to_many(
+    adjacency: SearchAdjacency,
+    source: str,
+    targets: List[str],
+    cost_function: CostFunction,
+    max_cost: Optional[float],
+) -> List[Optional[float]]:
+    remaining: Set[str] = set(targets)
+    dist: Dict[str, float] = {}
+    seen: Dict[str, float] = {source: 0}
+    c = count()
+    heap: List[Tuple[float, int, str]] = [(0, next(c), source)]
+    while heap and remaining:
+        d, _, u = heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        remaining.discard(u)
+        for v, edge in adjacency.successors(u):
+            if v in dist:
+                continue
+            cost = cost_function(u, v, edge)
+            if cost is None:
+                continue
+            vd = d + cost
+            if max_cost is not None and vd > max_cost:
+                continue
+            if v not in seen or vd < seen[v]:
+                seen[v] = vd
+                heappush(heap, (vd, next(c), v))
+                adjacency.hint_successors(v)
+
+    return [dist.get(target) for target in targets]
+
+
+def _hierarchy_matrix(
+    hierarchy: ContractionHierarchy,
+    adjacency: SearchAdjacency,
+    origins: List[str],
+    destinations: List[str],
+    cost_function: CostFunction,
+    max_cost: Optional[float],
+) -> Matrix:
+    # Temporary nodes are not in the hierarchy: start (or end) at the
+    # on-graph nodes reached through the overlay's edges instead.
+    forward = [
+        overlay_paths(hierarchy, adjacency, n, cost_function, True)
+        for n in origins
+    ]
+    backward = [
+        overlay_paths(hierarchy, adjacency, n, cost_function, False)
+        for n in destinations
+    ]
+    sources = [
+        {n: cost for n, (cost, _, _) in paths.items() if n in hierarchy}
+        for paths in forward
+    ]
+    targets = [
+        {n: cost for n, (cost, _, _) in paths.items() if n in hierarchy}
+        for paths in backward
+    ]
+
+    matrix = hierarchy.many_to_many(sources, targets)
+
+    # Paths through temporary nodes only, e.g. along the same edge
+    for row, paths in zip(matrix, forward):
+        for j, n in enumerate(destinations):
+            if n in paths and n not in hierarchy:
+                direct = paths[n][0]
+                current = row[j]
+                if current is None or direct < current:
+                    row[j] = direct
+
+    if max_cost is not None:
+        for row in matrix:
+            for j, cost in enumerate(row):
+                if cost is not None and cost > max_cost:
+                    row[j] = None
+
+    return matrix
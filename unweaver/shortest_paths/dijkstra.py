@@ -0,0 +1,331 @@
+"""Point-to-point shortest path searches that run directly against unweaver
+graphs rather than through networkx."""
+from heapq import heappop, heappush
+from itertools import count
+from typing import Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+from unweaver.exceptions import NoPathError
+from unweaver.graph_types import CostFunction, EdgeData
+from unweaver.graphs import AugmentedDiGraphGPKGView, DiGraphGPKGView
+from unweaver.utils import haversine
+from .adjacency import SearchAdjacency
+
+
+Graph = Union[AugmentedDiGraphGPKGView, DiGraphGPKGView, SearchAdjacency]
+Heuristic = Callable[[str], float]
+Parents = Dict[str, Tuple[str, EdgeData]]
+
+
+def _as_adjacency(G: Graph) -> SearchAdjacency:
+    if isinstance(G, SearchAdjacency):
+        return G
+    return SearchAdjacency(G)
+
+
+def _walk(parents: Parents, n: str) -> Tuple[List[str], List[EdgeData]]:
+    # Follow parent pointers from n back to the search's source.
+    path = [n]
+    edges = []
+    while n in parents:
+        n, d = parents[n]
+        path.append(n)
+        edges.append(dict(d))
+    return path, edges
+
+
+def dijkstra(
+    G: Graph, source: str, target: str, cost_function: CostFunction
+) -> Tuple[float, List[str], List[EdgeData]]:
+    """Find the shortest path between two nodes using Dijkstra's algorithm
+    with a binary heap.
+
+    :param G: The graph to search. Either an unweaver graph view or a
+              SearchAdjacency, which can be reused across several searches
+              to share its cached neighbor data.
+    :param source: The start node ID.
+    :param target: The end node ID.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :returns: The path's cost, its node IDs, and its edges' data.
+
+    """
+    adjacency = _as_adjacency(G)
+
+    dist: Dict[str, float] = {}
+    seen: Dict[str, float] = {source: 0}
+    parents: Parents = {}
+    c = count()
+    heap: List[Tuple[float, int, str]] = [(0, next(c), source)]
+    while heap:
+        d, _, u = heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        if u == target:
+            path, edges = _walk(parents, u)
+            path.reverse()
+            edges.reverse()
+            return d, path, edges
+        for v, edge in adjacency.successors(u):
+            if v in dist:
+                continue
+            cost = cost_function(u, v, edge)
+            if cost is None:
+                continue
+            vd = d + cost
+            if v not in seen or vd < seen[v]:
+                seen[v] = vd
+                parents[v] = (u, edge)
+                heappush(heap, (vd, next(c), v))
+                adjacency.hint_successors(v)
+
+    raise NoPathError("No viable path found.")
+
+
+def haversine_heuristic(
+    adjacency: SearchAdjacency, target: str, cost_per_meter: float
+) -> Heuristic:
+    """Create an A* heuristic that estimates the remaining cost to a target
+    as the great-circle distance to it times a cost per meter. The heuristic
+    is admissible if no path costs less than `cost_per_meter` times its
+    length, e.g. a cost per meter of 1 for distance-based cost functions.
+
+    Nodes without coordinates get an estimate of 0.
+
+    :param adjacency: The SearchAdjacency used for the search, which provides
+                      node coordinates.
+    :param target: The target node ID.
+    :param cost_per_meter: A lower bound on the cost of traveling one meter.
+
+    """
+    target_coordinates = adjacency.coordinates(target)
+
+    def heuristic(n: str) -> float:
+        if target_coordinates is None:
+            return 0
+        coordinates = adjacency.coordinates(n)
+        if coordinates is None:
+            return 0
+        return cost_per_meter * haversine([coordinates, target_coordinates])
+
+    return heuristic
+
+
+def astar(
+    G: Graph,
+    source: str,
+    target: str,
+    cost_function: CostFunction,
+    heuristic: Optional[Heuristic] = None,
+    cost_per_meter: Optional[float] = None,
+) -> Tuple[float, List[str], List[EdgeData]]:
+    """Find the shortest path between two nodes using the A* algorithm.
+
+    :param G: The graph to search. Either an unweaver graph view or a
+              SearchAdjacency, which can be reused across several searches
+              to share its cached neighbor data.
+    :param source: The start node ID.
+    :param target: The end node ID.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :param heuristic: A function estimating the remaining cost from a node to
+                      the target. Must never overestimate it.
+    :param cost_per_meter: If no heuristic is given, use a haversine_heuristic
+                           with this cost per meter.
+    :returns: The path's cost, its node IDs, and its edges' data.
+
+    """
+    adjacency = _as_adjacency(G)
+    if heuristic is None:
+        if cost_per_meter is None:
+            raise ValueError("heuristic or cost_per_meter must be set")
+        heuristic = haversine_heuristic(adjacency, target, cost_per_meter)
+
+    dist: Dict[str, float] = {}
+    seen: Dict[str, float] = {source: 0}
+    parents: Parents = {}
+    c = count()
+    heap: List[Tuple[float, int, float, str]] = [
+        (heuristic(source), next(c), 0, source)
+    ]
+    while heap:
+        _, _, d, u = heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        if u == target:
+            path, edges = _walk(parents, u)
+            path.reverse()
+            edges.reverse()
+            return d, path, edges
+
+        neighbors = adjacency.successors(u)
+        for v, _ in neighbors:
+            adjacency.hint_coordinates(v)
+        for v, edge in neighbors:
+            if v in dist:
+                continue
+            cost = cost_function(u, v, edge)
+            if cost is None:
+                continue
+            vd = d + cost
+            if v not in seen or vd < seen[v]:
+                seen[v] = vd
+                parents[v] = (u, edge)
+                heappush(heap, (vd + heuristic(v), next(c), vd, v))
+                adjacency.hint_successors(v)
+
+    raise NoPathError("No viable path found.")
+
+
+def bidirectional_dijkstra(
+    G: Graph, source: str, target: str, cost_function: CostFunction
+) -> Tuple[float, List[str], List[EdgeData]]:
+    """Find the shortest path between two nodes using a bidirectional
+    Dijkstra search: a forward search from the source and a backward search
+    from the target are alternated until they meet.
+
+    :param G: The graph to search. Either an unweaver graph view or a
+              SearchAdjacency, which can be reused across several searches
+              to share its cached neighbor data.
+    :param source: The start node ID.
+    :param target: The end node ID.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :returns: The path's cost, its node IDs, and its edges' data.
+
+    """
+    if source == target:
+        return 0, [source], []
+
+    adjacency = _as_adjacency(G)
+
+    # Index 0 is the forward search, index 1 the backward search.
+    dists: Tuple[Dict[str, float], Dict[str, float]] = ({}, {})
+    seens: Tuple[Dict[str, float], Dict[str, float]] = (
+        {source: 0},
+        {target: 0},
+    )
+    parents: Tuple[Parents, Parents] = ({}, {})
+    c = count()
+    fringes: Tuple[List[Tuple[float, int, str]], ...] = (
+        [(0, next(c), source)],
+        [(0, next(c), target)],
+    )
+    neighbors = (adjacency.successors, adjacency.predecessors)
+    hints = (adjacency.hint_successors, adjacency.hint_predecessors)
+
+    best: Optional[float] = None
+    meeting: Optional[str] = None
+    direction = 1
+    while fringes[0] and fringes[1]:
+        direction = 1 - direction
+        dist = dists[direction]
+        seen = seens[direction]
+        fringe = fringes[direction]
+
+        d, _, u = heappop(fringe)
+        if u in dist:
+            continue
+        dist[u] = d
+        if u in dists[1 - direction]:
+            # Settled by both searches: no shorter path can be found.
+            break
+
+        for v, edge in neighbors[direction](u):
+            if v in dist:
+                continue
+            if direction == 0:
+                cost = cost_function(u, v, edge)
+            else:
+                cost = cost_function(v, u, edge)
+            if cost is None:
+                continue
+            vd = d + cost
+            if v not in seen or vd < seen[v]:
+                seen[v] = vd
+                parents[direction][v] = (u, edge)
+                heappush(fringe, (vd, next(c), v))
+                hints[direction](v)
+                if v in seens[1 - direction]:
+                    total = vd + seens[1 - direction][v]
+                    if best is None or total < best:
+                        best = total
+                        meeting = v
+
+    if best is None or meeting is None:
+        raise NoPathError("No viable path found.")
+
+    path, edges = _walk(parents[0], meeting)
+    path.reverse()
+    edges.reverse()
+    backward_path, backward_edges = _walk(parents[1], meeting)
+
+    return best, path + backward_path[1:], edges + backward_edges
+
+
+def multi_source_dijkstra(
+    G: Graph,
+    sources: Mapping[str, float],
+    cost_function: CostFunction,
+    max_cost: Optional[float] = None,
+) -> Tuple[Dict[str, float], Dict[str, List[str]], Dict[str, str]]:
+    """Find the shortest paths from the nearest of many sources to every
+    node within a maximum cost, in a single Dijkstra search. Each source
+    starts with its own initial cost (e.g. a wait at a bus stop), so the
+    nearest source of a node is the one with the least total cost to it.
+
+    :param G: The graph to search. Either an unweaver graph view or a
+              SearchAdjacency.
+    :param sources: The initial cost of every source node ID.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :param max_cost: Nodes with greater (total) costs are not searched for.
+    :returns: The cost of every reached node, the path to it from its
+              nearest source (as in networkx's multi_source_dijkstra), and
+              its nearest source.
+
+    """
+    adjacency = _as_adjacency(G)
+
+    dist: Dict[str, float] = {}
+    seen: Dict[str, float] = {}
+    paths: Dict[str, List[str]] = {}
+    origins: Dict[str, str] = {}
+    c = count()
+    heap: List[Tuple[float, int, str]] = []
+    for source, initial_cost in sources.items():
+        if max_cost is not None and initial_cost > max_cost:
+            continue
+        seen[source] = initial_cost
+        paths[source] = [source]
+        origins[source] = source
+        heappush(heap, (initial_cost, next(c), source))
+        adjacency.hint_successors(source)
+
+    while heap:
+        d, _, u = heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        for v, edge in adjacency.successors(u):
+            if v in dist:
+                continue
+            cost = cost_function(u, v, edge)
+            if cost is None:
+                continue
+            vd = d + cost
+            if max_cost is not None and vd > max_cost:
+                continue
+            if v not in seen or vd < seen[v]:
+                seen[v] = vd
+                paths[v] = paths[u] + [v]
+                origins[v] = origins[u]
+                heappush(heap, (vd, next(c), v))
+                adjacency.hint_successors(v)
+
+    return dist, {n: paths[n] for n in dist}, {n: origins[n] for n in dist}
@@ -0,0 +1,125 @@
+"""Polygons of the areas reachable within given costs."""
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from shapely.affinity import affine_transform  # type: ignore
+from shapely.geometry import MultiLineString, mapping  # type: ignore
+
+from unweaver.constants import ISOCHRONE_BUFFER, ISOCHRONE_TOLERANCE
+from unweaver.geo import meters_per_degree
+from unweaver.graph_types import CostFunction, EdgeData
+from unweaver.graphs import AugmentedDiGraphGPKGView, DiGraphGPKGView
+from .shortest_path_tree import ReachedNode
+
+Coordinates = List[Tuple[float, float]]
+
+
+def isochrones(
+    G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+    nodes: Dict[str, ReachedNode],
+    edges: Iterable[EdgeData],
+    cost_function: CostFunction,
+    costs: Sequence[float],
+    buffer: float = ISOCHRONE_BUFFER,
+    tolerance: float = ISOCHRONE_TOLERANCE,
+) -> List[Optional[dict]]:
+    """Find the polygons of the areas reachable within each of several costs
+    (cost bands), from the output of `reachable_tree` (or
+    `reachable_tree_multi`) for the greatest of the costs.
+
+    Every reachable edge is cut where it reaches each cost, assuming costs
+    grow evenly along the edge, and the cut edges of each cost are buffered
+    into a single polygon. Polygons are cumulative: each one contains those
+    of lesser costs.
+
+    :param G: Network graph.
+    :param nodes: The reached nodes of a reachable tree.
+    :param edges: The reachable edges of the tree.
+    :param cost_function: The cost function with which the tree's fringe
+                          edges were cut, e.g. the cost_function given to
+                          `reachable_tree`.
+    :param costs: The costs (no greater than the tree's maximum cost) of
+                  which to find polygons.
+    :param buffer: The distance (meters) around the edges to include.
+    :param tolerance: The tolerance (meters) with which to simplify the
+                      polygons. 0 to keep every vertex.
+    :returns: A GeoJSON-like Polygon or MultiPolygon for every cost, in the
+              same order, or None where nothing is reachable.
+
+    """
+    geom_column = G.network.edges.geom_column
+    # Each edge's coordinates and costs at its ends
+    reached: List[Tuple[Coordinates, float, float]] = []
+    for edge in edges:
+        start = nodes.get(edge["_u"])
+        if start is None:
+            continue
+        cost = cost_function(edge["_u"], edge["_v"], edge)
+        if cost is None:
+            continue
+        reached.append(
+            (edge[geom_column]["coordinates"], start.cost, start.cost + cost)
+        )
+    if not reached:
+        return [None for _ in costs]
+
+    # Buffer in a local frame in meters, as for snapping
+    lon0, lat0 = reached[0][0][0][:2]
+    mx, my = meters_per_degree(lat0)
+
+    polygons: List[Optional[dict]] = []
+    for max_cost in costs:
+        lines = []
+        for coordinates, start_cost, end_cost in reached:
+            if start_cost > max_cost:
+                continue
+            projected = [
+                ((x - lon0) * mx, (y - lat0) * my) for x, y, *_ in coordinates
+            ]
+            if end_cost > max_cost:
+                fraction = (max_cost - start_cost) / (end_cost - start_cost)
+                projected = _head(projected, fraction)
+            lines.append(projected)
+
+        if not lines:
+            polygons.append(None)
+            continue
+
+        polygon = MultiLineString(lines).buffer(buffer)
+        if tolerance > 0:
+            polygon = polygon.simplify(tolerance)
+        polygon = affine_transform(polygon, [1 / mx, 0, 0, 1 / my, lon0, lat0])
+        polygons.append(mapping(polygon))
+
+    return polygons
+
+
+def reachable_costs(max_cost: float, bands: int) -> List[float]:
+    """Evenly spaced costs up to a maximum, e.g. for isochrones of 100, 200,
+    300 and 400 meters.
+
+    :param max_cost: The greatest cost.
+    :param bands: The number of costs.
+
+    """
+    return [max_cost * (i + 1) / bands for i in range(bands)]
+
+
+def _head(coordinates: Coordinates, fraction: float) -> Coordinates:
+    # The part of a line from its start to a fraction of its length
+    lengths = [
+        math.hypot(x2 - x1, y2 - y1)
+        for (x1, y1), (x2, y2) in zip(coordinates, coordinates[1:])
+    ]
+    remaining = fraction * sum(lengths)
+    head = [coordinates[0]]
+    for (x1, y1), (x2, y2), length in zip(
+        coordinates, coordinates[1:], lengths
+    ):
+        if length >= remaining:
+            t = remaining / length if length else 0.0
+            head.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1)))
+            return head
+        head.append((x2, y2))
+        remaining -= length
+    return head
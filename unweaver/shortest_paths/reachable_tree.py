@@ -1,5 +1,14 @@
 from dataclasses import asdict
-from typing import Dict, List, Optional, Tuple, TypedDict, Union
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 from shapely.geometry import mapping, shape  # type: ignore
 
@@ -9,7 +18,14 @@ from unweaver.graph import ProjectedNode, makeNodeID
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.graphs import AugmentedDiGraphGPKGView, DiGraphGPKGView
 from unweaver.utils import haversine
-from .shortest_path_tree import shortest_path_tree, BaseNode, ReachedNode
+from .shortest_path_tree import (
+    shortest_path_tree,
+    shortest_path_tree_multi,
+    BaseNode,
+    Origins,
+    Paths,
+    ReachedNode,
+)
 
 
 class FringeCandidate(TypedDict):
@@ -49,6 +65,69 @@ def reachable_tree(
             G, candidate.n, precalculated_cost_function, max_cost
         )
 
+    nodes, edges = _extend(G, nodes, paths, edges, cost_function, max_cost)
+
+    return nodes, edges
+
+
+def reachable_tree_multi(
+    G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+    candidates: Sequence[ProjectedNode],
+    cost_function: CostFunction,
+    max_cost: float,
+    initial_costs: Optional[Sequence[float]] = None,
+    precalculated_cost_function: Optional[CostFunction] = None,
+) -> Tuple[Dict[str, ReachedNode], List[EdgeData], Origins]:
+    """Generate all places on graph reachable from any of many start points
+    in a single search, as `reachable_tree` does for one (e.g. "everything
+    within 400 meters of any bus stop").
+
+    :param G: Network graph, with the temporary edges of every candidate
+              (e.g. `AugmentedDiGraphGPKGView.from_edges` with
+              `overlay_edges`).
+    :param candidates: On-graph candidate metadata as created by
+                       waypoint_candidates, with distinct node IDs.
+    :param cost_function: NetworkX-compatible weight function.
+    :param max_cost: Maximum weight (including initial costs) to reach in
+                     the tree.
+    :param initial_costs: The cost already incurred at each candidate, e.g.
+                          a wait at a bus stop. Defaults to 0 for all.
+    :param precalculated_cost_function: NetworkX-compatible weight function
+                                        that represents precalculated weights.
+    :returns: The reached nodes, the reachable edges, and the ID of the
+              nearest candidate of every reached node (including new fake
+              nodes at the ends).
+
+    """
+    if initial_costs is None:
+        initial_costs = [0.0 for _ in candidates]
+    sources: Dict[str, float] = {}
+    for candidate, initial_cost in zip(candidates, initial_costs):
+        if candidate.n not in sources or initial_cost < sources[candidate.n]:
+            sources[candidate.n] = initial_cost
+
+    if precalculated_cost_function is None:
+        precalculated_cost_function = cost_function
+    nodes, paths, edges, origins = shortest_path_tree_multi(
+        G, sources, precalculated_cost_function, max_cost
+    )
+
+    nodes, edges = _extend(
+        G, nodes, paths, edges, cost_function, max_cost, origins
+    )
+
+    return nodes, edges, origins
+
+
+def _extend(
+    G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+    nodes: Dict[str, ReachedNode],
+    paths: Paths,
+    edges: Iterable[EdgeData],
+    cost_function: CostFunction,
+    max_cost: float,
+    origins: Optional[Origins] = None,
+) -> Tuple[Dict[str, ReachedNode], List[EdgeData]]:
     # The shortest-path tree already contains all on-graph nodes within
     # max_cost distance. The only edges we need to add to make it the full,
     # extended, 'reachable' graph are:
@@ -69,7 +148,7 @@ def reachable_tree(
     else:
         neighbor_func = G.neighbors
 
-    fringe_candidates = {}
+    untraveled_edges = []
     for u in traveled_nodes:
         if u not in G:
             # For some reason, this only happens to the in-memory graph: the
@@ -82,41 +161,42 @@ def reachable_tree(
             if (u, v) in traveled_edges:
                 continue
             traveled_edges.add((u, v))
+            untraveled_edges.append((u, v))
 
-            # Determine cost of traversal
-            edge_data = G[u][v]
-            edge_data = dict(edge_data)
-            # FIXME:  this value is incorrect for precalculated weights. Need
-            # to maintain precalculated and non-precalculated versions of the
-            # cost function and apply the non-precalculated for these
-            # situations.
-            cost = cost_function(u, v, edge_data)
-
-            # Exclude non-traversible edges
-            if cost is None:
-                continue
+    fringe_candidates = {}
+    for u, v, edge_data in G.edges_bunch(untraveled_edges):
+        # Determine cost of traversal
+        # FIXME:  this value is incorrect for precalculated weights. Need
+        # to maintain precalculated and non-precalculated versions of the
+        # cost function and apply the non-precalculated for these
+        # situations.
+        cost = cost_function(u, v, edge_data)
+
+        # Exclude non-traversible edges
+        if cost is None:
+            continue
 
-            # If the total cost is still less than max_cost, we will have
-            # traveled the whole edge - there is no new "pseudo" node, only a
-            # new edge.
-            if v in nodes and nodes[v].cost + cost < max_cost:
-                interpolate_proportion = 1.0
-            else:
-                remaining = max_cost - nodes[u].cost
-                interpolate_proportion = remaining / cost
+        # If the total cost is still less than max_cost, we will have
+        # traveled the whole edge - there is no new "pseudo" node, only a
+        # new edge.
+        if v in nodes and nodes[v].cost + cost < max_cost:
+            interpolate_proportion = 1.0
+        else:
+            remaining = max_cost - nodes[u].cost
+            interpolate_proportion = remaining / cost
 
-            # TODO: Use consistent data classes for passing around edge data,
-            # leave (de)serialization concerns up to near-db interfaces
-            edge_data["_u"] = u
-            edge_data["_v"] = v
+        # TODO: Use consistent data classes for passing around edge data,
+        # leave (de)serialization concerns up to near-db interfaces
+        edge_data["_u"] = u
+        edge_data["_v"] = v
 
-            fringe_candidate: FringeCandidate = {
-                "cost": cost,
-                "edge_data": edge_data,
-                "proportion": interpolate_proportion,
-            }
+        fringe_candidate: FringeCandidate = {
+            "cost": cost,
+            "edge_data": edge_data,
+            "proportion": interpolate_proportion,
+        }
 
-            fringe_candidates[(u, v)] = fringe_candidate
+        fringe_candidates[(u, v)] = fringe_candidate
 
     fringe_edges = []
     seen = set()
@@ -167,6 +247,8 @@ def reachable_tree(
         nodes[fringe_node_id] = ReachedNode(
             key=fringe_node.key, geom=fringe_node.geom, cost=max_cost
         )
+        if origins is not None:
+            origins[fringe_node_id] = origins[edge_id[0]]
 
         seen.add(edge_id)
 
@@ -1,8 +1,9 @@
 """Find the on-graph shortest path between two geolocated points."""
+from heapq import heappop, heappush
+from itertools import count
 from typing import (
     Any,
     Dict,
-    Iterable,
     List,
     Literal,
     Optional,
@@ -11,67 +12,61 @@ from typing import (
     Union,
 )
 
-import networkx as nx  # type: ignore
-from networkx.algorithms.shortest_paths import (  # type: ignore
-    multi_source_dijkstra,
-)
-
 from unweaver.geojson import Feature, Point
-from unweaver.graphs import (
-    AugmentedDiGraphGPKGView,
-    DiGraphGPKG,
-    DiGraphGPKGView,
-)
+from unweaver.graphs import DiGraphGPKG, DiGraphGPKGView
 from unweaver.graph import ProjectedNode
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.constants import DWITHIN
-from unweaver.candidates import choose_candidate, waypoint_candidates
+from unweaver.candidates import (
+    choose_candidate,
+    overlay_edges,
+    waypoint_candidates,
+)
+from unweaver.contraction import ContractionHierarchy
 from unweaver.exceptions import NoPathError
+from .adjacency import SearchAdjacency
+from .dijkstra import astar, bidirectional_dijkstra
 
 
 Waypoints = Sequence[Feature[Point]]
+# The cost, node IDs, and edges of a path
+Leg = Tuple[float, List[str], List[EdgeData]]
+
+_UNSET = object()
 
 
 def waypoint_nodes(
     G: DiGraphGPKG,
     waypoints: Waypoints,
     cost_function: CostFunction,
-    invert: Optional[Iterable[str]] = None,
-    flip: Optional[Iterable[str]] = None,
     dwithin: float = DWITHIN,
 ) -> List[Optional[ProjectedNode]]:
     nodes = []
     for i, wp in enumerate(waypoints):
         node_id = f"-{i + 1}"
         lon, lat = wp.geometry.coordinates
-        # FIXME: don't invert any properties on the fly, make use of symmetry
-        # of half-edges: e.g., for edge (u, v), edge (v, u) already has the
-        # flipped/inverted properties.
-        # FIXME: handle case where starting point is on the same edge: need to
-        # change the new edges being  inserted to reference one another, e.g.
-        # connect -1 to -2 and vice versa.
+        # Temporary edges along the reverse of an edge are made from the
+        # graph's reverse edge, which already has the inverted properties.
+        # Waypoints along the same edge are connected to one another when
+        # their temporary edges are combined (see `overlay_edges`).
         wp_candidates = waypoint_candidates(
             G,
             lon,
             lat,
             n=4,
             dwithin=dwithin,
-            invert=invert,
-            flip=flip,
             node_id=node_id,
         )
 
-        # If closest points on the graph are on edges, multiple shortest path
-        # searches will be done (this is a good point for optimization in
-        # future releases) and the cheapest one will be kept.
-        # TODO: generalize to multi-waypoints.
+        # The first waypoint must be left, the last one reached, and the
+        # others both.
         context: Literal["origin", "destination", "both"]
         if i == 0:
             context = "origin"
         elif i == len(waypoints) - 1:
-            context = "both"
-        else:
             context = "destination"
+        else:
+            context = "both"
         graph_wp = choose_candidate(G, wp_candidates, context, cost_function)
 
         nodes.append(graph_wp)
@@ -79,60 +74,251 @@ def waypoint_nodes(
     return nodes
 
 
-def shortest_path_multi(
+def shortest_path_legs(
     G: DiGraphGPKGView,
-    nodes: List[Union[str, ProjectedNode]],
+    nodes: Sequence[Union[str, ProjectedNode]],
     cost_function: CostFunction,
-) -> Tuple[float, List[str], List[EdgeData]]:
-    """Find the on-graph shortest path between multiple waypoints (nodes).
+    min_cost_per_meter: Optional[float] = None,
+    hierarchy: Optional[ContractionHierarchy] = None,
+) -> List[Leg]:
+    """Find the on-graph shortest path between each consecutive pair of
+    waypoints (nodes), e.g. the legs of a tour.
+
+    The temporary edges of all of the waypoints are combined into a single
+    overlay (see `overlay_edges`), so that waypoints along the same edge are
+    connected to one another. The legs share their neighbor lookups and the
+    cost of every edge is calculated at most once, and a leg between the same
+    two waypoints as an earlier one (e.g. there and back again) is not
+    searched again.
 
     :param G: The routing graph.
-    :param nodes: A list of nodes to visit, finding the shortest path between
-    each.
+    :param nodes: The waypoints to visit, in order: on-graph node IDs or
+                  ProjectedNodes.
     :param cost_function: A networkx-compatible cost function. Takes u, v,
                           ddict as parameters and returns a single number.
+    :param min_cost_per_meter: A lower bound on the cost of traveling one
+                               meter with this cost function. If set, an A*
+                               search guided by the great-circle distance to
+                               each destination is used.
+    :param hierarchy: A contraction hierarchy built from the same (static)
+                      costs as the cost function. If set, it is used to find
+                      the paths between on-graph nodes and min_cost_per_meter
+                      is ignored.
+    :returns: The (cost, node IDs, edges) of every leg, in order.
+    :raises NoPathError: If any leg has no path.
 
     """
     # FIXME: written in a way that expects all waypoint nodes to have been
     # pre-vetted to be non-None
-    # TODO: Extract invertible/flippable edge attributes into the profile.
-    # NOTE: Written this way to anticipate multi-waypoint routing
-    G_overlay = nx.DiGraph()
-    node_list = []
-    for node in nodes:
-        if isinstance(node, ProjectedNode):
-            if node.edges_out:
-                G_overlay.add_edges_from(node.edges_out)
-            if node.edges_in:
-                G_overlay.add_edges_from(node.edges_in)
-            node_list.append(node.n)
-        else:
-            node_list.append(node)
+    node_list = [
+        node.n if isinstance(node, ProjectedNode) else node for node in nodes
+    ]
 
-    pairs = zip(node_list[:-1], node_list[1:])
+    # A single adjacency is shared by all legs so that neighbors fetched for
+    # one leg are not fetched again for the next.
+    adjacency = SearchAdjacency(G, overlay_edges=overlay_edges(G, nodes))
+    cached_cost_function = cache_costs(cost_function)
 
-    G_aug = AugmentedDiGraphGPKGView(G=G, G_overlay=G_overlay)
-
-    result_legs = []
+    searched: Dict[Tuple[str, str], Leg] = {}
+    legs = []
     cost: float
     path: List[str]
     edges: List[Dict[str, Any]]
-    for n1, n2 in pairs:
-        try:
-            cost, path = multi_source_dijkstra(
-                G_aug, sources=[n1], target=n2, weight=cost_function
+    for n1, n2 in zip(node_list[:-1], node_list[1:]):
+        if (n1, n2) in searched:
+            cost, path, edges = searched[(n1, n2)]
+            legs.append((cost, list(path), [dict(d) for d in edges]))
+            continue
+        if hierarchy is not None:
+            cost, path, edges = _hierarchy_leg(
+                G, hierarchy, adjacency, n1, n2, cached_cost_function
+            )
+        elif min_cost_per_meter is None:
+            cost, path, edges = bidirectional_dijkstra(
+                adjacency, n1, n2, cached_cost_function
+            )
+        else:
+            cost, path, edges = astar(
+                adjacency,
+                n1,
+                n2,
+                cached_cost_function,
+                cost_per_meter=min_cost_per_meter,
             )
-        except nx.exception.NetworkXNoPath:
-            raise NoPathError("No viable path found.")
-        if cost is None:
-            raise NoPathError("No viable path found.")
+        searched[(n1, n2)] = (cost, path, edges)
+        legs.append((cost, path, edges))
 
-        edges = [dict(G_aug[u][v]) for u, v in zip(path, path[1:])]
+    return legs
+
+
+def shortest_path_multi(
+    G: DiGraphGPKGView,
+    nodes: Sequence[Union[str, ProjectedNode]],
+    cost_function: CostFunction,
+    min_cost_per_meter: Optional[float] = None,
+    hierarchy: Optional[ContractionHierarchy] = None,
+) -> Leg:
+    """Find the on-graph shortest path between multiple waypoints (nodes),
+    visiting them in order: the legs found by `shortest_path_legs`, joined
+    end to end.
 
-        result_legs.append((cost, path, edges))
+    :param G: The routing graph.
+    :param nodes: A list of nodes to visit, finding the shortest path between
+    each.
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number.
+    :param min_cost_per_meter: A lower bound on the cost of traveling one
+                               meter with this cost function. If set, an A*
+                               search guided by the great-circle distance to
+                               each destination is used.
+    :param hierarchy: A contraction hierarchy built from the same (static)
+                      costs as the cost function. If set, it is used to find
+                      the paths between on-graph nodes and min_cost_per_meter
+                      is ignored.
+    :returns: The total cost, node IDs, and edges of the whole path.
 
-    # TODO: Return multiple legs once multiple waypoints supported
-    return result_legs[0]
+    """
+    legs = shortest_path_legs(
+        G,
+        nodes,
+        cost_function,
+        min_cost_per_meter=min_cost_per_meter,
+        hierarchy=hierarchy,
+    )
+    return join_legs(legs)
+
+
+def join_legs(legs: Sequence[Leg]) -> Leg:
+    """Join the legs of a path end to end.
+
+    :param legs: The (cost, node IDs, edges) of every leg, in order.
+    :returns: The total cost, node IDs, and edges of the whole path.
+
+    """
+    cost = 0.0
+    path: List[str] = []
+    edges: List[EdgeData] = []
+    for leg_cost, leg_path, leg_edges in legs:
+        cost += leg_cost
+        # Every leg starts where the previous one ended
+        path.extend(leg_path[1:] if path else leg_path)
+        edges.extend(leg_edges)
+    return cost, path, edges
+
+
+def cache_costs(cost_function: CostFunction) -> CostFunction:
+    """Wrap a cost function so that the cost of every edge is calculated at
+    most once. Graphs have at most one edge per (u, v), so its cost can be
+    reused by every search of a batch.
+
+    :param cost_function: A networkx-compatible cost function.
+
+    """
+    costs: Dict[Tuple[str, str], Optional[float]] = {}
+
+    def cached_cost_function(u: str, v: str, d: EdgeData) -> Optional[float]:
+        cost = costs.get((u, v), _UNSET)
+        if cost is _UNSET:
+            cost = costs[(u, v)] = cost_function(u, v, d)
+        return cost  # type: ignore
+
+    return cached_cost_function
+
+
+def _hierarchy_leg(
+    G: DiGraphGPKGView,
+    hierarchy: ContractionHierarchy,
+    adjacency: SearchAdjacency,
+    n1: str,
+    n2: str,
+    cost_function: CostFunction,
+) -> Leg:
+    # Temporary nodes are not in the hierarchy: start (or end) the search at
+    # the on-graph nodes reached through the overlay's edges instead.
+    forward = overlay_paths(hierarchy, adjacency, n1, cost_function, True)
+    backward = overlay_paths(hierarchy, adjacency, n2, cost_function, False)
+
+    best: Optional[Leg] = None
+    if n2 in forward and n2 not in hierarchy:
+        # Along the same edge, through temporary nodes only
+        cost, path, edges = forward[n2]
+        best = (cost, list(path), [dict(d) for d in edges])
+
+    sources = {n: forward[n][0] for n in forward if n in hierarchy}
+    targets = {n: backward[n][0] for n in backward if n in hierarchy}
+    try:
+        cost, path = hierarchy.search(sources, targets)
+    except NoPathError:
+        if best is None:
+            raise
+        return best
+    if best is not None and best[0] <= cost:
+        return best
+
+    first_cost, first_path, first_edges = forward[path[0]]
+    last_cost, last_path, last_edges = backward[path[-1]]
+    edges = [d for _, _, d in G.edges_bunch(zip(path, path[1:]))]
+    return (
+        cost,
+        first_path[:-1] + path + last_path[1:],
+        [dict(d) for d in first_edges] + edges + [dict(d) for d in last_edges],
+    )
+
+
+def overlay_paths(
+    hierarchy: ContractionHierarchy,
+    adjacency: SearchAdjacency,
+    n: str,
+    cost_function: CostFunction,
+    forward: bool,
+) -> Dict[str, Leg]:
+    """Find the cheapest paths from (or to) a node through the temporary
+    edges of a search's overlay only, stopping at nodes of a contraction
+    hierarchy. Temporary nodes are not in hierarchies, so hierarchy searches
+    start (or end) at the on-graph nodes reached instead.
+
+    :param hierarchy: The contraction hierarchy.
+    :param adjacency: The search's adjacency, with its overlay edges.
+    :param n: The node ID.
+    :param cost_function: A networkx-compatible cost function.
+    :param forward: Whether to find paths from (rather than to) the node.
+    :returns: Mapping from every node reached, including the node itself, to
+              the (cost, node IDs, edges) of its path.
+
+    """
+    overlay = adjacency.overlay_succ if forward else adjacency.overlay_pred
+    paths: Dict[str, Leg] = {}
+    c = count()
+    heap: List[Tuple[float, int, str, List[str], List[EdgeData]]] = [
+        (0.0, next(c), n, [n], [])
+    ]
+    while heap:
+        cost, _, u, path, edges = heappop(heap)
+        if u in paths:
+            continue
+        paths[u] = (cost, path, edges)
+        if u in hierarchy:
+            continue
+        for v, d in overlay.get(u, {}).items():
+            if v in paths:
+                continue
+            if forward:
+                edge_cost = cost_function(u, v, d)
+            else:
+                edge_cost = cost_function(v, u, d)
+            if edge_cost is None:
+                continue
+            if forward:
+                heappush(
+                    heap,
+                    (cost + edge_cost, next(c), v, path + [v], edges + [d]),
+                )
+            else:
+                heappush(
+                    heap,
+                    (cost + edge_cost, next(c), v, [v] + path, [d] + edges),
+                )
+    return paths
 
 
 def shortest_path(
@@ -140,6 +326,7 @@ def shortest_path(
     origin_node: str,
     destination_node: str,
     cost_function: CostFunction,
+    min_cost_per_meter: Optional[float] = None,
 ) -> Tuple[float, List[str], List[EdgeData]]:
     """Find the shortest path from one on-graph node to another.
 
@@ -147,10 +334,14 @@ def shortest_path(
     :param origin_node: The start node ID.
     :param destination_node: The end node ID.
     :param cost_function: A dynamic cost function.
-    :param precalculated_cost_function: A cost function that finds a
-    precalculated weight.
+    :param min_cost_per_meter: A lower bound on the cost of traveling one
+                               meter with this cost function. If set, an A*
+                               search is used.
 
     """
     return shortest_path_multi(
-        G, [origin_node, destination_node], cost_function
+        G,
+        [origin_node, destination_node],
+        cost_function,
+        min_cost_per_meter=min_cost_per_meter,
     )
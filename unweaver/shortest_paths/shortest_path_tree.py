@@ -1,4 +1,13 @@
-from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from networkx.algorithms.shortest_paths import (  # type: ignore
     single_source_dijkstra,
@@ -7,6 +16,7 @@ from networkx.algorithms.shortest_paths import (  # type: ignore
 from unweaver.geojson import Point
 from unweaver.graph_types import CostFunction, EdgeData
 from unweaver.graphs import AugmentedDiGraphGPKGView, DiGraphGPKGView
+from .dijkstra import multi_source_dijkstra
 
 
 Path = List[str]
@@ -27,6 +37,9 @@ ReachedNodes = Dict[str, ReachedNode]
 
 Paths = Dict[str, Path]
 
+# The nearest start node of every node reached from many start nodes
+Origins = Dict[str, str]
+
 
 def shortest_path_tree(
     G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
@@ -54,18 +67,61 @@ def shortest_path_tree(
         G, start_node, cutoff=max_cost, weight=cost_function
     )
 
+    nodes, edges_data = _tree(G, distances, paths)
+
+    return nodes, paths, edges_data
+
+
+def shortest_path_tree_multi(
+    G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+    sources: Mapping[str, float],
+    cost_function: CostFunction,
+    max_cost: Optional[float] = None,
+    precalculated_cost_function: Optional[CostFunction] = None,
+) -> Tuple[ReachedNodes, Paths, Iterable[EdgeData], Origins]:
+    """Find the shortest paths to on-graph nodes from the nearest of many
+    start nodes, in a single search, subject to a maximum total
+    "distance"/cost constraint.
+
+    :param G: Network graph, e.g. an AugmentedDiGraphGPKGView with the
+              temporary edges of every start point.
+    :param sources: The initial cost of every start node (on graph) at which
+                    to begin the search, e.g. 0 for all of them.
+    :param cost_function: NetworkX-compatible weight function.
+    :param max_cost: Maximum weight (including initial costs) to reach in
+                     the tree.
+    :param precalculated_cost_function: NetworkX-compatible weight function
+                                        that represents precalculated weights.
+    :returns: As shortest_path_tree, plus the nearest start node of every
+              reached node.
+
+    """
+    if precalculated_cost_function is not None:
+        cost_function = precalculated_cost_function
+
+    distances, paths, origins = multi_source_dijkstra(
+        G, sources, cost_function, max_cost
+    )
+    nodes, edges_data = _tree(G, distances, paths)
+
+    return nodes, paths, edges_data, origins
+
+
+def _tree(
+    G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+    distances: Dict[str, float],
+    paths: Paths,
+) -> Tuple[ReachedNodes, Iterable[EdgeData]]:
     # Extract unique edges
     edge_ids = list(
         set([(u, v) for p in paths.values() for u, v in zip(p, p[1:])])
     )
 
-    # FIXME: graph should leverage a 'get an nbunch' method so that this
-    # requires only one SQL query.
     def edge_data_generator(
-        G: DiGraphGPKGView, edge_ids: List[Tuple[str, str]]
+        G: Union[AugmentedDiGraphGPKGView, DiGraphGPKGView],
+        edge_ids: List[Tuple[str, str]],
     ) -> Iterable[EdgeData]:
-        for u, v in edge_ids:
-            edge = dict(G[u][v])
+        for u, v, edge in G.edges_bunch(edge_ids):
             edge["_u"] = u
             edge["_v"] = v
             yield edge
@@ -81,4 +137,4 @@ def shortest_path_tree(
             key=node_id, geom=node_attr[geom_key], cost=distance
         )
 
-    return nodes, paths, edges_data
+    return nodes, edges_data
@@ -0,0 +1,242 @@
+"""Find a short order in which to visit many stops, and the route that
+visits them in that order."""
+import time
+from typing import List, Optional, Sequence, Tuple, Union
+
+from unweaver.constants import TRIP_TIME_BUDGET
+from unweaver.contraction import ContractionHierarchy
+from unweaver.exceptions import NoPathError
+from unweaver.graph import ProjectedNode
+from unweaver.graph_types import CostFunction
+from unweaver.graphs import DiGraphGPKGView
+from .cost_matrix import Matrix, cost_matrix
+from .shortest_path import Leg, shortest_path_legs
+
+# Improvements smaller than this are ignored, so that rounding errors cannot
+# make the search cycle between equivalent orders
+EPSILON = 1e-9
+
+
+def trip(
+    G: DiGraphGPKGView,
+    nodes: Sequence[Union[str, ProjectedNode]],
+    cost_function: CostFunction,
+    roundtrip: bool = True,
+    min_cost_per_meter: Optional[float] = None,
+    hierarchy: Optional[ContractionHierarchy] = None,
+    time_budget: float = TRIP_TIME_BUDGET,
+) -> Tuple[List[int], List[Leg]]:
+    """Find a short route that starts at the first of many stops and visits
+    all of the others, in any order.
+
+    The costs between every pair of stops are found with `cost_matrix`, an
+    order is found with `visiting_order`, and the route's legs are found
+    with `shortest_path_legs`.
+
+    :param G: The routing graph.
+    :param nodes: The stops: on-graph node IDs or ProjectedNodes with
+                  distinct IDs (e.g. from `snap_points`).
+    :param cost_function: A networkx-compatible cost function. Takes u, v,
+                          ddict as parameters and returns a single number, or
+                          None if the edge cannot be traversed.
+    :param roundtrip: Whether the route returns to the first stop.
+    :param min_cost_per_meter: A lower bound on the cost function's cost per
+                               meter, which enables A* between stops.
+    :param hierarchy: A contraction hierarchy built from the same (static)
+                      costs as the cost function.
+    :param time_budget: The number of seconds for which to improve the order.
+    :returns: The order in which the stops are visited (indices into nodes,
+              starting with 0), and the legs of the route: one per pair of
+              consecutive stops, and one back to the first stop for round
+              trips.
+    :raises NoPathError: If no order visits every stop.
+
+    """
+    costs = cost_matrix(G, nodes, nodes, cost_function, hierarchy=hierarchy)
+    order = visiting_order(costs, roundtrip=roundtrip, time_budget=time_budget)
+    if order is None:
+        raise NoPathError("No order visits every stop.")
+
+    stops = [nodes[i] for i in order]
+    if roundtrip and stops:
+        stops.append(stops[0])
+    if len(stops) < 2:
+        return order, []
+
+    legs = shortest_path_legs(
+        G,
+        stops,
+        cost_function,
+        min_cost_per_meter=min_cost_per_meter,
+        hierarchy=hierarchy,
+    )
+    return order, legs
+
+
+def visiting_order(
+    costs: Matrix,
+    roundtrip: bool = True,
+    time_budget: float = TRIP_TIME_BUDGET,
+) -> Optional[List[int]]:
+    """Find a short order in which to visit every stop of a cost matrix,
+    starting with the first one.
+
+    The order starts as a nearest-neighbor tour and is improved with 2-opt
+    (reversing a run of stops) and Or-opt (moving a run of up to three stops
+    elsewhere, possibly reversed) moves until neither finds an improvement or
+    the time budget runs out. Costs need not be symmetric.
+
+    :param costs: The cost from every stop (row) to every stop (column),
+                  None where there is no path.
+    :param roundtrip: Whether the order returns to the first stop, i.e.
+                      whether the cost back to it counts.
+    :param time_budget: The number of seconds for which to improve the order.
+    :returns: The indices of the stops in the order in which they are
+              visited, starting with 0, or None if no order visits every stop.
+
+    """
+    deadline = time.monotonic() + time_budget
+    n = len(costs)
+    if not n:
+        return []
+
+    # Missing paths cost more than any order of existing paths
+    finite = [cost for row in costs for cost in row if cost is not None]
+    unreachable = (max(finite, default=0.0) + 1) * (n + 1)
+    c = [
+        [unreachable if cost is None else cost for cost in row]
+        for row in costs
+    ]
+    # Every order ends at a last, virtual stop: the first stop, for round
+    # trips, or anywhere. It and the first stop never move.
+    for row in c:
+        row.append(row[0] if roundtrip else 0.0)
+    c.append([unreachable] * (n + 1))
+
+    tour = _nearest_neighbor(c, n)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = _two_opt(c, tour, deadline)
+        improved = _or_opt(c, tour, deadline) or improved
+
+    if any(c[a][b] >= unreachable for a, b in zip(tour, tour[1:])):
+        return None
+    return tour[:-1]
+
+
+def _nearest_neighbor(c: List[List[float]], n: int) -> List[int]:
+    tour = [0]
+    remaining = set(range(1, n))
+    while remaining:
+        row = c[tour[-1]]
+        nearest = min(remaining, key=lambda j: (row[j], j))
+        remaining.remove(nearest)
+        tour.append(nearest)
+    tour.append(n)
+    return tour
+
+
+def _two_opt(c: List[List[float]], tour: List[int], deadline: float) -> bool:
+    # Reverse tour[i:j + 1]. With asymmetric costs, the cost of the reversed
+    # run changes too: it is found from prefix sums of the costs along the
+    # tour in either direction.
+    improved = False
+    last = len(tour) - 2
+    forward, backward = _prefix_costs(c, tour)
+    for i in range(1, last):
+        if time.monotonic() > deadline:
+            break
+        a = tour[i - 1]
+        ti = tour[i]
+        for j in range(i + 1, last + 1):
+            tj = tour[j]
+            b = tour[j + 1]
+            delta = (
+                c[a][tj]
+                + c[ti][b]
+                - c[a][ti]
+                - c[tj][b]
+                + (backward[j] - backward[i])
+                - (forward[j] - forward[i])
+            )
+            if delta < -EPSILON:
+                tour[i : j + 1] = tour[j : i - 1 : -1]
+                forward, backward = _prefix_costs(c, tour)
+                ti = tour[i]
+                improved = True
+    return improved
+
+
+def _prefix_costs(
+    c: List[List[float]], tour: List[int]
+) -> Tuple[List[float], List[float]]:
+    # The costs of tour[:k + 1], forward and backward
+    forward = [0.0]
+    backward = [0.0]
+    for a, b in zip(tour, tour[1:]):
+        forward.append(forward[-1] + c[a][b])
+        backward.append(backward[-1] + c[b][a])
+    return forward, backward
+
+
+def _or_opt(c: List[List[float]], tour: List[int], deadline: float) -> bool:
+    # Move tour[i:i + length] between two other consecutive stops
+    improved = False
+    for length in (1, 2, 3):
+        i = 1
+        while i + length < len(tour):
+            if time.monotonic() > deadline:
+                return improved
+            if _move_run(c, tour, i, length):
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+def _move_run(
+    c: List[List[float]], tour: List[int], i: int, length: int
+) -> bool:
+    run = tour[i : i + length]
+    first = run[0]
+    last = run[-1]
+    inner = sum(c[a][b] for a, b in zip(run, run[1:]))
+    inner_reversed = sum(c[b][a] for a, b in zip(run, run[1:]))
+    before = tour[i - 1]
+    after = tour[i + length]
+    removed = c[before][first] + c[last][after] - c[before][after]
+
+    best = -EPSILON
+    best_move = None
+    for j in range(len(tour) - 1):
+        if i - 1 <= j < i + length:
+            continue
+        a = tour[j]
+        b = tour[j + 1]
+        delta = c[a][first] + c[last][b] - c[a][b] - removed
+        if delta < best:
+            best = delta
+            best_move = (j, False)
+        if length > 1:
+            delta = (
+                c[a][last]
+                + c[first][b]
+                - c[a][b]
+                - removed
+                + inner_reversed
+                - inner
+            )
+            if delta < best:
+                best = delta
+                best_move = (j, True)
+
+    if best_move is None:
+        return False
+    j, reverse = best_move
+    if reverse:
+        run.reverse()
+    rest = tour[:i] + tour[i + length :]
+    # Position of the stop after which the run goes, in the remaining tour
+    position = j + 1 if j < i else j + 1 - length
+    tour[:] = rest[:position] + run + rest[position:]
+    return True
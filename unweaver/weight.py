@@ -1,21 +1,96 @@
+import multiprocessing
 import os
-from typing import Callable, List, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from click._termui_impl import ProgressBar
+import numpy as np
 
-from unweaver.constants import DB_PATH
-from unweaver.graph_types import CostFunction, EdgeTuple
-from unweaver.graphs import DiGraphGPKG
+from unweaver.constants import BATCH_SIZE, DB_PATH, WEIGHT_SHARD_SIZE
+from unweaver.graph_types import CostFunction, VectorizedCostFunction
+from unweaver.graphs import DiGraphGPKG, DiGraphGPKGView
 from unweaver.parsers import parse_profiles
+from unweaver.profile import Profile
 
+# Values of columns that are passed to vectorized cost functions as floats
+_NUMERIC = (int, float, type(None))
 
-def precalculate_weights(directory: str) -> None:
-    profiles = parse_profiles(directory)
-    G = DiGraphGPKG(path=os.path.join(directory, DB_PATH))
-    for profile in profiles:
-        if profile["precalculate"]:
-            weight_column = f"_weight_{profile['id']}"
-            precalculate_weight(G, weight_column, profile["cost_function"])
+# A cost function, or a vectorized cost function to use instead (if not None)
+WeightFunctions = Tuple[CostFunction, Optional[VectorizedCostFunction]]
+# (fid, weight 1, weight 2, ...)
+WeightRow = Tuple[Any, ...]
+
+# Per-process state of `weight --jobs` workers: (graph, weight functions)
+_worker_state: Dict[str, Any] = {}
+
+
+def precalculate_weights(
+    directory: str,
+    counter: Optional[ProgressBar] = None,
+    jobs: int = 1,
+    batch_size: int = BATCH_SIZE,
+    min_fid: Optional[int] = None,
+    profile_ids: Optional[Sequence[str]] = None,
+) -> None:
+    """Precalculate the weights of every profile that has `precalculate` set,
+    in a single scan of the edges table.
+
+    :param directory: The project directory.
+    :param counter: A progress bar, updated as edges are weighted.
+    :param jobs: The number of processes that calculate weights. If greater
+                 than 1, the edges table is split into ranges of fids, which
+                 are weighted in parallel while this process writes every
+                 result.
+    :param batch_size: The number of edges per batch.
+    :param min_fid: If set, only edges with a fid of at least this are
+                    weighted, e.g. the edges added by an incremental build.
+    :param profile_ids: If set, only these profiles are weighted.
+
+    """
+    profiles = _precalculated_profiles(directory, profile_ids)
+    if not profiles:
+        return
+    weight_columns = [f"_weight_{profile['id']}" for profile in profiles]
+    path = os.path.join(directory, DB_PATH)
+
+    if jobs > 1:
+        # Worker processes are started before this process opens the
+        # database, so that they don't inherit its connection.
+        with multiprocessing.Pool(
+            jobs,
+            initializer=_init_worker,
+            initargs=(directory, batch_size, profile_ids),
+        ) as pool:
+            G = DiGraphGPKG(path=path)
+            edges = G.network.edges
+            first_fid, max_fid = edges.primary_key_range()
+            if first_fid is None or max_fid is None:
+                return
+            if min_fid is not None:
+                first_fid = max(first_fid, min_fid)
+            shards = [
+                (start, min(start + WEIGHT_SHARD_SIZE - 1, max_fid))
+                for start in range(first_fid, max_fid + 1, WEIGHT_SHARD_SIZE)
+            ]
+            for rows in pool.imap_unordered(_weigh_shard, shards):
+                edges.update_columns(weight_columns, rows)
+                if counter is not None:
+                    counter.update(len(rows))
+        return
+
+    G = DiGraphGPKG(path=path)
+    functions = [_weight_functions(G, profile) for profile in profiles]
+    _write_weights(
+        G, weight_columns, functions, counter, batch_size, min_fid=min_fid
+    )
 
 
 def precalculate_weight(
@@ -23,20 +98,177 @@ def precalculate_weight(
     weight_column: str,
     cost_function_generator: Callable[..., CostFunction],
     counter: Optional[ProgressBar] = None,
+    vectorized_cost_function_generator: Optional[
+        Callable[..., VectorizedCostFunction]
+    ] = None,
+    batch_size: int = BATCH_SIZE,
+) -> None:
+    """Calculate a static weight for every edge and store it in a column of
+    the edges table. Edges are streamed in batches along with their fid, and
+    each batch of weights is written back in a single transaction.
+
+    :param G: The graph.
+    :param weight_column: The column in which to store weights.
+    :param cost_function_generator: A function that takes the graph and
+                                    returns a networkx-compatible cost
+                                    function.
+    :param counter: A progress bar, updated as edges are weighted.
+    :param vectorized_cost_function_generator: An optional function that
+    takes the graph and returns a vectorized cost function, which is used
+    instead of the cost function. It is called once per batch with a mapping
+    from every (non-geometry) column name to a NumPy array of its values and
+    returns an array of weights, where NaN means that an edge cannot be
+    traversed.
+    :param batch_size: The number of edges per batch.
+
+    """
+    vectorized_cost_function = None
+    if vectorized_cost_function_generator is not None:
+        vectorized_cost_function = vectorized_cost_function_generator(G)
+    functions = [(cost_function_generator(G), vectorized_cost_function)]
+    _write_weights(G, [weight_column], functions, counter, batch_size)
+
+
+def weigh_batches(
+    G: DiGraphGPKGView,
+    functions: Sequence[WeightFunctions],
+    batch_size: int = BATCH_SIZE,
+    min_fid: Optional[int] = None,
+    max_fid: Optional[int] = None,
+) -> Generator[List[WeightRow], None, None]:
+    """Calculate several weights for every edge (or a range of fids) in a
+    single scan of the edges table.
+
+    :param G: The graph.
+    :param functions: One (cost function, vectorized cost function or None)
+                      pair per weight.
+    :param batch_size: The number of edges per batch.
+    :param min_fid: The lowest fid to weigh (inclusive).
+    :param max_fid: The highest fid to weigh (inclusive).
+    :returns: Generator of batches of (fid, weight 1, weight 2, ...) rows.
+
+    """
+    edges = G.network.edges
+    column_names = None
+    if all(vectorized is not None for _, vectorized in functions):
+        # Only the per-edge cost functions need (decoded) geometries
+        column_names = [
+            c for c in edges._get_column_names() if c != edges.geom_column
+        ]
+
+    for rows in edges.iter_batches(
+        batch_size,
+        column_names=column_names,
+        min_fid=min_fid,
+        max_fid=max_fid,
+    ):
+        fids = [row[edges.primary_key] for row in rows]
+        columns: List[List[Optional[float]]] = []
+        arrays = None
+        ebunch = None
+        for cost_function, vectorized in functions:
+            if vectorized is not None:
+                if arrays is None:
+                    arrays = column_arrays(
+                        rows,
+                        column_names
+                        or [c for c in rows[0] if c != edges.geom_column],
+                    )
+                columns.append(_weight_values(vectorized(arrays)))
+            else:
+                if ebunch is None:
+                    ebunch = [edges._graph_format(dict(row)) for row in rows]
+                columns.append([cost_function(*edge) for edge in ebunch])
+        yield list(zip(fids, *columns))
+
+
+def column_arrays(
+    rows: Sequence[Dict[str, Any]], column_names: Sequence[str]
+) -> Dict[str, np.ndarray]:
+    """Transpose rows into one NumPy array per column. Numeric columns are
+    float arrays with NaN for NULL values, other columns are object arrays.
+
+    :param rows: The rows, as dicts.
+    :param column_names: The columns to extract.
+
+    """
+    arrays = {}
+    for column_name in column_names:
+        values = [row.get(column_name) for row in rows]
+        if all(isinstance(value, _NUMERIC) for value in values):
+            arrays[column_name] = np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=np.float64,
+            )
+        else:
+            arrays[column_name] = np.array(values, dtype=object)
+    return arrays
+
+
+def _write_weights(
+    G: DiGraphGPKG,
+    weight_columns: Sequence[str],
+    functions: Sequence[WeightFunctions],
+    counter: Optional[ProgressBar],
+    batch_size: int,
+    min_fid: Optional[int] = None,
 ) -> None:
-    cost_function = cost_function_generator(G)
-    # FIXME: __setitem__ silently fails on immutable graph
-
-    batch: List[EdgeTuple] = []
-    for u, v, d in G.iter_edges():
-        weight = cost_function(u, v, d)
-        if len(batch) == 1000:
-            G.update_edges(batch)
-            batch = []
-        batch.append((u, v, {weight_column: weight}))
+    edges = G.network.edges
+    for rows in weigh_batches(G, functions, batch_size, min_fid=min_fid):
+        edges.update_columns(weight_columns, rows)
         if counter is not None:
-            counter.update(1)
+            counter.update(len(rows))
+
+
+def _precalculated_profiles(
+    directory: str, profile_ids: Optional[Sequence[str]] = None
+) -> List[Profile]:
+    return [
+        profile
+        for profile in parse_profiles(directory)
+        if profile.get("precalculate", False)
+        and (profile_ids is None or profile["id"] in profile_ids)
+    ]
+
+
+def _weight_functions(G: DiGraphGPKGView, profile: Profile) -> WeightFunctions:
+    vectorized_cost_function = None
+    if "vectorized_cost_function" in profile:
+        vectorized_cost_function = profile["vectorized_cost_function"](G)
+    return profile["cost_function"](G), vectorized_cost_function
+
+
+def _init_worker(
+    directory: str, batch_size: int, profile_ids: Optional[Sequence[str]]
+) -> None:
+    # Profile functions are loaded from files, so can't be sent to workers:
+    # each worker loads them itself.
+    G = DiGraphGPKGView(path=os.path.join(directory, DB_PATH), read_only=True)
+    _worker_state["G"] = G
+    _worker_state["functions"] = [
+        _weight_functions(G, profile)
+        for profile in _precalculated_profiles(directory, profile_ids)
+    ]
+    _worker_state["batch_size"] = batch_size
+
+
+def _weigh_shard(shard: Tuple[int, int]) -> List[WeightRow]:
+    min_fid, max_fid = shard
+    rows: List[WeightRow] = []
+    for batch in weigh_batches(
+        _worker_state["G"],
+        _worker_state["functions"],
+        _worker_state["batch_size"],
+        min_fid=min_fid,
+        max_fid=max_fid,
+    ):
+        rows.extend(batch)
+    return rows
+
 
-    # Update any remaining edges in batch
-    if batch:
-        G.update_edges(batch)
+def _weight_values(weights: np.ndarray) -> List[Optional[float]]:
+    # NaN (no path) is stored as NULL, like a cost function returning None
+    return [
+        None if weight != weight else weight
+        for weight in np.asarray(weights, dtype=np.float64).tolist()
+    ]